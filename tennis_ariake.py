@@ -1,22 +1,31 @@
-import re
 import time
-import random
 import logging
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait, Select
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException, NoSuchElementException
-from webdriver_manager.chrome import ChromeDriverManager
 from dotenv import load_dotenv
 import jpholiday
+from tennis_driver import create_driver, record_page_metrics
+from tennis_retry import check_portal, load_page_with_retry, EXIT_PORTAL_DOWN
+from tennis_availability import AvailabilityStore, WeekHarvester
+from tennis_delta import notify_changes, slots_from_items
+from tennis_heartbeat import CalendarHeartbeat
+from tennis_extract import extract_week_slots
+from tennis_parse import parse_month_calendar, split_open_dates, calendar_opened
+from tennis_session import resume_session, save_session
+from tennis_wait import wait_for_week_slots, wait_for_month_change
 from datetime import datetime
 load_dotenv("/root/tenniscourt/config.env", override=True)
-time.sleep(random.uniform(1, 30))  # 等待随机秒数
 # **存储所有空位信息**
-availability_info = {}
+availability_info = AvailabilityStore("ariake", {
+    "10": "7-9点", "20": "9-11点",
+    "30": "11-13点", "40": "13-15点",
+    "50": "15-17点", "60": "17-19点",
+    "70": "19-21点",
+})
+week_plan = WeekHarvester(availability_info)  # 按周收集，同一周视图只点击一次
+heartbeat = CalendarHeartbeat(availability_info)  # 月历与上次深度查询时相同且未过期时，沿用上次的时段
 # 设置日志
 logging.basicConfig(
     filename="tennis_ariake.log",  # 输出到文件
@@ -25,94 +34,84 @@ logging.basicConfig(
     datefmt="%Y-%m-%d %H:%M:%S",
 )
 
-# 1️⃣ 配置 Selenium
-options = Options()
-options.add_argument("--headless")  # 无头模式运行
-options.add_argument("--disable-gpu")
-options.add_argument("--window-size=1920x1080")
-options.add_argument("--no-sandbox")
-options.add_argument("--disable-dev-shm-usage")
-options.add_argument("--disable-blink-features=AutomationControlled")  
-options.add_argument("user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/131.0.0.0 Safari/537.36")  
-
+url = "https://kouen.sports.metro.tokyo.lg.jp/web/index.jsp"
+# 门户熔断中或预检失败时不启动 Chrome
+if not check_portal(url):
+    exit(EXIT_PORTAL_DOWN)
 
-# 2️⃣ 启动 WebDriver
-service = Service(ChromeDriverManager().install())
-driver = webdriver.Chrome(service=service, options=options)
+# 1️⃣ 启动 WebDriver（浏览器池可用时租用预热好的 Chrome）
+driver = create_driver("ariake")
 
 # 3️⃣ **访问主页并检测超时**
-url = "https://kouen.sports.metro.tokyo.lg.jp/web/index.jsp"
+max_retries = 3  # 允许最多重试 3 次
 
-while True:  # **无限循环直到访问成功**
-    driver.get(url)
-    try:
-        WebDriverWait(driver, 10).until(
-            EC.visibility_of_element_located((By.ID, "btn-go"))
-        )
-        logging.info("主页加载成功")
-        break
-    except TimeoutException:
-        logging.warning("主页加载超时，正在刷新...")
+# 优先恢复上次保存的结果页会话，失效时再完整导航
+navigation_started = time.monotonic()
+if not resume_session(driver, "ariake", (By.ID, "loadedmonth")):
+    if not load_page_with_retry(driver, url, (By.ID, "btn-go")):
+        driver.quit()
+        exit(EXIT_PORTAL_DOWN)
 
-time.sleep(random.uniform(1, 3))
-logging.info("搜索按钮加载成功")
+    logging.info("搜索按钮加载成功")
+    record_page_metrics(driver, "ariake", "主页")
 
-# 5️⃣ 选择 種目（选择 "テニス（ハード）"）
-sport_select = Select(driver.find_element(By.ID, "purpose-home"))
-sport_select.select_by_value("1000_1020")  # "テニス（ハード）"
-logging.info("種目选择成功")
+    # 5️⃣ 选择 種目（选择 "テニス（ハード）"）
+    sport_select = Select(driver.find_element(By.ID, "purpose-home"))
+    sport_select.select_by_value("1000_1020")  # "テニス（ハード）"
+    logging.info("種目选择成功")
 
-# 6️⃣ **等待 JavaScript 更新公园选项**
-WebDriverWait(driver, 10).until(
-    EC.presence_of_element_located((By.XPATH, "//select[@id='bname-home']/option[@value='1350']"))
-)
-logging.info("公园选项加载成功")
+    # 6️⃣ **等待 JavaScript 更新公园选项**
+    WebDriverWait(driver, 10).until(
+        EC.presence_of_element_located((By.XPATH, "//select[@id='bname-home']/option[@value='1350']"))
+    )
+    logging.info("公园选项加载成功")
 
-# 7️⃣ 选择 公園（选择 "有明テニスＡ屋外ハードコート"）
-park_select = Select(driver.find_element(By.ID, "bname-home"))
-park_select.select_by_value("1350")
-logging.info("公园选择成功")
+    # 7️⃣ 选择 公園（选择 "有明テニスＡ屋外ハードコート"）
+    park_select = Select(driver.find_element(By.ID, "bname-home"))
+    park_select.select_by_value("1350")
+    logging.info("公园选择成功")
 
-# 8️⃣ **点击搜索按钮**
-search_button = driver.find_element(By.ID, "btn-go")
-search_button.click()
-logging.info("搜索按钮点击成功")
+    # 8️⃣ **点击搜索按钮**
+    search_button = driver.find_element(By.ID, "btn-go")
+    search_button.click()
+    logging.info("搜索按钮点击成功")
 
-# **等待 URL 变化**
-max_retries = 3  # 允许最多重试 3 次
-retry_count = 0
+    # **等待 URL 变化**
+    retry_count = 0
 
-while retry_count < max_retries:
-    try:
-        WebDriverWait(driver, 20).until(lambda driver: driver.current_url != url)
-        logging.info("页面跳转成功")
-        break  # ✅ 成功，跳出循环
-    except TimeoutException:
-        retry_count += 1
-        logging.error(f"页面跳转超时，正在重试 ({retry_count}/{max_retries})")
-        if retry_count == max_retries:
-            logging.error("页面跳转失败，达到最大重试次数，退出")
-            driver.quit()
-            exit()
-        time.sleep(3)  # ⏳ 等待 3 秒后再尝试
+    while retry_count < max_retries:
+        try:
+            WebDriverWait(driver, 20).until(lambda driver: driver.current_url != url)
+            logging.info("页面跳转成功")
+            break  # ✅ 成功，跳出循环
+        except TimeoutException:
+            retry_count += 1
+            logging.error(f"页面跳转超时，正在重试 ({retry_count}/{max_retries})")
+            if retry_count == max_retries:
+                logging.error("页面跳转失败，达到最大重试次数，退出")
+                driver.quit()
+                exit()
+            time.sleep(3)  # ⏳ 等待 3 秒后再尝试
+
+    # **等待搜索结果页面加载**
+    retry_count = 0
+    while retry_count < max_retries:
+        try:
+            WebDriverWait(driver, 30).until(
+                EC.presence_of_element_located((By.ID, "loadedmonth"))
+            )
+            logging.info("月份信息加载成功")
+            break  # ✅ 成功，跳出循环
+        except TimeoutException:
+            retry_count += 1
+            logging.error(f"月份信息加载失败，正在重试 ({retry_count}/{max_retries})")
+            if retry_count == max_retries:
+                logging.error("月份信息加载失败，达到最大重试次数，退出")
+                driver.quit()
+                exit()
+            time.sleep(3)  # ⏳ 等待 3 秒后再尝试
+    save_session(driver, "ariake", time.monotonic() - navigation_started)
 
-# **等待搜索结果页面加载**
-retry_count = 0
-while retry_count < max_retries:
-    try:
-        WebDriverWait(driver, 30).until(
-            EC.presence_of_element_located((By.ID, "loadedmonth"))
-        )
-        logging.info("月份信息加载成功")
-        break  # ✅ 成功，跳出循环
-    except TimeoutException:
-        retry_count += 1
-        logging.error(f"月份信息加载失败，正在重试 ({retry_count}/{max_retries})")
-        if retry_count == max_retries:
-            logging.error("月份信息加载失败，达到最大重试次数，退出")
-            driver.quit()
-            exit()
-        time.sleep(3)  # ⏳ 等待 3 秒后再尝试
 
 # 1️⃣2️⃣ **点击折叠按钮，智能等待加载完成**
 retry_count = 0
@@ -146,20 +145,9 @@ html_before_click = driver.execute_script("return document.body.outerHTML;")
 month_element = WebDriverWait(driver, 10).until(EC.presence_of_element_located((By.ID, "month-head")))
 month_text = month_element.text
 
-# ✅ **使用正则表达式提取当月可预约的日期**
-available_dates = []
-partially_available_dates = []
-
-pattern = re.compile(r'<td id="month_(\d+)"[^>]*onclick="javascript:selectDay\(\d+\);".*?<img[^>]*?alt="(全て空き|一部空き)"', re.S)
-
-for match in pattern.finditer(html_before_click):
-    date_number = match.group(1)
-    status = match.group(2)
-
-    if status == "全て空き":
-        available_dates.append(date_number)
-    elif status == "一部空き":
-        partially_available_dates.append(date_number)
+# ✅ **逐个单元格解析月历，提取当月可预约的日期**
+calendar = parse_month_calendar(html_before_click)
+available_dates, partially_available_dates = split_open_dates(calendar)
 
 logging.info(f"{month_text}可预约的日期（完全空闲）：{available_dates}")
 logging.info(f"{month_text}可预约的日期（部分空闲）：{partially_available_dates}")
@@ -178,7 +166,7 @@ logging.info(f"{month_text}可预约的日期（完全空闲，仅休日&祝日
 logging.info(f"{month_text}可预约的日期（部分空闲，仅休日&祝日）：{partially_available_dates}")
 
 # 1️⃣4️⃣ **点击可预约的日期**
-for date in available_dates + partially_available_dates:
+for date in week_plan.plan(heartbeat.gate(calendar, available_dates + partially_available_dates)):
     logging.info(f"尝试点击日期：{date[:4]}年{date[4:6]}月{date[6:]}日")
 
     try:
@@ -188,36 +176,12 @@ for date in available_dates + partially_available_dates:
         date_element.click()
         logging.info(f"成功点击 {date[:4]}年{date[4:6]}月{date[6:]}日")
 
-        # ✅ **等待 `week-info` 确保时间段已加载**
-        WebDriverWait(driver, 30).until(
-            EC.presence_of_element_located((By.ID, "week-info"))
-        )
+        # ✅ **等待 `week-info` 中出现该日期的时段信息**
+        wait_for_week_slots(driver, date)
         logging.info(f"{date[:4]}年{date[4:6]}月{date[6:]}日 的时间段已加载")
 
-        # **获取最新 HTML**
-        time.sleep(10)  # **短暂等待 JS 渲染**
-        html_after_click = driver.execute_script("return document.body.outerHTML;")
-
-        # **先清理当前日期的旧数据，防止错误数据残留**
-        availability_info = {k: v for k, v in availability_info.items() if k[0] != date}
-
-        # **解析新数据**
-        pattern_slots = re.compile(
-            r'<input id="A_(\d{8})_(\d{2})" type="hidden" value="(\d+)">',
-            re.S
-        )
-
-        for match in pattern_slots.finditer(html_after_click):
-            slot_date, slot_suffix, available_count = match.groups()
-
-            # **只存入当前点击的日期，不存入其他日期**
-            if slot_date == date:
-                slot_time = {
-                    "10": "7-9点", "20": "9-11点",
-                    "30": "11-13点", "40": "13-15点", "50": "15-17点", "60": "17-19点","70": "19-21点"
-                }.get(slot_suffix, "未知时间段")
-
-                availability_info[(slot_date, slot_time)] = available_count
+        # 收下周视图中所有目标日期的时段，同一周的其他日期不再点击
+        week_plan.harvest(date, extract_week_slots(driver))
 
     except TimeoutException:
         logging.error(f"无法点击 {date[:4]}年{date[4:6]}月{date[6:]}日")
@@ -229,7 +193,7 @@ try:
     )
     image_button.click()
     logging.info("已点击按钮 '下月'，进入新页面")
-    time.sleep(10)  # **短暂等待 JS 渲染**
+    wait_for_month_change(driver, month_text)  # 等待月历切换完成
 
     month_element = WebDriverWait(driver, 10).until(EC.presence_of_element_located((By.ID, "month-head")))
     # 获取 `month-head` 的文本
@@ -245,25 +209,12 @@ except Exception as e:
 # **获取下月 HTML 页面**
 html_next_month = driver.execute_script("return document.body.outerHTML;")
 
-# **正则表达式匹配 下月可预约的日期**
-pattern = re.compile(r'<td id="month_(\d+)"[^>]*onclick="javascript:selectDay\(\d+\);".*?<img[^>]*?alt="(全て空き|一部空き|予約あり)"', re.S)
+# **逐个单元格解析下月月历**
+calendar = parse_month_calendar(html_next_month)
+available_dates, partially_available_dates = split_open_dates(calendar)
 
-# **使用正则表达式提取下月可预约的日期**
-matches = list(pattern.finditer(html_next_month))  # 先把匹配项存入列表
-available_dates = []
-partially_available_dates = []
-
-if not matches:  # 如果 `matches` 为空
+if not calendar_opened(calendar):
     logging.info(f"⚠️ {month_text} 空位未开放查询")
-else:
-    for match in matches:
-        date_number = match.group(1)
-        status = match.group(2)
-
-        if status == "全て空き":
-            available_dates.append(date_number)
-        elif status == "一部空き":
-            partially_available_dates.append(date_number)
             
 
 
@@ -289,7 +240,7 @@ if available_dates != []:
 
 
     # 1️⃣4️⃣ **点击可预约的日期**
-    for date in available_dates + partially_available_dates:
+    for date in week_plan.plan(heartbeat.gate(calendar, available_dates + partially_available_dates)):
         logging.info(f"尝试点击日期：{date[:4]}年{date[4:6]}月{date[6:]}日")
     
         try:
@@ -299,45 +250,24 @@ if available_dates != []:
             date_element.click()
             logging.info(f"成功点击 {date[:4]}年{date[4:6]}月{date[6:]}日")
     
-            # ✅ **等待 `week-info` 确保时间段已加载**
-            WebDriverWait(driver, 30).until(
-                EC.presence_of_element_located((By.ID, "week-info"))
-            )
+            # ✅ **等待 `week-info` 中出现该日期的时段信息**
+            wait_for_week_slots(driver, date)
             logging.info(f"{date[:4]}年{date[4:6]}月{date[6:]}日 的时间段已加载")
     
-            # **获取最新 HTML**
-            time.sleep(10)  # **短暂等待 JS 渲染**
-            html_after_click = driver.execute_script("return document.body.outerHTML;")
-    
-            # **先清理当前日期的旧数据，防止错误数据残留**
-            availability_info = {k: v for k, v in availability_info.items() if k[0] != date}
-    
-            # **解析新数据**
-            pattern_slots = re.compile(
-                r'<input id="A_(\d{8})_(\d{2})" type="hidden" value="(\d+)">',
-                re.S
-            )
-    
-            for match in pattern_slots.finditer(html_after_click):
-                slot_date, slot_suffix, available_count = match.groups()
-    
-                # **只存入当前点击的日期，不存入其他日期**
-                if slot_date == date:
-                    slot_time = {
-                        "10": "7-9点", "20": "9-11点",
-                        "30": "11-13点", "40": "13-15点", "50": "15-17点", "60": "17-19点","70": "19-21点"
-                    }.get(slot_suffix, "未知时间段")
-    
-                    availability_info[(slot_date, slot_time)] = available_count
+            # 收下周视图中所有目标日期的时段，同一周的其他日期不再点击
+            week_plan.harvest(date, extract_week_slots(driver))
     
         except TimeoutException:
             logging.error(f"无法点击 {date[:4]}年{date[4:6]}月{date[6:]}日")
 
+week_plan.report("ariake")
+
 # **最终汇总**
 logging.info("所有可预约时间段:")
 for (date, time_slot), count in availability_info.items():
     logging.info(f"{date} | {time_slot}")
 
+record_page_metrics(driver, "ariake", "结果页")
 driver.quit()
 
 
@@ -380,48 +310,5 @@ def send_email(subject, body):
     except Exception as e:
         logging.error(f"❌ 邮件发送失败: {e}")
 
-# 📂 **读取上次的预约信息**
-last_file = "last_availability_ariake.txt"
-if os.path.exists(last_file):
-    with open(last_file, "r", encoding="utf-8") as f:
-        last_availability_ariake = f.read()
-else:
-    last_availability_ariake = ""
-
-# 📌 **按照 日期 和 时间 进行排序**
-time_order = {
-    "7-9点": 1, "9-11点": 2, "11-13点": 3,
-    "13-15点": 4, "15-17点": 5, "17-19点": 6, "19-21点": 7
-}
-
-sorted_availability = sorted(
-    availability_info.items(),
-    key=lambda x: (x[0][0], time_order.get(x[0][1], 99))  # 先按日期排序，再按时间排序
-)
-
-from datetime import datetime
-
-# 📌 **定义曜日映射**
-weekday_japanese = ["月", "火", "水", "木", "金", "土", "日"]
-
-# 📝 **当前预约信息（排序后，带星期）**
-current_availability = "\n".join([
-    f"{date[:4]}-{date[4:6]}-{date[6:]} ({weekday_japanese[datetime.strptime(date, '%Y%m%d').weekday()]}) | {time_slot} ｜ 可预约"
-    for (date, time_slot), count in sorted_availability
-])
-
-# 📌 **比较新旧数据**
-if current_availability.strip() != last_availability_ariake.strip():
-    logging.info("🔔 预约信息发生变化，发送邮件通知")
-    
-    # **📩 发送邮件**
-    email_subject = "🏸 有明-网球场预约更新通知"
-    email_body = "本次查询到的可预约时间如下：\n\n" + current_availability
-    send_email(email_subject, email_body)
-
-    # **📂 更新 `last_availability_ariake.txt`**
-    with open(last_file, "w", encoding="utf-8") as f:
-        f.write(current_availability)
-else:
-    logging.info("✅ 预约信息无变化，不发送邮件")
-
+# 📌 **与上次保存的时段集合比较，只在有新增 / 消失 / 数量变化时发送差异**
+notify_changes("ariake", slots_from_items("ariake", availability_info.items()), "🏸 有明-网球场预约更新通知", send_email, heartbeat=heartbeat)
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+按 (站点, 设施, 日期) 索引的空位存储。
+
+原来每点击一个日期都要执行
+    availability_info = {k: v for k, v in availability_info.items() if k[0] != date}
+重建整个字典（日期数的平方级），而且同一日期的时段散落在各个键里。
+这里每个日期对应一个固定宽度的时段向量：
+  - counts：array("H")，按时段代码顺序保存可预约数；
+  - mask：位掩码，第 i 位表示第 i 个时段有空位。
+替换一天的数据只是一次字典赋值，比较两天是否相同只需比较掩码与数组，序列化也只是几个整数。
+
+items() 仍按 ((日期, 时段名称), 可预约数) 返回有空位的时段，排序、日志与邮件通知的代码无需修改。
+
+WeekHarvester：点击一个日期后 #week-info 会渲染整周的 A_YYYYMMDD_NN，
+把这一周内所有目标日期一起收下，只点击还没有覆盖到的最早日期，每个周视图只点击一次。
+"""
+
+import logging
+from array import array
+from collections import defaultdict
+
+UNKNOWN_SLOT = "未知时间段"  # 与原脚本 {...}.get(slot_suffix, "未知时间段") 相同
+
+
+class DaySlots:
+    """一天的时段向量"""
+
+    __slots__ = ("counts", "mask")
+
+    def __init__(self, width, counts=None):
+        self.counts = array("H", counts if counts is not None else bytes(2 * width))
+        self.mask = 0
+        for i, count in enumerate(self.counts):
+            if count:
+                self.mask |= 1 << i
+
+    def __eq__(self, other):
+        return isinstance(other, DaySlots) and self.mask == other.mask and self.counts == other.counts
+
+    def __repr__(self):
+        return f"DaySlots(mask={self.mask:#x}, counts={self.counts.tolist()})"
+
+
+class AvailabilityStore:
+    """
+    slot_labels 为 {时段代码: 时段名称}，其顺序决定向量中各时段的位置，例如
+    {"10": "9-11点", "20": "11-13点", ...}。同一 Store 内所有日期的向量宽度相同。
+    """
+
+    def __init__(self, site, slot_labels):
+        self.site = site
+        self.slot_labels = dict(slot_labels)
+        self.slot_codes = tuple(self.slot_labels)
+        self._slot_index = {code: i for i, code in enumerate(self.slot_codes)}
+        self._days = {}  # (站点, 设施, 日期) → DaySlots
+
+    @property
+    def width(self):
+        return len(self.slot_codes)
+
+    def replace_day(self, date, rows, facility=""):
+        """
+        用 extract_week_slots() 的结果 [(日期, 时段代码, 可预约数)] 替换该日期的全部时段，
+        不属于该日期的行被忽略。返回该日数据是否发生变化。
+        """
+        counts = array("H", bytes(2 * self.width))
+        for slot_date, code, count in rows:
+            if slot_date != date:
+                continue
+            index = self._slot_index.get(code)
+            if index is None:
+                index = self._add_slot(code)
+                counts.append(0)
+            counts[index] = int(count)
+        day = DaySlots(self.width, counts)
+        key = (self.site, facility, date)
+        changed = self._days.get(key) != day
+        self._days[key] = day
+        return changed
+
+    def _add_slot(self, code):
+        """
+        页面出现 slot_labels 之外的时段代码时，与原来一样记为「未知时间段」而不丢弃：
+        在向量末尾加一位，已记录的日期补 0。返回新时段的位置。
+        """
+        logging.warning(f"⚠️ {self.site} 出现未知时段代码 {code}，记为 {UNKNOWN_SLOT}")
+        index = self.width
+        self.slot_labels[code] = UNKNOWN_SLOT
+        self.slot_codes += (code,)
+        self._slot_index[code] = index
+        for day in self._days.values():
+            day.counts.append(0)
+        return index
+
+    def day(self, date, facility=""):
+        """返回该日期的 DaySlots，没有数据时返回 None"""
+        return self._days.get((self.site, facility, date))
+
+    def dates(self):
+        """已记录的日期（按日期排序，不重复）"""
+        return sorted({date for _, _, date in self._days})
+
+    def items(self):
+        """
+        有空位的时段：((日期, 时段名称), 可预约数)。多个设施的同一 (日期, 时段) 以后记录的设施为准，
+        与原来多个设施写入同一个字典的结果一致。
+        可预约数为 0 的时段不返回（原来的字典会保存值为 "0" 的时段）：通知与状态数据库只记录有空位的时段，
+        时段变为 0 在 tennis_delta 中即为「消失」。
+        """
+        merged = {}
+        for (_, _, date), day in self._days.items():
+            mask, i = day.mask, 0
+            while mask:
+                if mask & 1:
+                    merged[(date, self.slot_labels[self.slot_codes[i]])] = day.counts[i]
+                mask >>= 1
+                i += 1
+        return merged.items()
+
+    def __len__(self):
+        return sum(bin(day.mask).count("1") for day in self._days.values())
+
+    def __eq__(self, other):
+        return (isinstance(other, AvailabilityStore) and self.slot_codes == other.slot_codes
+                and self._days == other._days)
+
+    def to_dict(self):
+        """可直接 json.dump 的紧凑结构：每个日期一行 [设施, 日期, 掩码, 可预约数...]"""
+        return {
+            "site": self.site,
+            "slots": self.slot_labels,
+            "days": [[facility, date, day.mask] + day.counts.tolist()
+                     for (_, facility, date), day in self._days.items()],
+        }
+
+    def load_days(self, rows):
+        """写入 to_dict() 格式的各日 [设施, 日期, 掩码, 可预约数...]；时段数与本 Store 不同的行（时段定义已改变）被忽略"""
+        for facility, date, _, *counts in rows:
+            if len(counts) == self.width:
+                self._days[(self.site, facility, date)] = DaySlots(self.width, counts)
+
+    @classmethod
+    def from_dict(cls, data):
+        store = cls(data["site"], data["slots"])
+        store.load_days(data["days"])
+        return store
+
+
+class WeekHarvester:
+    """
+    点击计划：
+
+        harvester = WeekHarvester(availability_info)
+        for date in harvester.plan(dates):
+            ...点击 date 并等待 wait_for_week_slots(driver, date)...
+            harvester.harvest(date, extract_week_slots(driver))
+        harvester.report("ariake")
+
+    plan() 总是给出尚未覆盖的最早日期；harvest() 把周视图覆盖的日期范围内所有目标日期写入 Store
+    （范围内没有时段的目标日期记为无空位），这些日期不再点击。点击失败的日期直接跳过。
+    同一个 harvester 可以多次 plan()（下月、其他设施），report() 汇总整次运行。
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self.targets = 0
+        self.clicks = 0
+        self._pending = []
+        self._facility = ""
+
+    def plan(self, dates, facility=""):
+        self._pending = sorted(set(dates))
+        self._facility = facility
+        self.targets += len(self._pending)
+        while self._pending:
+            date = self._pending[0]
+            self.clicks += 1
+            yield date
+            if date in self._pending:
+                self._pending.remove(date)
+
+    def harvest(self, clicked, rows):
+        """记录一次点击得到的周视图 rows=[(日期, 时段代码, 可预约数)]"""
+        view = defaultdict(list)
+        for row in rows:
+            view[row[0]].append(row)
+        shown = set(view) | {clicked}
+        first, last = min(shown), max(shown)
+        for date in [d for d in self._pending if first <= d <= last]:
+            self.store.replace_day(date, view.get(date, ()), self._facility)
+            self._pending.remove(date)
+
+    def report(self, site):
+        saved = self.targets - self.clicks
+        logging.info(f"🗓️ {site}：{self.targets} 个日期点击了 {self.clicks} 次，按周收集节省 {saved} 次点击")
+        return saved
@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+放出时刻的突发模式：下月空位一次性放出的时刻前后，提高查询频率，放出后立即做日级别查询。
+
+下月未开放时各脚本只记录“空位未开放查询”，放出的那一刻整月的空位同时出现，延迟最重要。
+  - 放出时刻：环境变量 TENNIS_RELEASE_TIMES 配置（如 "ariake=1 09:00;okubo=15 09:00"，每月几日 几点），
+    未配置的站点从以前的观测中学习：突发模式检测到的放出时刻（release_times.json）优先，
+    否则取状态数据库中每个月的日期第一次出现的时刻，按 (日, 小时) 取出现最多的一次；
+  - 放出前 BURST_LEAD 秒：先各运行一次该站点的 Job，浏览器会话停在结果页（tennis_session 保存），
+    同时用 HTTP 客户端建立会话并检索到月历页；
+  - 之后每 BURST_POLL 秒重新检索并切换到下月，月历中出现状态图标即视为放出，
+    最多持续到放出时刻后 BURST_WINDOW 秒；
+  - 放出后立即运行该站点的所有 Job（恢复保存的会话，跳过首页导航），并记录检测到的放出时刻。
+
+中野区的时间表按日查询，没有整月放出的时刻，不在此列。
+
+    python tennis_orchestrator.py --burst     # 调度时启用突发模式
+    python tennis_burst.py next               # 各站点下一次放出时刻及其来源
+    python tennis_burst.py watch ariake       # 立即开始轮询，直到下月开放
+"""
+
+import os
+import json
+import time
+import logging
+import argparse
+import calendar
+from collections import Counter
+from datetime import datetime, timedelta
+
+from tennis_parse import parse_month_calendar, calendar_opened
+from tennis_state_db import StateDB
+
+BURST_LEAD = int(os.getenv("TENNIS_BURST_LEAD", "300"))  # 放出前多少秒开始预热
+BURST_POLL = float(os.getenv("TENNIS_BURST_POLL", "5"))  # 轮询月历的间隔（秒）
+BURST_WINDOW = int(os.getenv("TENNIS_BURST_WINDOW", "1800"))  # 放出时刻后最多轮询多少秒
+RELEASE_FILE = "release_times.json"
+
+# 轮询目标：名称 → (门户, 检索参数, 放出后运行的 Job)
+# metro 查询全部四个公园，因此出现在每个都立公园目标中；同时放出时只运行一次（Orchestrator.watch_release）
+BURST_TARGETS = {
+    "ariake": ("metro", ("1000_1020", "1350"), ("ariake", "ariake_new", "metro")),
+    "toneri": ("metro", ("1000_1030", "1140"), ("toneri", "toneri_new", "metro")),
+    "oi_A": ("metro", ("1000_1020", "1310"), ("oi_A", "metro")),
+    "oi_B": ("metro", ("1000_1020", "1315"), ("oi_B", "metro")),
+    "okubo": ("regasu", ("大久保スポーツプラザ（庭球場）",), ("okubo",)),
+}
+
+
+def configured_releases():
+    """TENNIS_RELEASE_TIMES → {目标: (日, 时, 分)}"""
+    releases = {}
+    for item in os.getenv("TENNIS_RELEASE_TIMES", "").split(";"):
+        if not item.strip():
+            continue
+        try:
+            name, moment = item.split("=", 1)
+            day, clock = moment.split()
+            hour, minute = clock.split(":")
+            releases[name.strip()] = (int(day), int(hour), int(minute))
+        except ValueError:
+            logging.warning(f"⚠️ 无法解析放出时刻配置：{item}")
+    return releases
+
+
+def load_detected():
+    try:
+        with open(RELEASE_FILE, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def record_detected(name, opened_at):
+    detected = load_detected()
+    detected.setdefault(name, []).append(opened_at)
+    tmp_file = RELEASE_FILE + ".tmp"
+    with open(tmp_file, "w", encoding="utf-8") as f:
+        json.dump(detected, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_file, RELEASE_FILE)
+
+
+def first_appearances(db, sites):
+    """各个月的日期在状态数据库中第一次出现的时刻；记录开始时已经存在的月份除外"""
+    placeholders = ", ".join("?" * len(sites))
+    first_taken = db.conn.execute(
+        f"SELECT MIN(taken_at) FROM snapshots WHERE site IN ({placeholders})", sites
+    ).fetchone()[0]
+    rows = db.conn.execute(
+        f"""
+        SELECT substr(replace(slots.date, '-', ''), 1, 6) AS month, MIN(snapshots.taken_at)
+        FROM slots JOIN snapshots ON snapshots.id = slots.snapshot_id
+        WHERE slots.site IN ({placeholders}) GROUP BY month
+        """,
+        sites,
+    ).fetchall()
+    return [taken_at for _, taken_at in rows if taken_at > first_taken]
+
+
+def learned_release(name, db_path=None):
+    """
+    从观测中学习放出时刻 (日, 时, 0)。突发模式检测到的时刻精确到秒，优先使用；
+    状态数据库中的时刻晚于实际放出最多一个查询间隔，只取到小时。
+    """
+    moments = load_detected().get(name)
+    if not moments:
+        with StateDB(db_path) as db:
+            moments = first_appearances(db, list(BURST_TARGETS[name][2]))
+    if not moments:
+        return None
+    local = [time.localtime(ts) for ts in moments]
+    (day, hour), _ = Counter((t.tm_mday, t.tm_hour) for t in local).most_common(1)[0]
+    return day, hour, 0
+
+
+def release_at(day, hour, minute, year, month):
+    """该月的放出时刻；日超过月末时取月末"""
+    day = min(day, calendar.monthrange(year, month)[1])
+    return datetime(year, month, day, hour, minute).timestamp()
+
+
+def next_release(name, now=None, db_path=None):
+    """
+    下一次放出时刻（时间戳）及来源 "配置" / "学习"；无法确定时返回 (None, None)。
+    放出时刻已过但仍在轮询窗口内时返回本次。
+    """
+    now = time.time() if now is None else now
+    moment, source = configured_releases().get(name), "配置"
+    if moment is None:
+        moment, source = learned_release(name, db_path), "学习"
+    if moment is None:
+        return None, None
+    today = datetime.fromtimestamp(now)
+    release = release_at(*moment, today.year, today.month)
+    if release + BURST_WINDOW < now:
+        following = today.replace(day=1) + timedelta(days=32)
+        release = release_at(*moment, following.year, following.month)
+    return release, source
+
+
+class MonthPoller:
+    """一个 HTTP 会话：预热到月历页后反复检索并切换到下月，判断下月是否已开放"""
+
+    def __init__(self, name):
+        self.name = name
+        self.portal, self.search_args, _ = BURST_TARGETS[name]
+        self.client = None
+        self.home = None
+
+    def warm(self):
+        if self.portal == "regasu":
+            from tennis_regasu_http import RegasuPortalClient
+            self.client = RegasuPortalClient()
+        else:
+            from tennis_metro_http import MetroPortalClient
+            self.client = MetroPortalClient()
+        self.client.open_home()
+        self.home = self.client.page
+        self._search()
+        logging.info(f"🔥 {self.name} 会话已预热到月历页")
+
+    def _search(self):
+        self.client.search(*self.search_args)
+        if self.portal == "regasu":
+            self.client.show_month()
+
+    def next_month_opened(self):
+        # 检索后 page 变为月历页，从保存的首页重新提交，得到最新的月历
+        self.client.page = self.home
+        self._search()
+        self.client.next_month()
+        return calendar_opened(parse_month_calendar(self.client.view))
+
+
+def wait_for_release(name, deadline, poll=BURST_POLL):
+    """
+    在线程中运行：轮询直到下月开放（返回检测到的时刻）或超过 deadline（返回 None）。
+    请求出错时重新预热会话后继续。
+    """
+    poller = MonthPoller(name)
+    polls = 0
+    while time.time() < deadline:
+        started = time.time()
+        try:
+            if poller.client is None:
+                poller.warm()
+            polls += 1
+            if poller.next_month_opened():
+                logging.info(f"🎉 {name} 下月已开放（轮询 {polls} 次）")
+                return started
+        except Exception as e:
+            logging.warning(f"⚠️ {name} 轮询月历失败，重新建立会话: {e}")
+            poller.client = None
+        time.sleep(max(poll - (time.time() - started), 0))
+    logging.info(f"⌛ {name} 在轮询窗口内未开放（轮询 {polls} 次）")
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="放出时刻的突发模式")
+    parser.add_argument("--db", help="状态数据库路径")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("next", help="各站点下一次放出时刻及其来源")
+    watch = sub.add_parser("watch", help="立即开始轮询，直到下月开放")
+    watch.add_argument("name", choices=sorted(BURST_TARGETS))
+    watch.add_argument("--window", type=int, default=BURST_WINDOW, help="最多轮询多少秒")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    if args.command == "watch":
+        opened_at = wait_for_release(args.name, time.time() + args.window)
+        if opened_at:
+            record_detected(args.name, opened_at)
+        return
+    for name in BURST_TARGETS:
+        release, source = next_release(name, db_path=args.db)
+        when = time.strftime("%Y-%m-%d %H:%M", time.localtime(release)) if release else "-"
+        print(f"{name:<8}{when:<18}{source or '未知'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+时段级别的变化检测与通知。
+
+原来各脚本把本次结果格式化成文本，与 last_availability_<site>.txt 整体比较：
+顺序或格式一变就算“有变化”，邮件每次都重发全部列表。
+这里把结果表示为 {SlotKey(站点, 设施, 日期, 时段): 可预约数}，与上次保存的集合比较，
+得到 新增 / 消失 / 数量变化 三组；只有存在差异时才发送邮件（只列出差异）。
+每次查询的结果记录在 tennis_state_db.py 的 SQLite 数据库中，并追加到 tennis_history.py 的历史。
+
+    python tennis_delta.py --bench                       # 默认 20 个站点 × 60 天，约 1.2 万个时段
+    python tennis_delta.py --bench --sites 50 --days 90
+"""
+
+import os
+import re
+import json
+import time
+import random
+import logging
+import argparse
+from collections import namedtuple
+from datetime import datetime
+
+from tennis_history import append_history
+
+SlotKey = namedtuple("SlotKey", "site facility date slot")
+SlotDelta = namedtuple("SlotDelta", "added removed changed")  # changed: {键: (旧数量, 新数量)}
+
+LEGACY_STATE_FILE = "last_slots_{site}.json"  # 改用 SQLite 之前的状态文件，首次运行时导入
+LEGACY_TEXT_FILE = "last_availability_{site}.txt"  # 更早的各脚本保存的文本，同样在首次运行时导入
+WEEKDAY_JAPANESE = ["月", "火", "水", "木", "金", "土", "日"]
+
+
+def slots_from_items(site, items, facility=""):
+    """AvailabilityStore.items() / {(日期, 时段): 数量} 的 items() → {SlotKey: 数量}"""
+    return {SlotKey(site, facility, date, slot): int(count) for (date, slot), count in items}
+
+
+def slots_from_entries(site, entries):
+    """中野区等脚本的 [{"date", "facility", "time"}] → {SlotKey: None}（没有可预约数）"""
+    return {SlotKey(site, entry.get("facility", ""), entry["date"], entry["time"]): None for entry in entries}
+
+
+def diff_slots(previous, current):
+    """比较两个 {SlotKey: 数量}，返回 SlotDelta(新增, 消失, 数量变化)"""
+    added = {key: current[key] for key in current.keys() - previous.keys()}
+    removed = {key: previous[key] for key in previous.keys() - current.keys()}
+    changed = {
+        key: (previous[key], current[key])
+        for key in current.keys() & previous.keys()
+        if previous[key] != current[key]
+    }
+    return SlotDelta(added, removed, changed)
+
+
+def has_changes(delta):
+    return bool(delta.added or delta.removed or delta.changed)
+
+
+def _load_legacy_state(site, current):
+    """读取 last_slots_{site}.json，没有时读取 last_availability_{site}.txt；返回 ({SlotKey: 数量}, 保存时间)"""
+    path = LEGACY_STATE_FILE.format(site=site)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            rows = json.load(f)
+    except (OSError, ValueError):
+        return _load_legacy_text(site, current)
+    return {SlotKey(site, facility, date, slot): count for facility, date, slot, count in rows}, os.path.getmtime(path)
+
+
+def _load_legacy_text(site, current):
+    """
+    解析原脚本保存的文本，每行为
+        2025-02-08 (土) | 9-11点 | 可预约：2 人
+        2025-02-08 (土) | 9:00～11:00 | 庭球場第１コート     （哲学堂新版：第三列是设施）
+    日期按本次结果的格式还原（ariake 等为 YYYYMMDD，中野区为 YYYY-MM-DD）。
+    文本中没有可预约数的时段沿用本次的数量，避免导入后每个时段都被当作“数量变化”。
+    """
+    path = LEGACY_TEXT_FILE.format(site=site)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            lines = f.read().splitlines()
+    except OSError:
+        return None, None
+    compact = any(re.fullmatch(r"\d{8}", key.date) for key in current)
+    slots = {}
+    for line in lines:
+        parts = [part.strip() for part in line.replace("｜", "|").split("|")]
+        if len(parts) < 2 or not parts[1]:
+            continue
+        date = re.sub(r"\s*\(.\)$", "", parts[0])
+        if compact and re.fullmatch(r"\d{4}-\d{2}-\d{2}", date):
+            date = date.replace("-", "")
+        count, rest = None, []
+        for part in parts[2:]:
+            if part.startswith("可预约"):
+                number = re.search(r"\d+", part)
+                count = int(number.group(0)) if number else None
+            elif part:
+                rest.append(part)
+        key = SlotKey(site, rest[0] if rest else "", date, parts[1])
+        slots[key] = count if count is not None else current.get(key)
+    return slots, os.path.getmtime(path)
+
+
+def _slot_order(item):
+    """按 日期、时段开始时间（"9-11点" 排在 "11-13点" 之前）、设施 排序"""
+    key = item[0]
+    return key.date, tuple(int(n) for n in re.findall(r"\d+", key.slot)), key.facility
+
+
+def _weekday(date):
+    for fmt in ("%Y%m%d", "%Y-%m-%d"):
+        try:
+            return WEEKDAY_JAPANESE[datetime.strptime(date, fmt).weekday()]
+        except ValueError:
+            continue
+    return None
+
+
+def _slot_text(key):
+    """2025-02-08 (土) | 设施 | 9-11点"""
+    date = key.date
+    if re.fullmatch(r"\d{8}", date):
+        date = f"{date[:4]}-{date[4:6]}-{date[6:]}"
+    weekday = _weekday(key.date)
+    parts = [f"{date} ({weekday})" if weekday else date]
+    if key.facility:
+        parts.append(key.facility)
+    parts.append(key.slot)
+    return " | ".join(parts)
+
+
+def format_slot(key, count):
+    """一行：2025-02-08 (土) | 设施 | 9-11点 | 可预约：2 人"""
+    return f"{_slot_text(key)} | " + (f"可预约：{count} 人" if count is not None else "可预约")
+
+
+def format_delta(delta, total):
+    sections = []
+    if delta.added:
+        sections.append("🆕 新增的可预约时间：\n" + "\n".join(
+            format_slot(key, count) for key, count in sorted(delta.added.items(), key=_slot_order)))
+    if delta.changed:
+        sections.append("🔄 可预约数变化：\n" + "\n".join(
+            f"{format_slot(key, new)}（原 {old} 人）"
+            for key, (old, new) in sorted(delta.changed.items(), key=_slot_order)))
+    if delta.removed:
+        sections.append("❌ 已无空位：\n" + "\n".join(
+            _slot_text(key) for key, _ in sorted(delta.removed.items(), key=_slot_order)))
+    sections.append(f"当前共 {total} 个可预约时段。")
+    return "\n\n".join(sections)
+
+
+def notify_changes(site, slots, subject, send, db_path=None, heartbeat=None):
+    """
+    把本次结果记录到状态数据库，并与上次的结果比较；有差异时调用 send(subject, body) 只发送差异。
+    heartbeat（tennis_heartbeat.CalendarHeartbeat）的缓存与本次快照在同一事务中写入。
+    返回 SlotDelta。
+    """
+    from tennis_state_db import StateDB  # tennis_state_db 依赖本模块，在这里导入避免循环导入
+
+    with StateDB(db_path) as db:
+        if not db.has_site(site):
+            legacy, saved_at = _load_legacy_state(site, slots)
+            if legacy is not None:
+                db.record_snapshot(site, legacy, taken_at=saved_at)
+                logging.info(f"📥 已导入 {site} 以前的状态文件（{len(legacy)} 个时段）")
+        _, delta = db.record_snapshot(site, slots, before_commit=heartbeat.write if heartbeat else None)
+
+    if not has_changes(delta):
+        logging.info("✅ 预约信息无变化，不发送邮件")
+    else:
+        logging.info(
+            f"🔔 预约信息发生变化（新增 {len(delta.added)} / 消失 {len(delta.removed)} / "
+            f"数量变化 {len(delta.changed)}），发送邮件通知"
+        )
+        send(subject, format_delta(delta, len(slots)))
+    # 每次查询的最终结果都追加到历史，供分析何时放出空位；放在发送之后，历史出错不会耽误通知
+    append_history(slots)
+    return delta
+
+
+# ---------------------------
+# 基准测试
+# ---------------------------
+def _sample_watchlist(sites, days, rng):
+    labels = ["7-9点", "9-11点", "11-13点", "13-15点", "15-17点", "17-19点", "19-21点"]
+    slots = {}
+    for s in range(sites):
+        for d in range(days):
+            date = f"2025{1 + d // 28:02d}{1 + d % 28:02d}"
+            for facility in ("", "2面"):
+                for label in labels:
+                    if rng.random() < 0.7:
+                        slots[SlotKey(f"site{s}", facility, date, label)] = rng.randint(1, 4)
+    return slots
+
+
+def _mutate(slots, rng, ratio=0.02):
+    current = dict(slots)
+    for key in rng.sample(sorted(current), int(len(current) * ratio)):
+        roll = rng.random()
+        if roll < 0.4:
+            del current[key]
+        elif roll < 0.7:
+            current[key] = current[key] % 4 + 1
+        else:
+            current[key._replace(slot="21-23点")] = 1
+    return current
+
+
+def _legacy_text(slots):
+    return "\n".join(format_slot(key, count) for key, count in sorted(slots.items(), key=_slot_order))
+
+
+def bench(sites=20, days=60, repeat=20):
+    rng = random.Random(0)
+    previous = _sample_watchlist(sites, days, rng)
+    current = _mutate(previous, rng)
+    print(f"{sites} 个站点 × {days} 天：上次 {len(previous)} 个时段，本次 {len(current)} 个时段")
+
+    started = time.perf_counter()
+    for _ in range(repeat):
+        delta = diff_slots(previous, current)
+    delta_ms = (time.perf_counter() - started) * 1000 / repeat
+    print(f"差异计算     {delta_ms:8.3f} ms  新增 {len(delta.added)} / 消失 {len(delta.removed)} / 变化 {len(delta.changed)}")
+
+    last_text = _legacy_text(previous)
+    started = time.perf_counter()
+    for _ in range(repeat):
+        changed = _legacy_text(current).strip() != last_text.strip()
+    text_ms = (time.perf_counter() - started) * 1000 / repeat
+    print(f"整体文本比较 {text_ms:8.3f} ms  只知道“有变化”={changed}")
+
+    body = format_delta(delta, len(current))
+    print(f"邮件正文     差异 {len(body.encode())} 字节 / 全部列表 {len(_legacy_text(current).encode())} 字节")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="时段差异检测")
+    parser.add_argument("--bench", action="store_true", help="对大规模关注列表做基准测试")
+    parser.add_argument("--sites", type=int, default=20)
+    parser.add_argument("--days", type=int, default=60)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    if args.bench:
+        bench(args.sites, args.days, args.repeat)
+    else:
+        parser.print_help()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,714 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+所有网球场脚本共用的 Chrome WebDriver 创建逻辑，以及常驻的预热浏览器池。
+
+用法：
+    # 启动浏览器池守护进程（保持 3 个预热好的 Chrome）
+    python tennis_driver.py pool --size 3
+
+    # 脚本中获取 driver（有池则租用，无池则冷启动）
+    from tennis_driver import create_driver
+    driver = create_driver("ariake")
+    ...
+    driver.quit()  # 租用的 driver 会归还给池，而不是关闭浏览器
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import socket
+import logging
+import argparse
+import subprocess
+import tempfile
+import threading
+import socketserver
+from urllib.parse import urlparse
+
+from selenium import webdriver
+from selenium.webdriver.chrome.service import Service
+from selenium.webdriver.chrome.options import Options
+from selenium.webdriver.support.events import EventFiringWebDriver, AbstractEventListener
+from selenium.common.exceptions import WebDriverException
+
+from webdriver_manager.chrome import ChromeDriverManager
+
+from tennis_ratelimit import throttle_host
+from tennis_session import update_json
+
+# ---------------------------
+# 浏览器配置
+# ---------------------------
+USER_AGENT = (
+    "user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+    "AppleWebKit/537.36 (KHTML, like Gecko) Chrome/131.0.0.0 Safari/537.36"
+)
+
+CHROME_ARGUMENTS = [
+    "--headless",  # 无头模式运行
+    "--disable-gpu",
+    "--window-size=1920x1080",
+    "--no-sandbox",
+    "--disable-dev-shm-usage",
+    "--disable-blink-features=AutomationControlled",
+    USER_AGENT,
+]
+
+# 精简模式：只读取 HTML 属性的站点不需要加载图片、字体、样式等资源
+# TENNIS_LEAN_PROFILE=1 对所有站点启用，也可以写成逗号分隔的站点名，如 "ariake,toneri"
+LEAN_PROFILE = os.getenv("TENNIS_LEAN_PROFILE", "")
+
+LEAN_ARGUMENTS = [
+    "--window-size=1024,768",
+    "--blink-settings=imagesEnabled=false",
+    "--disable-remote-fonts",
+    "--disable-extensions",
+    "--disable-default-apps",
+    "--disable-sync",
+    "--disable-background-networking",
+    "--disable-features=Translate,MediaRouter,OptimizationHints",
+    "--mute-audio",
+    "--hide-scrollbars",
+]
+
+# 通过 DevTools 的 Network.setBlockedURLs 拦截的请求
+LEAN_BLOCKED_EXTENSIONS = [
+    "png", "jpg", "jpeg", "gif", "webp", "svg", "ico", "bmp",
+    "css", "woff", "woff2", "ttf", "otf", "eot",
+    "mp3", "mp4", "webm", "ogg",
+]
+LEAN_BLOCKED_HOSTS = [
+    "google-analytics.com",
+    "googletagmanager.com",
+    "doubleclick.net",
+    "fonts.googleapis.com",
+    "fonts.gstatic.com",
+]
+LEAN_BLOCKED_URLS = (
+    [f"*.{ext}" for ext in LEAN_BLOCKED_EXTENSIONS]
+    + [f"*.{ext}?*" for ext in LEAN_BLOCKED_EXTENSIONS]
+    + [f"*{host}*" for host in LEAN_BLOCKED_HOSTS]
+)
+# 各站点在完整/精简模式下的传输量与加载时间统计
+LEAN_STATS_FILE = "lean_profile_stats.json"
+
+# 浏览器池的 Unix socket 地址，可用环境变量覆盖
+POOL_SOCKET = os.getenv("TENNIS_DRIVER_POOL", "/tmp/tennis_driver_pool.sock")
+# 浏览器池预热端口的起始值（每个会话一个 remote-debugging-port）
+POOL_BASE_PORT = 9300
+# 租用时最多等待多少秒，超时则退回冷启动
+LEASE_TIMEOUT = 60
+
+# chromedriver 解析结果的缓存文件（记录 Chrome 指纹与 chromedriver 路径）
+CHROMEDRIVER_CACHE = os.getenv(
+    "TENNIS_CHROMEDRIVER_CACHE", os.path.expanduser("~/.cache/tenniscourt/chromedriver.json")
+)
+# 按顺序查找本机的 Chrome 可执行文件
+CHROME_BINARIES = ["google-chrome", "google-chrome-stable", "chromium", "chromium-browser"]
+
+# 归还时需要清理存储数据的门户站点
+PORTAL_ORIGINS = [
+    "https://kouen.sports.metro.tokyo.lg.jp",
+    "https://www.shinjuku.eprs.jp",
+    "https://user.shinjuku-shisetsu-yoyaku.jp",
+    "https://yoyaku.nakano-tokyo.jp",
+]
+
+
+# ---------------------------
+# chromedriver 离线解析
+# ---------------------------
+_resolved_chromedriver = None
+
+
+def find_chrome_binary():
+    """返回本机 Chrome 的真实路径，找不到时返回 None"""
+    candidates = [os.getenv("TENNIS_CHROME_BINARY")] + [shutil.which(name) for name in CHROME_BINARIES]
+    for candidate in candidates:
+        if candidate and os.path.exists(candidate):
+            real = os.path.realpath(candidate)
+            # google-chrome 通常是包装脚本，真正的二进制文件在同目录下的 chrome
+            sibling = os.path.join(os.path.dirname(real), "chrome")
+            return sibling if os.path.isfile(sibling) else real
+    return None
+
+
+def chrome_fingerprint(binary):
+    """以路径、大小和修改时间作为 Chrome 版本指纹，无需执行浏览器"""
+    if binary is None:
+        return "unknown"
+    stat = os.stat(binary)
+    return f"{binary}:{stat.st_size}:{int(stat.st_mtime)}"
+
+
+def _chrome_version(binary):
+    if binary is None:
+        return ""
+    try:
+        result = subprocess.run([binary, "--version"], capture_output=True, text=True, timeout=10)
+        return result.stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return ""
+
+
+def _load_chromedriver_cache():
+    try:
+        with open(CHROMEDRIVER_CACHE, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_chromedriver_cache(cache):
+    os.makedirs(os.path.dirname(CHROMEDRIVER_CACHE), exist_ok=True)
+    tmp_file = CHROMEDRIVER_CACHE + ".tmp"
+    with open(tmp_file, "w", encoding="utf-8") as f:
+        json.dump(cache, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_file, CHROMEDRIVER_CACHE)
+
+
+def resolve_chromedriver():
+    """
+    返回与本机 Chrome 匹配的 chromedriver 路径。
+    Chrome 指纹未变化时直接使用缓存路径（零网络 I/O），
+    只有 Chrome 被升级/替换后才调用 ChromeDriverManager 重新解析。
+    """
+    global _resolved_chromedriver
+    if _resolved_chromedriver:
+        return _resolved_chromedriver
+
+    started = time.monotonic()
+    binary = find_chrome_binary()
+    fingerprint = chrome_fingerprint(binary)
+    cache = _load_chromedriver_cache()
+    cached_path = cache.get("driver_path")
+    cached_ok = bool(cached_path) and os.access(cached_path, os.X_OK)
+
+    if cached_ok and cache.get("fingerprint") == fingerprint:
+        elapsed_ms = (time.monotonic() - started) * 1000
+        saved_ms = max(cache.get("resolve_ms", 0) - elapsed_ms, 0)
+        logging.info(
+            f"⏱️ chromedriver 解析耗时 {elapsed_ms:.0f} ms（缓存命中，"
+            f"{cache.get('chrome_version') or 'Chrome'}，节省约 {saved_ms:.0f} ms）"
+        )
+        _resolved_chromedriver = cached_path
+        return cached_path
+
+    try:
+        driver_path = ChromeDriverManager().install()
+    except Exception as e:
+        if not cached_ok:
+            raise
+        # 离线时无法重新解析，退回到上次的 chromedriver
+        logging.warning(f"⚠️ chromedriver 重新解析失败，继续使用缓存路径 {cached_path}: {e}")
+        _resolved_chromedriver = cached_path
+        return cached_path
+
+    elapsed_ms = (time.monotonic() - started) * 1000
+    chrome_version = _chrome_version(binary)
+    _save_chromedriver_cache({
+        "fingerprint": fingerprint,
+        "chrome_binary": binary,
+        "chrome_version": chrome_version,
+        "driver_path": driver_path,
+        "resolve_ms": round(elapsed_ms),
+        "resolved_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+    })
+    logging.info(
+        f"⏱️ chromedriver 解析耗时 {elapsed_ms:.0f} ms（Chrome 已变化或首次运行，"
+        f"{chrome_version or '版本未知'}，已写入缓存）"
+    )
+    _resolved_chromedriver = driver_path
+    return driver_path
+
+
+def build_chrome_options(extra_arguments=None, lean=False):
+    """返回所有脚本共用的 Chrome Options；lean=True 时附加精简模式参数"""
+    options = Options()
+    for argument in CHROME_ARGUMENTS:
+        if lean and argument.startswith("--window-size="):
+            continue
+        options.add_argument(argument)
+    for argument in LEAN_ARGUMENTS if lean else []:
+        options.add_argument(argument)
+    for argument in extra_arguments or []:
+        options.add_argument(argument)
+    return options
+
+
+def launch_driver(extra_arguments=None, lean=False):
+    """冷启动一个全新的 Chrome"""
+    service = Service(resolve_chromedriver())
+    return webdriver.Chrome(service=service, options=build_chrome_options(extra_arguments, lean))
+
+
+# ---------------------------
+# 精简模式
+# ---------------------------
+def lean_enabled(site):
+    """判断该站点是否启用精简模式"""
+    value = LEAN_PROFILE.strip()
+    if value.lower() in ("", "0", "false", "no"):
+        return False
+    if value.lower() in ("1", "true", "yes", "all"):
+        return True
+    return site in [name.strip() for name in value.split(",")]
+
+
+def apply_lean_profile(driver):
+    """通过 DevTools 拦截图片、字体、样式、媒体和第三方请求"""
+    driver.execute_cdp_cmd("Network.enable", {})
+    driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": LEAN_BLOCKED_URLS})
+    driver.lean_profile = True
+
+
+_PAGE_METRICS_JS = """
+const nav = performance.getEntriesByType('navigation')[0];
+const resources = performance.getEntriesByType('resource');
+let bytes = nav ? (nav.transferSize || 0) : 0;
+for (const r of resources) { bytes += r.transferSize || 0; }
+return {
+    bytes: bytes,
+    load_ms: nav && nav.loadEventEnd ? nav.loadEventEnd - nav.startTime : performance.now(),
+    requests: resources.length + 1
+};
+"""
+
+
+def record_page_metrics(driver, site, page):
+    """
+    记录当前页面的传输字节数与加载时间，并与另一模式的历史平均值比较，
+    输出精简模式相对完整模式节省的字节数和加载时间。
+    """
+    try:
+        sample = driver.execute_script(_PAGE_METRICS_JS)
+    except WebDriverException as e:
+        logging.warning(f"⚠️ 读取页面性能数据失败（{page}）: {e}")
+        return
+
+    profile = "lean" if getattr(driver, "lean_profile", False) else "full"
+    # 与其他站点的线程 / 进程共用统计文件，读取到写回都在锁内
+    with update_json(LEAN_STATS_FILE) as stats:
+        pages = stats.setdefault(site, {}).setdefault(page, {})
+        entry = pages.setdefault(profile, {"count": 0, "bytes_total": 0, "load_ms_total": 0})
+        entry["count"] += 1
+        entry["bytes_total"] += int(sample["bytes"])
+        entry["load_ms_total"] += int(sample["load_ms"])
+
+    message = (
+        f"🪶 {site} {page}：传输 {sample['bytes'] / 1024:.0f} KB，"
+        f"{sample['requests']} 个请求，加载 {sample['load_ms']:.0f} ms（{'精简' if profile == 'lean' else '完整'}模式）"
+    )
+    full, lean = pages.get("full"), pages.get("lean")
+    if full and lean:
+        saved_kb = (full["bytes_total"] / full["count"] - lean["bytes_total"] / lean["count"]) / 1024
+        saved_ms = full["load_ms_total"] / full["count"] - lean["load_ms_total"] / lean["count"]
+        message += f"；精简模式平均节省 {saved_kb:.0f} KB / {saved_ms:.0f} ms"
+    logging.info(message)
+
+
+# ---------------------------
+# 客户端：从浏览器池租用
+# ---------------------------
+class PooledChrome(webdriver.Chrome):
+    """
+    连接到池中预热好的 Chrome（通过 debugger_address）。
+    quit() 只断开 chromedriver 并归还租约，浏览器本身由池负责重置和复用。
+    """
+
+    def __init__(self, lease_conn, lease_info):
+        self._lease_conn = lease_conn
+        self.lease_info = lease_info
+        options = Options()
+        options.debugger_address = lease_info["debugger_address"]
+        service = Service(resolve_chromedriver())
+        super().__init__(service=service, options=options)
+
+    def quit(self):
+        try:
+            super().quit()
+        finally:
+            _release_lease(self._lease_conn)
+            self._lease_conn = None
+
+
+def _release_lease(conn):
+    if conn is None:
+        return
+    try:
+        conn.sendall(b'{"cmd": "release"}\n')
+    except OSError:
+        pass
+    finally:
+        conn.close()
+
+
+def _pool_request(conn, payload, timeout):
+    """发送一行 JSON 请求并读取一行 JSON 响应"""
+    conn.settimeout(timeout)
+    conn.sendall((json.dumps(payload) + "\n").encode("utf-8"))
+    reader = conn.makefile("r", encoding="utf-8")
+    line = reader.readline()
+    if not line:
+        raise ConnectionError("浏览器池连接已关闭")
+    return json.loads(line)
+
+
+def lease_driver(site, address=POOL_SOCKET, timeout=LEASE_TIMEOUT):
+    """
+    从浏览器池租用一个 driver。
+    池不可用或等待超时时返回 None，由调用方决定是否冷启动。
+    """
+    if not os.path.exists(address):
+        return None
+    conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        conn.connect(address)
+        reply = _pool_request(conn, {"cmd": "lease", "site": site, "timeout": timeout}, timeout + 5)
+    except (OSError, ValueError) as e:
+        conn.close()
+        logging.warning(f"⚠️ 浏览器池不可用，改为冷启动: {e}")
+        return None
+
+    if not reply.get("ok"):
+        conn.close()
+        logging.warning(f"⚠️ 浏览器池租用失败（{reply.get('error')}），改为冷启动")
+        return None
+
+    conn.settimeout(None)
+    try:
+        driver = PooledChrome(conn, reply)
+    except WebDriverException as e:
+        _release_lease(conn)
+        logging.warning(f"⚠️ 连接池中 Chrome 失败，改为冷启动: {e}")
+        return None
+    logging.info(
+        f"♻️ 从浏览器池租用 Chrome（槽位 {reply['slot']}，等待 {reply['wait_ms']} ms）"
+    )
+    return driver
+
+
+class ThrottleListener(AbstractEventListener):
+    """
+    打开页面与点击之前按门户主机的令牌桶等待（tennis_ratelimit.py）。
+    主机在 get() 时记下，点击时不再读取 driver.current_url（每次都是一次 WebDriver 往返）。
+    """
+
+    def __init__(self):
+        self.host = None
+
+    def before_navigate_to(self, url, driver):
+        self.host = urlparse(url).hostname
+        throttle_host(self.host)
+
+    def before_click(self, element, driver):
+        if self.host is None:  # 还没有 get() 过（如租用的会话停在门户页面上），只读取一次
+            self.host = urlparse(driver.current_url).hostname
+        throttle_host(self.host)
+
+
+def create_driver(site, isolated_profile=False):
+    """
+    获取一个可用的 driver：优先从浏览器池租用，否则冷启动。
+    isolated_profile=True 时冷启动使用独立的临时用户目录（供并发运行的脚本使用）。
+    站点在 TENNIS_LEAN_PROFILE 中启用时，返回的 driver 使用精简模式。
+    返回的 driver 在打开页面与点击前按门户的令牌桶限速。
+    """
+    lean = lean_enabled(site)
+    driver = lease_driver(site)
+    if driver is None:
+        extra_arguments = []
+        if isolated_profile:
+            extra_arguments.append(f"--user-data-dir={tempfile.mkdtemp()}")
+        started = time.monotonic()
+        driver = launch_driver(extra_arguments, lean)
+        logging.info(f"🚀 冷启动 Chrome 耗时 {(time.monotonic() - started) * 1000:.0f} ms")
+
+    if lean:
+        apply_lean_profile(driver)
+        logging.info("🪶 已启用精简模式（拦截图片/字体/样式/媒体/第三方请求）")
+    return EventFiringWebDriver(driver, ThrottleListener())
+
+
+# ---------------------------
+# 守护进程：预热浏览器池
+# ---------------------------
+class PoolSlot:
+    """池中的一个预热 Chrome 会话"""
+
+    def __init__(self, index, port):
+        self.index = index
+        self.port = port
+        self.driver = None
+        self.leased_by = None
+        self.lease_count = 0
+
+    @property
+    def debugger_address(self):
+        return f"127.0.0.1:{self.port}"
+
+    def launch(self, lean=False):
+        self.driver = launch_driver([
+            f"--remote-debugging-port={self.port}",
+            f"--user-data-dir={tempfile.mkdtemp(prefix=f'tennis_pool_{self.index}_')}",
+        ], lean)
+        self.driver.get("about:blank")
+
+    def reset(self):
+        """清理 Cookie、缓存与站点存储，关闭多余标签页，回到空白页"""
+        driver = self.driver
+        handles = driver.window_handles
+        for handle in handles[1:]:
+            driver.switch_to.window(handle)
+            driver.close()
+        driver.switch_to.window(handles[0])
+        driver.execute_cdp_cmd("Network.clearBrowserCookies", {})
+        driver.execute_cdp_cmd("Network.clearBrowserCache", {})
+        for origin in PORTAL_ORIGINS:
+            driver.execute_cdp_cmd(
+                "Storage.clearDataForOrigin", {"origin": origin, "storageTypes": "all"}
+            )
+        driver.get("about:blank")
+
+    def quit(self):
+        if self.driver is not None:
+            try:
+                self.driver.quit()
+            except WebDriverException:
+                pass
+            self.driver = None
+
+
+class DriverPool:
+    """维护 N 个预热 Chrome，按租约分配并记录命中与等待指标"""
+
+    def __init__(self, size, base_port=POOL_BASE_PORT, lean=False):
+        self.slots = [PoolSlot(i, base_port + i) for i in range(size)]
+        self.lean = lean
+        self.idle = []
+        self.cond = threading.Condition()
+        self.stats = {
+            "leases": 0,
+            "hits": 0,
+            "misses": 0,
+            "timeouts": 0,
+            "resets": 0,
+            "relaunches": 0,
+            "launch_failures": 0,
+            "wait_ms_total": 0,
+            "wait_ms_max": 0,
+        }
+
+    def start(self):
+        for slot in self.slots:
+            started = time.monotonic()
+            slot.launch(self.lean)
+            logging.info(
+                f"🔥 预热 Chrome 槽位 {slot.index}（端口 {slot.port}）耗时 "
+                f"{(time.monotonic() - started) * 1000:.0f} ms"
+            )
+            self.idle.append(slot)
+
+    def lease(self, site, timeout):
+        """租用一个空闲会话；没有空闲会话时等待，超时返回 None"""
+        started = time.monotonic()
+        with self.cond:
+            hit = bool(self.idle)
+            while not self.idle:
+                remaining = timeout - (time.monotonic() - started)
+                if remaining <= 0 or not self.cond.wait(remaining):
+                    if not self.idle:
+                        self.stats["timeouts"] += 1
+                        self.stats["misses"] += 1
+                        return None, int((time.monotonic() - started) * 1000)
+            slot = self.idle.pop(0)
+            slot.leased_by = site
+            slot.lease_count += 1
+            wait_ms = int((time.monotonic() - started) * 1000)
+            self.stats["leases"] += 1
+            self.stats["hits" if hit else "misses"] += 1
+            self.stats["wait_ms_total"] += wait_ms
+            self.stats["wait_ms_max"] = max(self.stats["wait_ms_max"], wait_ms)
+        if slot.driver is None and not self._relaunch(slot):
+            # 上次归还时没能重新启动的槽位，租用前再试一次；仍失败时放回并让客户端自行启动 Chrome
+            self._put_back(slot)
+            return None, wait_ms
+        logging.info(f"📤 {site} 租用槽位 {slot.index}（等待 {wait_ms} ms）")
+        return slot, wait_ms
+
+    def _relaunch(self, slot):
+        """重新启动槽位的 Chrome；失败时槽位保持 driver=None，下次租用前重试"""
+        slot.quit()
+        try:
+            slot.launch(self.lean)
+        except Exception as e:
+            logging.error(f"❌ 槽位 {slot.index} 重新启动 Chrome 失败: {e}")
+            slot.driver = None
+            self.stats["launch_failures"] += 1
+            return False
+        self.stats["relaunches"] += 1
+        return True
+
+    def _put_back(self, slot):
+        with self.cond:
+            slot.leased_by = None
+            self.idle.append(slot)
+            self.cond.notify()
+
+    def release(self, slot):
+        """
+        重置会话后放回空闲队列；重置失败则重新启动该槽位的 Chrome。
+        无论重置、重启是否成功，槽位都会放回，池的大小不会缩小。
+        """
+        site = slot.leased_by
+        try:
+            slot.reset()
+            self.stats["resets"] += 1
+        except Exception as e:
+            logging.warning(f"⚠️ 槽位 {slot.index} 重置失败，重新启动 Chrome: {e}")
+            self._relaunch(slot)
+        self._put_back(slot)
+        logging.info(f"📥 {site} 归还槽位 {slot.index}")
+
+    def snapshot(self):
+        with self.cond:
+            stats = dict(self.stats)
+            stats["size"] = len(self.slots)
+            stats["idle"] = len(self.idle)
+            stats["leased"] = {s.index: s.leased_by for s in self.slots if s.leased_by}
+        leases = stats["leases"]
+        stats["hit_rate"] = round(stats["hits"] / (leases + stats["timeouts"]), 3) if leases else 0.0
+        stats["wait_ms_avg"] = round(stats["wait_ms_total"] / leases, 1) if leases else 0.0
+        return stats
+
+    def shutdown(self):
+        for slot in self.slots:
+            slot.quit()
+
+
+class PoolRequestHandler(socketserver.StreamRequestHandler):
+    """
+    每个连接对应一次租约：连接保持期间会话归客户端所有，
+    客户端发送 release 或断开连接（包括进程崩溃）时自动归还。
+    """
+
+    def handle(self):
+        pool = self.server.pool
+        line = self.rfile.readline()
+        if not line:
+            return
+        try:
+            request = json.loads(line)
+        except ValueError:
+            self._reply({"ok": False, "error": "bad request"})
+            return
+
+        if request.get("cmd") == "stats":
+            self._reply({"ok": True, **pool.snapshot()})
+            return
+        if request.get("cmd") != "lease":
+            self._reply({"ok": False, "error": "unknown command"})
+            return
+
+        site = request.get("site", "unknown")
+        slot, wait_ms = pool.lease(site, float(request.get("timeout", LEASE_TIMEOUT)))
+        if slot is None:
+            self._reply({"ok": False, "error": "timeout", "wait_ms": wait_ms})
+            return
+        try:
+            self._reply({
+                "ok": True,
+                "slot": slot.index,
+                "debugger_address": slot.debugger_address,
+                "wait_ms": wait_ms,
+            })
+            # 阻塞到客户端 release 或断开
+            self.rfile.readline()
+        except OSError:
+            pass
+        finally:
+            pool.release(slot)
+
+    def _reply(self, payload):
+        self.wfile.write((json.dumps(payload, ensure_ascii=False) + "\n").encode("utf-8"))
+        self.wfile.flush()
+
+
+class PoolServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, address, pool):
+        self.pool = pool
+        super().__init__(address, PoolRequestHandler)
+
+
+def pool_stats(address=POOL_SOCKET):
+    """查询浏览器池的运行指标"""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as conn:
+        conn.connect(address)
+        return _pool_request(conn, {"cmd": "stats"}, 10)
+
+
+def _log_stats_periodically(pool, interval):
+    while True:
+        time.sleep(interval)
+        stats = pool.snapshot()
+        logging.info(
+            "📊 浏览器池指标：租用 %d 次，命中 %d，未命中 %d（超时 %d），命中率 %.1f%%，"
+            "平均等待 %.1f ms，最长等待 %d ms",
+            stats["leases"], stats["hits"], stats["misses"], stats["timeouts"],
+            stats["hit_rate"] * 100, stats["wait_ms_avg"], stats["wait_ms_max"],
+        )
+
+
+def run_pool(size, address=POOL_SOCKET, stats_interval=600, lean=False):
+    if os.path.exists(address):
+        os.unlink(address)
+    pool = DriverPool(size, lean=lean)
+    pool.start()
+    server = PoolServer(address, pool)
+    threading.Thread(
+        target=_log_stats_periodically, args=(pool, stats_interval), daemon=True
+    ).start()
+    logging.info(f"✅ 浏览器池已启动（{size} 个会话），监听 {address}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        logging.info("浏览器池收到中断信号，正在退出")
+    finally:
+        server.server_close()
+        pool.shutdown()
+        if os.path.exists(address):
+            os.unlink(address)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="网球场脚本共用的 Chrome 预热池")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    pool_parser = subparsers.add_parser("pool", help="启动浏览器池守护进程")
+    pool_parser.add_argument("--size", type=int, default=3, help="预热的 Chrome 数量")
+    pool_parser.add_argument("--socket", default=POOL_SOCKET, help="监听的 Unix socket 路径")
+    pool_parser.add_argument("--stats-interval", type=int, default=600, help="指标日志间隔（秒）")
+    pool_parser.add_argument("--lean", action="store_true", help="以精简模式参数启动 Chrome")
+    stats_parser = subparsers.add_parser("stats", help="查看浏览器池指标")
+    stats_parser.add_argument("--socket", default=POOL_SOCKET)
+    args = parser.parse_args()
+
+    if args.command == "pool":
+        logging.basicConfig(
+            filename="tennis_driver_pool.log",
+            level=logging.INFO,
+            format="%(asctime)s - %(levelname)s - %(message)s",
+            datefmt="%Y-%m-%d %H:%M:%S",
+        )
+        run_pool(args.size, args.socket, args.stats_interval, args.lean)
+    else:
+        json.dump(pool_stats(args.socket), sys.stdout, ensure_ascii=False, indent=2)
+        print()
+
+
+if __name__ == "__main__":
+    main()
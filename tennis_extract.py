@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+在浏览器内一次性提取页面数据，返回紧凑的结构化结果。
+
+取代 execute_script("return document.body.outerHTML;") / driver.page_source 之后再在 Python 端
+用正则或 BeautifulSoup 解析的做法：每个页面只执行一次 JS，只传回需要的几十个值。
+"""
+
+# 时段输入框 A_YYYYMMDD_NN：[[日期, 时段代码, 可预约数], ...]
+_WEEK_SLOTS_JS = """
+const date = arguments[0];
+const prefix = date ? 'input[id^="A_' + date + '_"]' : 'input[id^="A_"]';
+let inputs = document.querySelectorAll('#week-info ' + prefix);
+if (!inputs.length) { inputs = document.querySelectorAll(prefix); }
+const rows = [];
+for (const input of inputs) {
+    const match = /^A_(\\d{8})_(\\d{2})$/.exec(input.id);
+    if (match && /^\\d+$/.test(input.value)) { rows.push([match[1], match[2], input.value]); }
+}
+return rows;
+"""
+
+# 中野区时间表：当前日期文字与 [[设施, 时段, 图标文件名], ...]
+_TIMETABLE_JS = """
+const day = document.querySelector('li.day#li');
+const times = Array.from(
+    document.querySelectorAll("thead tr th[id^='td10_']"),
+    th => th.textContent.trim().replace(/～/g, '-')
+);
+const facilities = Array.from(document.querySelectorAll('tbody tr th strong'), el => el.textContent.trim());
+const cellSelector = ['td11_', 'td12_', 'td13_', 'td14_', 'td15_', 'td16_']
+    .map(prefix => "td[id^='" + prefix + "']").join(', ');
+const rows = [];
+document.querySelectorAll('tbody tr').forEach((row, rowIndex) => {
+    if (rowIndex >= facilities.length) { return; }
+    row.querySelectorAll(cellSelector).forEach((cell, timeIndex) => {
+        const img = cell.querySelector('img');
+        if (img) {
+            rows.push([facilities[rowIndex], times[timeIndex] || '未知时段', (img.getAttribute('src') || '').split('/').pop()]);
+        }
+    });
+});
+return {day: day ? day.textContent.trim() : '', rows: rows};
+"""
+
+
+def extract_week_slots(driver, date=None):
+    """返回 #week-info 中的时段：[(日期, 时段代码, 可预约数)]；指定 date 时只返回该日期"""
+    return [tuple(row) for row in driver.execute_script(_WEEK_SLOTS_JS, date)]
+
+
+def extract_timetable(driver):
+    """返回 (日期文字, [(设施, 时段, 图标文件名)])，日期文字如 "令和07年2月8日(土)" """
+    result = driver.execute_script(_TIMETABLE_JS)
+    return result["day"], [tuple(row) for row in result["rows"]]
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+两级查询：月历作为心跳，只展开状态有变化的日期。
+
+每次运行都要点击每个有空位的日期（每次点击后还要等待周视图），
+而大多数时候月历的图标（全て空き / 一部空き / 予約あり）与上次完全相同，即使变化通常也只有一两天。
+  - 快速级：只加载月视图，得到 {日期: 状态}；
+  - 深度级：只点击 新出现的日期、状态与上次展开时不同的日期、缓存的时段超过 MAX_STALENESS 秒的日期，
+    其余日期把上次展开得到的时段放回 AvailabilityStore，通知与状态数据库看到的结果不变。
+    月历与上次完全相同且没有过期的日期时，整月不点击。
+
+每个日期的月历状态与时段向量保存在状态数据库（tennis_state_db.py）的 date_cache 表，
+按 (站点, 设施, 日期) 一行，由 notify_changes(..., heartbeat=heartbeat) 与本次快照在同一事务中写入，缓存与状态数据库中的结果总是一致，
+中途失败的运行不会留下缓存；点击失败、没有取到时段的日期不写入，下次重新展开。
+
+    heartbeat = CalendarHeartbeat(availability_info)
+    calendar = parse_month_calendar(html)
+    for date in week_plan.plan(heartbeat.gate(calendar, dates)):
+        ...
+    notify_changes(..., heartbeat=heartbeat)
+
+中野区按日翻页查看时间表，没有月历，不使用心跳。
+"""
+
+import os
+import json
+import time
+import hashlib
+import logging
+from collections import Counter
+
+from tennis_state_db import StateDB
+
+MAX_STALENESS = int(os.getenv("TENNIS_MAX_STALENESS", "1800"))  # 状态不变的日期最多沿用多少秒
+
+# 展开的原因
+NEW, CHANGED, STALE = "新出现", "状态变化", "过期"
+
+
+def calendar_fingerprint(calendar):
+    """{日期: 状态} → 与顺序无关的短指纹"""
+    text = ";".join(f"{date}:{status}" for date, status in sorted(calendar.items()))
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()[:16]
+
+
+def calendar_month(calendar):
+    """月历所属的月（YYYYMM）：出现最多的年月，前后月的日期不影响"""
+    return Counter(date[:6] for date in calendar).most_common(1)[0][0]
+
+
+class CalendarHeartbeat:
+    def __init__(self, store, max_staleness=MAX_STALENESS, db_path=None):
+        self.store = store
+        self.site = store.site
+        self.max_staleness = max_staleness
+        self.db_path = db_path
+        self.reused = 0
+        self.reasons = Counter()  # 展开原因 → 日期数
+        self._expanded = {}  # (设施, 日期) → 展开时的月历状态
+
+    @property
+    def expanded(self):
+        return sum(self.reasons.values())
+
+    def _cached(self, facility, dates):
+        if not dates:
+            return {}
+        with StateDB(self.db_path) as db:
+            rows = db.conn.execute(
+                f"SELECT date, status, scanned_at, counts FROM date_cache "
+                f"WHERE site = ? AND facility = ? AND date IN ({', '.join('?' * len(dates))})",
+                (self.site, facility, *dates),
+            ).fetchall()
+        return {date: (status, scanned_at, json.loads(counts)) for date, status, scanned_at, counts in rows}
+
+    def _reason(self, status, cached, now):
+        if cached is None:
+            return NEW
+        if cached[0] != status:
+            return CHANGED
+        if len(cached[2]) != self.store.width:
+            # 缓存写入时 Store 因未知时段加宽过（或时段定义已改变），load_days 不会接受，重新展开
+            return CHANGED
+        if now - cached[1] >= self.max_staleness:
+            return STALE
+        return None
+
+    def gate(self, calendar, dates, facility=""):
+        """
+        返回需要点击的日期（dates 的子集）；其余日期从缓存放回 Store。
+        """
+        if not calendar:
+            return dates
+        now = time.time()
+        cached = self._cached(facility, dates)
+        expand, reasons, reused = [], Counter(), []
+        for date in dates:
+            reason = self._reason(calendar.get(date), cached.get(date), now)
+            if reason is None:
+                _, _, counts = cached[date]
+                reused.append([facility, date, 0] + counts)
+            else:
+                expand.append(date)
+                reasons[reason] += 1
+                self._expanded[(facility, date)] = calendar.get(date)
+        self.store.load_days(reused)
+        self.reused += len(reused)
+        self.reasons.update(reasons)
+
+        month, fingerprint = calendar_month(calendar), calendar_fingerprint(calendar)
+        where = f"{self.site} {facility + ' ' if facility else ''}{month}"
+        if not expand:
+            logging.info(f"💓 {where} 月历无变化（{fingerprint}），沿用 {len(reused)} 个日期的时段")
+        else:
+            detail = " / ".join(f"{reason} {count}" for reason, count in reasons.items())
+            logging.info(f"🔍 {where} 展开 {len(expand)} 个日期（{detail}），沿用 {len(reused)} 个")
+        return expand
+
+    def write(self, conn):
+        """
+        在调用方的事务中写入本次展开的日期的状态与时段，并删除已过去的日期。
+        notify_changes(..., heartbeat=heartbeat) 在记录快照的同一事务中调用。
+        """
+        now = time.time()
+        rows = []
+        for (facility, date), status in self._expanded.items():
+            day = self.store.day(date, facility)
+            if day is None:  # 点击失败，没有取到时段
+                continue
+            rows.append((self.site, facility, date, status, now, json.dumps(day.counts.tolist())))
+        conn.executemany(
+            "INSERT OR REPLACE INTO date_cache (site, facility, date, status, scanned_at, counts) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            rows,
+        )
+        conn.execute("DELETE FROM date_cache WHERE site = ? AND date < ?", (self.site, time.strftime("%Y%m%d")))
+        detail = " / ".join(f"{reason} {count}" for reason, count in self.reasons.items()) or "无"
+        logging.info(f"📊 {self.site}：展开 {self.expanded} 个日期（{detail}），沿用 {self.reused} 个")
+
+    def commit(self):
+        """不经过 notify_changes 时单独写入（独立事务）"""
+        with StateDB(self.db_path) as db:
+            db.conn.execute("BEGIN IMMEDIATE")
+            try:
+                self.write(db.conn)
+                db.conn.execute("COMMIT")
+            except BaseException:
+                db.conn.execute("ROLLBACK")
+                raise
@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+只追加的空位历史：每次查询的最终结果按列追加到定长记录文件中，用于分析各场地何时放出空位。
+
+目录结构（默认 history/，可用环境变量 TENNIS_HISTORY_DIR 覆盖）：
+  site.col  facility.col  date.col  slot.col  count.col  observed_at.col   每列一个小端定长数组
+  dictionary.json                                                        站点 / 设施 / 时段名称与编号的对应
+
+  列          类型     说明
+  site        uint16   站点编号
+  facility    uint16   设施编号（没有设施区分时为 ""）
+  date        uint32   日期的 date.toordinal()；无法识别的日期为 0
+  slot        uint16   时段编号
+  count       int16    可预约数；没有数量的站点（中野区）为 -1
+  observed_at uint32   查询时刻（Unix 秒）
+
+读取时每列直接 memory-map：NumPy（requirements.txt）可用时为 numpy.memmap（零拷贝，可直接向量化统计），
+否则退回基于 mmap 的 memoryview，逐行扫描，一年的数据需要十几秒，只适合临时使用。
+
+    python tennis_history.py hours ariake            # 按小时统计有空位的观测次数
+    python tennis_history.py bench --rows 5000000    # 生成测试数据并测量扫描速度
+"""
+
+import os
+import sys
+import json
+import mmap
+import time
+import shutil
+import random
+import logging
+import argparse
+import tempfile
+from array import array
+from datetime import datetime
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    import fcntl
+except ImportError:  # Windows 上不加锁
+    fcntl = None
+
+HISTORY_DIR = os.getenv("TENNIS_HISTORY_DIR", "history")
+COLUMNS = (
+    ("site", "H", "<u2"),
+    ("facility", "H", "<u2"),
+    ("date", "I", "<u4"),
+    ("slot", "H", "<u2"),
+    ("count", "h", "<i2"),
+    ("observed_at", "I", "<u4"),
+)
+DICTIONARY_FILE = "dictionary.json"
+NO_COUNT = -1
+JST_OFFSET = 9 * 3600
+
+
+def _date_ordinal(date):
+    for fmt in ("%Y%m%d", "%Y-%m-%d"):
+        try:
+            return datetime.strptime(date, fmt).toordinal()
+        except ValueError:
+            continue
+    return 0
+
+
+class _Locked:
+    """目录级排他锁：多个脚本同时追加时依次执行"""
+
+    def __init__(self, directory):
+        self.path = os.path.join(directory, ".lock")
+
+    def __enter__(self):
+        self.file = open(self.path, "a+")
+        if fcntl:
+            fcntl.flock(self.file, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        if fcntl:
+            fcntl.flock(self.file, fcntl.LOCK_UN)
+        self.file.close()
+
+
+class History:
+    def __init__(self, directory=None):
+        self.directory = directory or HISTORY_DIR
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+
+    def load_dictionary(self):
+        try:
+            with open(self._path(DICTIONARY_FILE), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {"site": [], "facility": [], "slot": []}
+
+    def _save_dictionary(self, dictionary):
+        tmp_file = self._path(DICTIONARY_FILE) + ".tmp"
+        with open(tmp_file, "w", encoding="utf-8") as f:
+            json.dump(dictionary, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_file, self._path(DICTIONARY_FILE))
+
+    def row_count(self):
+        """各列中完整记录数的最小值（追加中途中断时各列长度可能不同）"""
+        counts = []
+        for name, typecode, _ in COLUMNS:
+            path = self._path(f"{name}.col")
+            size = os.path.getsize(path) if os.path.exists(path) else 0
+            counts.append(size // array(typecode).itemsize)
+        return min(counts)
+
+    def _repair(self, rows):
+        for name, typecode, _ in COLUMNS:
+            path = self._path(f"{name}.col")
+            if os.path.exists(path) and os.path.getsize(path) != rows * array(typecode).itemsize:
+                logging.warning(f"⚠️ 历史列 {name} 长度不一致，截断到 {rows} 条")
+                with open(path, "r+b") as f:
+                    f.truncate(rows * array(typecode).itemsize)
+
+    def append(self, slots, observed_at=None):
+        """追加一次查询的结果：{SlotKey: 数量}。返回追加的记录数"""
+        if not slots:
+            return 0
+        observed_at = int(time.time() if observed_at is None else observed_at)
+        with _Locked(self.directory):
+            self._repair(self.row_count())
+            dictionary = self.load_dictionary()
+            index = {kind: {name: i for i, name in enumerate(names)} for kind, names in dictionary.items()}
+            grown = False
+
+            def lookup(kind, name):
+                nonlocal grown
+                if name not in index[kind]:
+                    index[kind][name] = len(dictionary[kind])
+                    dictionary[kind].append(name)
+                    grown = True
+                return index[kind][name]
+
+            columns = {name: array(typecode) for name, typecode, _ in COLUMNS}
+            for key, count in slots.items():
+                columns["site"].append(lookup("site", key.site))
+                columns["facility"].append(lookup("facility", key.facility))
+                columns["date"].append(_date_ordinal(key.date))
+                columns["slot"].append(lookup("slot", key.slot))
+                columns["count"].append(NO_COUNT if count is None else int(count))
+                columns["observed_at"].append(observed_at)
+            if grown:
+                self._save_dictionary(dictionary)
+            for name, values in columns.items():
+                if sys.byteorder != "little":
+                    values.byteswap()
+                with open(self._path(f"{name}.col"), "ab") as f:
+                    f.write(values.tobytes())
+        return len(slots)
+
+    def columns(self):
+        """
+        以只读 memory-map 方式打开各列：{列名: numpy.memmap 或 memoryview}，长度均为 row_count()。
+        """
+        rows = self.row_count()
+        result = {}
+        for name, typecode, dtype in COLUMNS:
+            path = self._path(f"{name}.col")
+            if rows == 0:
+                result[name] = np.zeros(0, dtype=dtype) if np is not None else memoryview(array(typecode))
+            elif np is not None:
+                result[name] = np.memmap(path, dtype=dtype, mode="r", shape=(rows,))
+            else:
+                with open(path, "rb") as f:
+                    mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                result[name] = memoryview(mapped).cast(typecode)[:rows]
+        return result
+
+
+def open_hours(history, site, columns=None):
+    """站点在一天中各小时（JST）观测到空位的次数：长度 24 的列表"""
+    dictionary = history.load_dictionary()
+    if site not in dictionary["site"]:
+        return [0] * 24
+    site_id = dictionary["site"].index(site)
+    columns = columns or history.columns()
+    if np is not None:
+        selected = (columns["site"] == site_id) & (columns["count"] != 0)
+        hours = ((columns["observed_at"][selected].astype(np.int64) + JST_OFFSET) // 3600) % 24
+        return np.bincount(hours, minlength=24).tolist()
+    counts = [0] * 24
+    for site_value, count, observed_at in zip(columns["site"], columns["count"], columns["observed_at"]):
+        if site_value == site_id and count != 0:
+            counts[(observed_at + JST_OFFSET) // 3600 % 24] += 1
+    return counts
+
+
+def append_history(slots, observed_at=None):
+    """供各脚本调用：把最终结果追加到历史；任何失败都只记录日志，不影响通知"""
+    try:
+        History().append(slots, observed_at)
+    except Exception as e:
+        logging.warning(f"⚠️ 追加空位历史失败: {e}")
+
+
+# ---------------------------
+# 基准测试
+# ---------------------------
+def _generate(history, rows, sites=12, per_minute=20, batch=500_000):
+    """直接写入约 rows 条分钟级观测：每分钟每个站点 per_minute 个时段"""
+    rng = random.Random(0)
+    started = int(datetime(2025, 1, 1).timestamp())
+    base_date = datetime(2025, 1, 1).toordinal()
+    labels = [f"{h}-{h + 2}点" for h in range(7, 21, 2)]
+    history._save_dictionary({"site": [f"site{i}" for i in range(sites)], "facility": [""], "slot": labels})
+    per_observation = sites * per_minute
+    for offset in range(0, rows, batch):
+        index = range(offset, min(offset + batch, rows))
+        columns = {
+            "site": array("H", (i // per_minute % sites for i in index)),
+            "facility": array("H", bytes(2 * len(index))),
+            "date": array("I", (base_date + i // per_observation // 1440 + i % 60 for i in index)),
+            "slot": array("H", (i % len(labels) for i in index)),
+            "count": array("h", (rng.randint(0, 4) for _ in index)),
+            "observed_at": array("I", (started + i // per_observation * 60 for i in index)),
+        }
+        for name, values in columns.items():
+            with open(history._path(f"{name}.col"), "ab") as f:
+                f.write(values.tobytes())
+    return rows
+
+
+def bench(rows=2_000_000, repeat=5):
+    directory = tempfile.mkdtemp(prefix="tennis_history_")
+    try:
+        history = History(directory)
+        started = time.perf_counter()
+        written = _generate(history, rows)
+        print(f"生成 {written} 条记录，用时 {time.perf_counter() - started:.1f} 秒，"
+              f"每条 {sum(array(t).itemsize for _, t, _ in COLUMNS)} 字节")
+
+        started = time.perf_counter()
+        for _ in range(repeat):
+            columns = history.columns()
+            hours = open_hours(history, "site0", columns)
+        elapsed = (time.perf_counter() - started) / repeat
+        backend = "numpy.memmap" if np is not None else "memoryview（未安装 NumPy，不是部署时的路径）"
+        print(f"{backend}：扫描 {written} 条 {elapsed * 1000:.1f} ms，"
+              f"{written / elapsed / 1e6:.1f} M 条/秒；site0 各小时空位观测 {hours}")
+        year = 365 * 24 * 60 * 12 * 20  # 12 个站点、每分钟 20 个时段
+        print(f"按此速度，一年分钟级观测（{year / 1e6:.0f} M 条）约需 {year / (written / elapsed):.2f} 秒")
+    finally:
+        shutil.rmtree(directory)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="空位历史")
+    sub = parser.add_subparsers(dest="command", required=True)
+    hours = sub.add_parser("hours", help="按小时统计站点有空位的观测次数")
+    hours.add_argument("site")
+    hours.add_argument("--dir", default=HISTORY_DIR)
+    bench_parser = sub.add_parser("bench", help="生成测试数据并测量扫描速度")
+    bench_parser.add_argument("--rows", type=int, default=2_000_000)
+    args = parser.parse_args()
+
+    if args.command == "bench":
+        bench(args.rows)
+        return
+    history = History(args.dir)
+    for hour, count in enumerate(open_hours(history, args.site)):
+        print(f"{hour:02d}:00  {count}")
+
+
+if __name__ == "__main__":
+    main()
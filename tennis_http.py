@@ -0,0 +1,325 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+不启动浏览器、直接重放门户表单提交的 HTTP 客户端基础设施。
+
+门户页面上的按钮大多是 JS 函数：给隐藏字段赋值后提交表单。
+这里解析页面中的 <form> 与按钮的 onclick，再从 JS 函数体中找出
+“哪个表单、提交到哪个 action、哪些字段被赋值”，用 requests 直接提交。
+"""
+
+import re
+import time
+import logging
+from html.parser import HTMLParser
+from urllib.parse import urljoin, urlencode
+
+from tennis_http_fixtures import make_session
+from tennis_ratelimit import throttle
+
+REQUEST_TIMEOUT = 30
+
+# 与 tennis_driver.USER_AGENT 保持一致；这里不引入 selenium
+USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+    "AppleWebKit/537.36 (KHTML, like Gecko) Chrome/131.0.0.0 Safari/537.36"
+)
+
+
+# ---------------------------
+# 页面解析
+# ---------------------------
+class HtmlForm:
+    """页面中的一个表单：action、method 以及各字段的默认值"""
+
+    def __init__(self, form_id, name, action, method):
+        self.id = form_id
+        self.name = name
+        self.action = action
+        self.method = method
+        self.fields = {}
+        self.select_ids = {}  # select 的 id -> name
+        self.options = {}  # select 的 name -> [[value, 显示文字], ...]
+        self.radio_ids = {}  # radio 的 id -> (name, value)
+
+    def __repr__(self):
+        return f"HtmlForm(id={self.id!r}, name={self.name!r}, action={self.action!r}, fields={len(self.fields)})"
+
+
+class _FormParser(HTMLParser):
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.forms = []
+        self.onclicks = {}
+        self._form = None
+        self._select = None
+        self._select_first = None
+        self._option = None
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if attrs.get("id") and attrs.get("onclick"):
+            self.onclicks[attrs["id"]] = attrs["onclick"]
+        if tag == "form":
+            self._form = HtmlForm(
+                attrs.get("id"), attrs.get("name"), attrs.get("action", ""),
+                (attrs.get("method") or "get").upper(),
+            )
+            self.forms.append(self._form)
+        elif self._form is None:
+            return
+        elif tag == "input":
+            name = attrs.get("name")
+            input_type = (attrs.get("type") or "text").lower()
+            if not name or input_type in ("button", "image", "submit", "reset", "file"):
+                return
+            if input_type == "radio" and attrs.get("id"):
+                self._form.radio_ids[attrs["id"]] = (name, attrs.get("value", "on"))
+            if input_type in ("checkbox", "radio") and "checked" not in attrs:
+                return
+            self._form.fields[name] = attrs.get("value", "on" if input_type == "checkbox" else "")
+        elif tag == "select":
+            self._select = attrs.get("name")
+            self._select_first = None
+            if self._select:
+                self._form.fields.setdefault(self._select, "")
+                if attrs.get("id"):
+                    self._form.select_ids[attrs["id"]] = self._select
+        elif tag == "option" and self._select:
+            value = attrs.get("value", "")
+            self._option = [value, ""]
+            self._form.options.setdefault(self._select, []).append(self._option)
+            if self._select_first is None:
+                self._select_first = value
+                self._form.fields[self._select] = value
+            if "selected" in attrs:
+                self._form.fields[self._select] = value
+        elif tag == "textarea" and attrs.get("name"):
+            self._form.fields[attrs["name"]] = ""
+
+    def handle_data(self, data):
+        if self._option is not None:
+            self._option[1] += data.strip()
+
+    def handle_endtag(self, tag):
+        if tag == "form":
+            self._form = None
+        elif tag == "select":
+            self._select = None
+            self._option = None
+        elif tag == "option":
+            self._option = None
+
+
+def parse_page(html):
+    """返回 (表单列表, {元素 id: onclick})"""
+    parser = _FormParser()
+    parser.feed(html)
+    parser.close()
+    return parser.forms, parser.onclicks
+
+
+def find_form(forms, form_id=None, field=None, select_id=None):
+    """按 id/name、包含的字段名或包含的 select id 查找表单"""
+    for form in forms:
+        if form_id and form_id in (form.id, form.name):
+            return form
+        if field and field in form.fields:
+            return form
+        if select_id and select_id in form.select_ids:
+            return form
+    return None
+
+
+_CALL_PATTERN = re.compile(r"(?:javascript:)?\s*(\w+)\s*\(([^)]*)\)")
+
+
+def parse_js_call(onclick):
+    """把 "javascript:selectDay(20250301);" 解析为 ("selectDay", ["20250301"])"""
+    match = _CALL_PATTERN.search(onclick or "")
+    if not match:
+        return None, []
+    args = [a.strip().strip("'\"") for a in match.group(2).split(",") if a.strip()]
+    return match.group(1), args
+
+
+_CLICKABLE_TAG = re.compile(r"<(a|img|input|td|button)\b([^>]*)>", re.S)
+_ANCHOR = re.compile(r"<a\b([^>]*)>(.*?)</a>", re.S)
+
+
+def _js_handler(attrs):
+    onclick = re.search(r'\bonclick="([^"]*)"', attrs)
+    if onclick:
+        return onclick.group(1)
+    href = re.search(r'\bhref="(javascript:[^"]*)"', attrs)
+    return href.group(1) if href else None
+
+
+def find_onclick(html, element_id=None, src=None, alt=None, text=None, contains=None):
+    """
+    查找可点击元素的 JS 调用（onclick 或 href="javascript:..."）。
+    可按 id、图片 src 片段、图片 alt、链接文字或 onclick 中包含的片段定位；
+    图片本身没有处理函数时，取包住它的 <a> 的处理函数。
+    """
+    def matches(attrs, inner=""):
+        if element_id and not re.search(r'\bid="' + re.escape(element_id) + '"', attrs):
+            return False
+        if src and not re.search(r'\bsrc="[^"]*' + re.escape(src), attrs + inner):
+            return False
+        if alt and not re.search(r'\balt="' + re.escape(alt) + '"', attrs + inner):
+            return False
+        if text and text not in re.sub(r"<[^>]+>", "", inner):
+            return False
+        return not contains or contains in (_js_handler(attrs) or "")
+
+    if not text:
+        for tag in _CLICKABLE_TAG.finditer(html):
+            handler = _js_handler(tag.group(2))
+            if handler and matches(tag.group(2)):
+                return handler
+    for anchor in _ANCHOR.finditer(html):
+        handler = _js_handler(anchor.group(1))
+        if handler and matches(anchor.group(1), anchor.group(2)):
+            return handler
+    return None
+
+
+class JsSubmit:
+    """从 JS 函数体中识别出的一次表单提交"""
+
+    def __init__(self, form_name=None, action=None, assignments=None):
+        self.form_name = form_name
+        self.action = action
+        self.assignments = assignments or {}  # 字段名 -> 参数下标(int) 或字面量(str)
+
+    def __repr__(self):
+        return f"JsSubmit(form={self.form_name!r}, action={self.action!r}, assignments={self.assignments!r})"
+
+
+def discover_js_submit(html, func_name):
+    """
+    在页面脚本中找到 function func_name(...) 的函数体，识别：
+      - 提交的表单：document.<form>.submit() / document.forms['<form>']
+      - 提交地址：.action = '...' 或 url: '...'
+      - 字段赋值：<field>.value = <参数名 或 字面量>
+    找不到函数时返回 None。
+    """
+    match = re.search(r"function\s+" + re.escape(func_name) + r"\s*\(([^)]*)\)\s*\{", html)
+    if not match:
+        return None
+    params = [p.strip() for p in match.group(1).split(",") if p.strip()]
+
+    # 截取函数体（按花括号配对）
+    depth, index = 1, match.end()
+    while index < len(html) and depth:
+        depth += {"{": 1, "}": -1}.get(html[index], 0)
+        index += 1
+    body = html[match.end():index]
+
+    form_match = (
+        re.search(r"document\.forms\[['\"](\w+)['\"]\]", body)
+        or re.search(r"document\.(\w+)\.(?:submit|action)\b", body)
+        or re.search(r"getElementById\(['\"](\w+)['\"]\)\.submit", body)
+    )
+    action_match = re.search(r"\.action\s*=\s*['\"]([^'\"]+)['\"]", body) or re.search(
+        r"url\s*:\s*['\"]([^'\"]+)['\"]", body
+    )
+    assignments = {}
+    for field, value in re.findall(r"\.?(\w+)\.value\s*=\s*([^;]+);", body):
+        value = value.strip()
+        if value in params:
+            assignments[field] = params.index(value)
+        else:
+            assignments[field] = value.strip("'\"")
+    return JsSubmit(
+        form_match.group(1) if form_match else None,
+        action_match.group(1) if action_match else None,
+        assignments,
+    )
+
+
+def js_assignments(submit, args):
+    """把 JsSubmit 中的字段赋值代入实参，返回 {字段: 值}（用于只改隐藏字段、不提交的切换按钮）"""
+    return {
+        field: args[value] if isinstance(value, int) and value < len(args) else value
+        for field, value in submit.assignments.items()
+        if not isinstance(value, int) or value < len(args)
+    }
+
+
+# ---------------------------
+# 客户端基类
+# ---------------------------
+class PortalHttpClient:
+    """带 Cookie 会话的门户客户端，记录请求次数与耗时"""
+
+    def __init__(self, base_url, record_dir=None):
+        self.base_url = base_url if base_url.endswith("/") else base_url + "/"
+        self.session = make_session(record_dir)
+        self.session.headers["User-Agent"] = USER_AGENT
+        self.requests_made = 0
+        self.elapsed = 0.0
+        self.last_url = None
+        self.last_request = None  # (方法, URL, 表单)，可保存下来直接重放
+
+    def url(self, path):
+        return urljoin(self.last_url or self.base_url, path)
+
+    def _send(self, method, path, data=None):
+        throttle(self.url(path))
+        started = time.monotonic()
+        self.last_request = (method, self.url(path), dict(data or {}))
+        response = self.session.request(method, self.url(path), data=data, timeout=REQUEST_TIMEOUT)
+        response.raise_for_status()
+        self.requests_made += 1
+        self.elapsed += time.monotonic() - started
+        self.last_url = response.url
+        if response.encoding is None or response.encoding.lower() == "iso-8859-1":
+            response.encoding = response.apparent_encoding
+        return response.text
+
+    def get(self, path):
+        return self._send("GET", path)
+
+    def post(self, path, data):
+        return self._send("POST", path, data)
+
+    def submit(self, form, overrides=None, action=None):
+        """以表单默认值加上 overrides 提交表单"""
+        data = dict(form.fields)
+        data.update(overrides or {})
+        target = action or form.action or self.last_url
+        if form.method == "POST":
+            return self.post(target, data)
+        return self._send("GET", target + ("&" if "?" in target else "?") + urlencode(data))
+
+    def call_js(self, html, func_name, args, default_form=None, default_action=None, default_fields=None,
+                extra=None):
+        """
+        重放页面 JS 函数 func_name(*args) 触发的表单提交。
+        页面中识别不到函数时，使用 default_form / default_action / default_fields；
+        extra 为额外覆盖的字段（如浏览器中由用户选择的下拉框）。
+        """
+        forms, _ = parse_page(html)
+        submit = discover_js_submit(html, func_name)
+        if submit is None:
+            logging.warning(f"⚠️ 页面中未找到 {func_name}()，使用默认接口 {default_action}")
+            submit = JsSubmit(default_form, default_action, default_fields or {})
+
+        form = find_form(forms, form_id=submit.form_name) or find_form(forms, form_id=default_form)
+        if form is None:
+            form = forms[0] if forms else HtmlForm(None, None, "", "POST")
+        overrides = js_assignments(submit, args)
+        overrides.update(extra or {})
+        return self.submit(form, overrides, submit.action or default_action)
+
+    def replay(self, request, overrides=None):
+        """重放之前保存的 last_request，可覆盖部分表单字段"""
+        method, url, data = request
+        data = dict(data)
+        data.update(overrides or {})
+        return self._send(method, url, data if method == "POST" else None)
+
+    def report(self, label):
+        logging.info(f"🌐 {label}：HTTP 请求 {self.requests_made} 次，共耗时 {self.elapsed:.1f} 秒")
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+HTTP 客户端（tennis_*_http.py）的录制与回放工具。
+
+录制：客户端使用 RecordingSession 时，每个请求与响应都会写入 fixture 目录，
+      目录中的 index.json 记录请求方法、路径、查询参数、表单与响应文件。
+回放：FixtureServer 在本地启动一个替身服务器，按录制顺序返回响应，
+      客户端把 base_url 指向它即可在离线状态下完整跑一遍流程。
+
+    python tennis_http_fixtures.py serve fixtures/metro --port 8765
+
+对照：Selenium 脚本设置 TENNIS_PARITY_DUMP=<文件> 时用 dump_parity() 写出结果，
+HTTP 客户端的 --parity 用 load_parity_dump() / diff_parity() 比较。
+"""
+
+import os
+import json
+import logging
+import argparse
+import threading
+from urllib.parse import urlsplit, parse_qsl
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+INDEX_FILE = "index.json"
+
+
+def _request_key(method, url):
+    parts = urlsplit(url)
+    return method.upper(), parts.path, sorted(parse_qsl(parts.query, keep_blank_values=True))
+
+
+class RecordingSession(requests.Session):
+    """把所有请求与响应写入 fixture 目录的 requests.Session"""
+
+    def __init__(self, fixture_dir):
+        super().__init__()
+        self.fixture_dir = fixture_dir
+        os.makedirs(fixture_dir, exist_ok=True)
+        self.entries = []
+
+    def request(self, method, url, *args, **kwargs):
+        response = super().request(method, url, *args, **kwargs)
+        form = kwargs.get("data") or {}
+        # 重定向链中的每一跳也要录制，回放时才能按原样跳转
+        for hop in response.history + [response]:
+            self._record(hop, form if hop.request.method == "POST" else {})
+        with open(os.path.join(self.fixture_dir, INDEX_FILE), "w", encoding="utf-8") as f:
+            json.dump(self.entries, f, ensure_ascii=False, indent=2)
+        return response
+
+    def _record(self, response, form):
+        method, path, query = _request_key(response.request.method, response.request.url)
+        file_name = f"{len(self.entries):03d}_{method.lower()}_{os.path.basename(path) or 'root'}.html"
+        with open(os.path.join(self.fixture_dir, file_name), "wb") as f:
+            f.write(response.content)
+        location = response.headers.get("Location")
+        if location:
+            # 只保留路径部分，回放时跳转到替身服务器自身
+            parts = urlsplit(location)
+            location = parts.path + (f"?{parts.query}" if parts.query else "")
+        self.entries.append({
+            "method": method,
+            "path": path,
+            "query": query,
+            "form": dict(form) if isinstance(form, dict) else sorted(form),
+            "status": response.status_code,
+            "content_type": response.headers.get("Content-Type", "text/html; charset=utf-8"),
+            "location": location,
+            "file": file_name,
+        })
+
+
+def make_session(record_dir=None):
+    """返回普通 Session，或在指定 record_dir 时返回录制用 Session"""
+    return RecordingSession(record_dir) if record_dir else requests.Session()
+
+
+class FixtureServer(ThreadingHTTPServer):
+    """
+    按录制内容回放响应的本地替身服务器。
+    同一 (方法, 路径, 查询参数) 有多条录制时，优先匹配表单完全一致的一条，否则按录制顺序依次返回。
+    strict=True 时只返回表单完全一致的录制（测试用），没有时返回 404。
+    """
+
+    daemon_threads = True
+
+    def __init__(self, fixture_dir, port=0, strict=False):
+        self.fixture_dir = fixture_dir
+        self.strict = strict
+        with open(os.path.join(fixture_dir, INDEX_FILE), "r", encoding="utf-8") as f:
+            self.entries = json.load(f)
+        self.served = set()
+        self.lock = threading.Lock()
+        super().__init__(("127.0.0.1", port), FixtureRequestHandler)
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def match(self, method, path, query, form):
+        query = [list(pair) for pair in sorted(query)]
+        with self.lock:
+            candidates = [
+                (i, entry) for i, entry in enumerate(self.entries)
+                if entry["method"] == method and entry["path"] == path
+                and [list(pair) for pair in entry["query"]] == query
+            ]
+            if not candidates:
+                return None
+            exact = [c for c in candidates if c[1]["form"] == form and c[0] not in self.served]
+            if self.strict:
+                exact = exact or [c for c in candidates if c[1]["form"] == form]
+                if not exact:
+                    return None
+            fresh = [c for c in candidates if c[0] not in self.served]
+            index, entry = (exact or fresh or candidates[-1:])[0]
+            self.served.add(index)
+            return entry
+
+    def start(self):
+        """在后台线程中运行，返回 base_url"""
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self.base_url
+
+
+class FixtureRequestHandler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        self._serve("GET", {})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length).decode("utf-8") if length else ""
+        self._serve("POST", dict(parse_qsl(body, keep_blank_values=True)))
+
+    def _serve(self, method, form):
+        _, path, query = _request_key(method, self.path)
+        entry = self.server.match(method, path, query, form)
+        if entry is None:
+            self.send_error(404, "没有对应的录制响应")
+            return
+        with open(os.path.join(self.server.fixture_dir, entry["file"]), "rb") as f:
+            body = f.read()
+        self.send_response(entry["status"])
+        self.send_header("Content-Type", entry["content_type"])
+        if entry.get("location"):
+            self.send_header("Location", entry["location"])
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logging.debug("fixture server: " + format, *args)
+
+
+def load_parity_dump(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return {(date, slot): str(count) for date, slot, count in json.load(f)}
+
+
+def dump_parity(path, availability_info):
+    """供 Selenium 流程写出对照数据：[[日期, 时段, 可预约数], ...]"""
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(sorted([date, slot, count] for (date, slot), count in availability_info.items()), f,
+                  ensure_ascii=False, indent=2)
+
+
+def diff_parity(expected, actual):
+    """返回 (只在 Selenium 中, 只在 HTTP 中, 数量不同) 三个列表"""
+    missing = sorted(set(expected) - set(actual))
+    extra = sorted(set(actual) - set(expected))
+    changed = sorted(key for key in set(expected) & set(actual) if str(expected[key]) != str(actual[key]))
+    return missing, extra, changed
+
+
+def print_parity(diff, total):
+    """打印 diff_parity() 的结果，一致时返回 True"""
+    missing, extra, changed = diff
+    for key in missing:
+        print(f"- 仅 Selenium：{key[0]} | {key[1]}")
+    for key in extra:
+        print(f"+ 仅 HTTP：{key[0]} | {key[1]}")
+    for key in changed:
+        print(f"~ 数量不同：{key[0]} | {key[1]}")
+    if missing or extra or changed:
+        print(f"❌ 结果不一致（{len(missing)} 缺少 / {len(extra)} 多出 / {len(changed)} 不同）")
+        return False
+    print(f"✅ 结果一致（{total} 个时段）")
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="回放录制的门户响应")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    serve_parser = subparsers.add_parser("serve", help="启动本地替身服务器")
+    serve_parser.add_argument("fixture_dir")
+    serve_parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    server = FixtureServer(args.fixture_dir, args.port)
+    print(f"回放 {args.fixture_dir}（{len(server.entries)} 条录制），地址 {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+东京都公园门户的多公园查询：有明、舍人、大井A、大井B 共用一个会话。
+
+原来四个脚本各自启动 Chrome、各自加载 index.jsp 并检索；这里只加载一次首页，
+之后每个公园都从保存的首页表单重新检索（tennis_metro_http.MetroPortalClient.scan_parks），
+按公园分别记录状态、分别发送通知。站点名称、时段名称与原脚本相同，状态数据库中的记录可以直接衔接。
+
+公园列表见 tennis_metro_http.METRO_PARKS，可用 TENNIS_METRO_PARKS 覆盖。
+有公园查询失败时，其余公园照常通知，失败计入熔断器并以非零状态退出；全部失败时退出码为 EXIT_PORTAL_DOWN。
+
+本脚本默认不调度：调度器中用 --metro（tennis_schedule.py 同样用 --metro）以本脚本取代
+ariake / toneri / oi_A / oi_B 四个 Job。
+"""
+
+import os
+import logging
+import smtplib
+from email.mime.text import MIMEText
+from email.mime.multipart import MIMEMultipart
+from urllib.parse import urlparse
+
+from dotenv import load_dotenv
+
+from tennis_delta import notify_changes, slots_from_items
+from tennis_metro_http import fetch_parks, configured_parks, filter_holidays_and_weekends, METRO_BASE_URL, HOME_PAGE
+from tennis_retry import check_portal, CircuitBreaker, EXIT_PORTAL_DOWN
+
+# ---------------------------
+# 配置日志和加载环境变量
+# ---------------------------
+logging.basicConfig(
+    filename="tennis_metro.log",
+    level=logging.INFO,
+    format="%(asctime)s - %(levelname)s - %(message)s",
+    datefmt="%Y-%m-%d %H:%M:%S",
+)
+load_dotenv("/root/tenniscourt/config.env", override=True)
+
+# 站点 → (邮件标题, 发件人环境变量, 密码环境变量)，与原脚本相同
+SITE_MAIL = {
+    "ariake": ("🏸 有明-网球场预约更新通知", "sender_email2", "password2"),
+    "toneri": ("🏸 舍人-网球场预约更新通知", "sender_email2", "password2"),
+    "oi_A": ("🏸 大井A-网球场预约更新通知", "sender_email", "password"),
+    "oi_B": ("🏸 大井B-网球场预约更新通知", "sender_email", "password"),
+}
+DEFAULT_MAIL = ("🏸 {site}-网球场预约更新通知", "sender_email", "password")
+EXIT_PARKS_FAILED = 1  # 部分公园查询失败（全部失败时为 EXIT_PORTAL_DOWN）
+
+
+# ---------------------------
+# 邮件发送
+# ---------------------------
+def email_sender(sender_env, password_env):
+    def send_email(subject, body):
+        sender_email = os.getenv(sender_env)  # 你的 Gmail 地址
+        receiver_email = os.getenv("receiver_email").split(",")  # 收件人邮箱列表
+        password = os.getenv(password_env)  # Gmail 应用专用密码
+
+        msg = MIMEMultipart()
+        msg["From"] = sender_email
+        msg["To"] = "<noreply@example.com>"
+        msg["Subject"] = subject
+        # 使用密送避免暴露收件人地址
+        msg["Bcc"] = ', '.join(receiver_email)
+        msg.attach(MIMEText(body, "plain"))
+
+        try:
+            server = smtplib.SMTP("smtp.gmail.com", 587)
+            server.starttls()
+            server.login(sender_email, password)
+            server.send_message(msg)
+            server.quit()
+            logging.info("📧 邮件发送成功")
+        except Exception as e:
+            logging.error(f"❌ 邮件发送失败: {e}")
+
+    return send_email
+
+
+def process_email_notification(site, availability_info):
+    """与该站点上次保存的时段集合比较，只在有新增 / 消失 / 数量变化时发送差异"""
+    subject, sender_env, password_env = SITE_MAIL.get(site, DEFAULT_MAIL)
+    notify_changes(site, slots_from_items(site, availability_info.items()),
+                   subject.format(site=site), email_sender(sender_env, password_env))
+
+
+# ---------------------------
+# 主流程
+# ---------------------------
+def main():
+    url = METRO_BASE_URL + HOME_PAGE
+    # 门户熔断中或预检失败时直接跳过
+    if not check_portal(url):
+        exit(EXIT_PORTAL_DOWN)
+
+    parks = configured_parks()
+    results, failed = fetch_parks(parks, date_filter=filter_holidays_and_weekends)
+    breaker = CircuitBreaker(urlparse(url).hostname)
+    if not results:
+        logging.error("❌ 所有公园均查询失败，放弃本次运行")
+        breaker.record_failure("所有公园均查询失败")
+        exit(EXIT_PORTAL_DOWN)
+
+    # 查询成功的公园照常通知；失败的公园不通知（不能当作空位消失）
+    for site, availability_info in results.items():
+        logging.info(f"{site} 所有可预约时间段:")
+        for (date, time_slot), count in availability_info.items():
+            logging.info(f"{date} | {time_slot} | 可预约：{count} 人")
+        process_email_notification(site, availability_info)
+
+    if failed:
+        # 部分失败同样计入熔断器，并以非零状态退出，调度器把本次运行记为失败
+        error = "；".join(f"{site}: {reason}" for site, reason in failed.items())
+        logging.error(f"❌ {len(failed)}/{len(parks)} 个公园查询失败：{error}")
+        breaker.record_failure(f"公园查询失败 {', '.join(failed)}")
+        exit(EXIT_PARKS_FAILED)
+    breaker.record_success()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,350 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+东京都公园预约门户（有明 / 舍人 / 大井）的无浏览器客户端。
+
+浏览器流程：index.jsp → 选择 purpose-home / bname-home → btn-go → 每个日期 selectDay()。
+这里用同一个 requests.Session 依次重放这些表单提交，直接解析返回的月历与
+A_YYYYMMDD_NN 时段输入框，一次运行只需要少量 HTTP 往返。
+
+    python tennis_metro_http.py --purpose 1000_1020 --park 1350
+    python tennis_metro_http.py --park 1350 --record fixtures/metro_1350     # 录制真实响应
+    python tennis_metro_http.py --park 1350 --base-url http://127.0.0.1:8765/web/   # 对录制回放运行
+    python tennis_metro_http.py --park 1350 --fixtures tests/fixtures/metro_1350 --parity ariake_selenium.json
+
+对照模式：tennis_ariake_new.py 在设置 TENNIS_PARITY_DUMP=<文件> 时会把 Selenium 流程的结果写入该文件，
+--parity 只保留休日与祝日（与脚本相同）后与本客户端的结果逐项比较，不一致时以非零状态退出。
+    python tennis_metro_http.py --parks     # 一个会话依次检索 METRO_PARKS 中的所有公园
+
+同一门户的多个公园不必各开一个会话：scan_parks() 只加载一次首页，
+之后每个公园都从保存的首页表单重新提交检索，按公园分别返回结果。
+公园列表可用环境变量覆盖：TENNIS_METRO_PARKS="ariake=1000_1020/1350;toneri=1000_1030/1140"（站点=种目/公园）。
+"""
+
+import os
+import re
+import sys
+import json
+import logging
+import argparse
+from datetime import datetime
+
+from tennis_http import PortalHttpClient, parse_page, find_form, find_onclick, parse_js_call
+from tennis_http_fixtures import FixtureServer, load_parity_dump, diff_parity, print_parity
+from tennis_parse import iter_month_cells
+
+METRO_BASE_URL = "https://kouen.sports.metro.tokyo.lg.jp/web/"
+HOME_PAGE = "index.jsp"
+TENNIS_HARD = "1000_1020"  # テニス（ハード）
+
+# 页面中识别不到 JS 函数时使用的默认值；接口名与字段名以录制的真实响应为准
+DEFAULT_SEARCH_ACTION = "rsvWOpeInstSrchVacantAction.do"
+DEFAULT_SELECT_DAY = {"form": "form1", "action": "rsvWOpeInstSrchVacantAction.do", "fields": {"selectDay": 0}}
+DEFAULT_NEXT_MONTH = {"form": "form1", "action": "rsvWOpeInstSrchVacantAction.do", "fields": {"transVacantMode": "8"}}
+
+SLOT_LABELS = {
+    "10": "9-11点", "20": "11-13点",
+    "30": "13-15点", "40": "15-17点",
+    "50": "17-19点", "60": "19-21点",
+}
+
+# 有明、大井的 Selenium 脚本从 7-9点 开始编号，时段名称与其状态数据库保持一致
+EARLY_SLOT_LABELS = {
+    "10": "7-9点", "20": "9-11点",
+    "30": "11-13点", "40": "13-15点",
+    "50": "15-17点", "60": "17-19点",
+    "70": "19-21点",
+}
+
+# 一个会话中依次检索的公园：(站点, 种目, 公园, 时段名称)
+METRO_PARKS = [
+    ("ariake", TENNIS_HARD, "1350", EARLY_SLOT_LABELS),
+    ("toneri", "1000_1030", "1140", SLOT_LABELS),
+    ("oi_A", TENNIS_HARD, "1310", EARLY_SLOT_LABELS),
+    ("oi_B", TENNIS_HARD, "1315", EARLY_SLOT_LABELS),
+]
+
+CALENDAR_STATUSES = ("全て空き", "一部空き", "予約あり")
+
+_CELL_ALT = re.compile(r'alt="(' + "|".join(CALENDAR_STATUSES) + r')"')
+_CELL_ONCLICK = re.compile(r'onclick="([^"]*)"')
+
+# 时段输入框：属性顺序不固定，按 id 与 value 分别提取
+_SLOT_INPUT = re.compile(r'<input\b[^>]*\bid="A_(\d{8})_(\d{2})"[^>]*>', re.S)
+_INPUT_VALUE = re.compile(r'\bvalue="(\d*)"')
+
+_MONTH_HEAD = re.compile(r'id="month-head"[^>]*>(.*?)</', re.S)
+
+
+def configured_parks():
+    """TENNIS_METRO_PARKS → [(站点, 种目, 公园, 时段名称)]，未设置时为 METRO_PARKS"""
+    config = os.getenv("TENNIS_METRO_PARKS", "")
+    if not config.strip():
+        return list(METRO_PARKS)
+    labels = {park: slot_labels for _, _, park, slot_labels in METRO_PARKS}
+    parks = []
+    for item in config.split(";"):
+        if not item.strip():
+            continue
+        try:
+            site, pair = item.split("=", 1)
+            purpose, park = pair.strip().split("/")
+            parks.append((site.strip(), purpose, park, labels.get(park, SLOT_LABELS)))
+        except ValueError:
+            logging.warning(f"⚠️ 无法解析公园配置：{item}")
+    return parks
+
+
+def parse_calendar(html):
+    """解析月历，返回 {日期: (状态, selectDay 调用)}，状态为 全て空き / 一部空き / 予約あり"""
+    calendar = {}
+    for date, attrs, inner in iter_month_cells(html):
+        status = _CELL_ALT.search(inner)
+        if not status:
+            continue
+        onclick = _CELL_ONCLICK.search(attrs)
+        calendar[date] = (status.group(1), parse_js_call(onclick.group(1)) if onclick else (None, []))
+    return calendar
+
+
+def parse_week_slots(html, date=None, slot_labels=SLOT_LABELS):
+    """
+    解析 #week-info 中的 A_YYYYMMDD_NN，返回 {(日期, 时段): 可预约数}。
+    可预约数为 0 的时段不计入，与 Selenium 流程（AvailabilityStore）一致。
+    """
+    slots = {}
+    for tag in _SLOT_INPUT.finditer(html):
+        slot_date, suffix = tag.group(1), tag.group(2)
+        if date and slot_date != date:
+            continue
+        value = _INPUT_VALUE.search(tag.group(0))
+        if value and value.group(1) and int(value.group(1)):
+            slots[(slot_date, slot_labels.get(suffix, "未知时间段"))] = value.group(1)
+    return slots
+
+
+def week_dates(html):
+    """周视图中出现的日期（包括没有空位的日期）"""
+    return {tag.group(1) for tag in _SLOT_INPUT.finditer(html)}
+
+
+def filter_holidays_and_weekends(dates):
+    """只保留日本的休日（周六、周日或祝日），与站点脚本相同"""
+    import jpholiday
+
+    def is_holiday_or_weekend(date_str):
+        date_obj = datetime.strptime(date_str, "%Y%m%d")
+        return date_obj.weekday() in [5, 6] or jpholiday.is_holiday(date_obj)
+
+    return [date for date in dates if is_holiday_or_weekend(date)]
+
+
+def parse_month_head(html):
+    match = _MONTH_HEAD.search(html)
+    return re.sub(r"<[^>]+>|\s+", "", match.group(1)) if match else ""
+
+
+class MetroPortalClient(PortalHttpClient):
+    """
+    东京都公园预约门户客户端：一个实例对应一个 Cookie 会话。
+    page 为最近一次的整页（含表单与脚本），view 为最近一次返回的月历（整页或局部刷新的片段）。
+    """
+
+    home_page = HOME_PAGE
+    slot_labels = SLOT_LABELS
+
+    def __init__(self, base_url=METRO_BASE_URL, record_dir=None):
+        super().__init__(base_url, record_dir)
+        self.page = None
+        self.view = None
+
+    def _show(self, html):
+        self.view = html
+        if "<form" in html:
+            self.page = html
+        return html
+
+    def open_home(self):
+        return self._show(self.get(self.home_page))
+
+    def search(self, purpose, park):
+        """提交首页的检索表单（相当于选择种目、公园后点击 btn-go），返回月历页"""
+        if self.page is None:
+            self.open_home()
+        forms, onclicks = parse_page(self.page)
+        form = find_form(forms, select_id="purpose-home")
+        if form is None:
+            raise RuntimeError("首页中未找到包含 purpose-home 的检索表单")
+        overrides = {
+            form.select_ids["purpose-home"]: purpose,
+            form.select_ids.get("bname-home", "bname"): park,
+        }
+        func, args = parse_js_call(onclicks.get("btn-go"))
+        return self._show(self.call_js(
+            self.page, func or "doSearch", args,
+            form.id or form.name, form.action or DEFAULT_SEARCH_ACTION, extra=overrides,
+        ))
+
+    def select_day(self, date, call=None):
+        """重放月历中该日期的 selectDay()，返回包含 #week-info 的页面（不替换当前月历页）"""
+        func, args = call or (None, [])
+        if not func:
+            func, args = "selectDay", [date]
+        return self.call_js(
+            self.page, func, args,
+            DEFAULT_SELECT_DAY["form"], DEFAULT_SELECT_DAY["action"], DEFAULT_SELECT_DAY["fields"],
+        )
+
+    def next_month(self):
+        """重放 next-month 按钮，当前月历切换到下月"""
+        func, args = parse_js_call(find_onclick(self.view, element_id="next-month"))
+        return self._show(self.call_js(
+            self.page, func or "nextMonth", args,
+            DEFAULT_NEXT_MONTH["form"], DEFAULT_NEXT_MONTH["action"], DEFAULT_NEXT_MONTH["fields"],
+        ))
+
+    def scan_month(self, date_filter=None, slots=None):
+        """
+        解析当前月历，并对有空位（全て空き / 一部空き）的日期取时段信息。
+        返回 (月历 {日期: 状态}, 时段 {(日期, 时段): 可预约数})
+        """
+        month_calendar = parse_calendar(self.view)
+        logging.info(f"🌐 {parse_month_head(self.view) or '月历'}：{len(month_calendar)} 天")
+        slots = {} if slots is None else slots
+        covered = {key[0] for key in slots}
+        open_dates = [d for d, (status, _) in month_calendar.items() if status != "予約あり"]
+        if date_filter:
+            open_dates = date_filter(open_dates)
+        for date in open_dates:
+            # 一次响应可能包含整周的时段，已经取到的日期不再请求
+            if date in covered:
+                continue
+            week_html = self.select_day(date, month_calendar[date][1])
+            slots.update(parse_week_slots(week_html, slot_labels=self.slot_labels))
+            covered |= week_dates(week_html) | {date}
+        return {date: status for date, (status, _) in month_calendar.items()}, slots
+
+    def scan(self, purpose, park, months=2, date_filter=None):
+        """
+        检索 months 个月的月历，并对有空位（全て空き / 一部空き）的日期取时段信息。
+        date_filter 接收日期列表并返回需要查看时段的日期（如只保留周末与祝日）。
+        返回 (月历 {日期: 状态}, 时段 {(日期, 时段): 可预约数})
+        """
+        self.search(purpose, park)
+        calendar, slots = {}, {}
+        for month_index in range(months):
+            month_calendar, _ = self.scan_month(date_filter, slots)
+            calendar.update(month_calendar)
+            if month_index + 1 < months:
+                self.next_month()
+        return calendar, slots
+
+    def scan_parks(self, parks, months=2, date_filter=None):
+        """
+        在同一个会话中依次检索多个公园：首页只加载一次，之后每个公园都从保存的首页表单重新提交。
+        parks 为 [(站点, 种目, 公园, 时段名称)]，返回 {站点: (月历, 时段)}；
+        某个公园出错时重新加载首页继续其余公园，该公园不出现在结果中，
+        失败原因记录在 self.failed_parks {站点: 原因}，由调用方报告并以非零状态退出。
+        """
+        results = {}
+        self.failed_parks = {}
+        home = None
+        for site, purpose, park, slot_labels in parks:
+            try:
+                if home is None:
+                    self.open_home()
+                    home = self.page
+                # 检索后 page 变为月历页，从保存的首页重新提交
+                self.page = self.view = home
+                self.slot_labels = slot_labels
+                results[site] = self.scan(purpose, park, months, date_filter)
+                logging.info(f"🏟️ {site}（公园 {park}）：{len(results[site][1])} 个时段")
+            except Exception as e:
+                # 页面结构变化等任何错误都只影响这个公园，但必须报告，不能当作“没有空位”
+                self.failed_parks[site] = f"{type(e).__name__}: {e}"
+                logging.error(f"❌ {site}（公园 {park}）查询失败: {self.failed_parks[site]}")
+                home = None
+        return results
+
+
+def fetch_availability(site, park, purpose=TENNIS_HARD, months=2, date_filter=None, base_url=METRO_BASE_URL):
+    """
+    站点脚本使用的入口：返回与 Selenium 流程相同结构的 {(日期, 时段): 可预约数}，
+    只保留传入 date_filter 后的日期。
+    """
+    client = MetroPortalClient(base_url)
+    calendar, slots = client.scan(purpose, park, months, date_filter)
+    client.report(site)
+    wanted = set(date_filter(list(calendar)) if date_filter else calendar)
+    return {key: count for key, count in slots.items() if key[0] in wanted}
+
+
+def fetch_parks(parks=None, months=2, date_filter=None, base_url=METRO_BASE_URL):
+    """
+    一个会话查询多个公园：返回 ({站点: {(日期, 时段): 可预约数}}, {查询失败的站点: 原因})，
+    前者的结构与 fetch_availability() 相同，查询失败的公园只出现在后者中。
+    """
+    client = MetroPortalClient(base_url)
+    results = client.scan_parks(configured_parks() if parks is None else parks, months, date_filter)
+    client.report(f"{len(results)} 个公园")
+    availability = {}
+    for site, (calendar, slots) in results.items():
+        wanted = set(date_filter(list(calendar)) if date_filter else calendar)
+        availability[site] = {key: count for key, count in slots.items() if key[0] in wanted}
+    return availability, client.failed_parks
+
+
+def _dump_slots(calendar, slots):
+    return {
+        "calendar": calendar,
+        "slots": {f"{date} {label}": count for (date, label), count in sorted(slots.items())},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="不启动浏览器查询东京都公园的网球场空位")
+    parser.add_argument("--purpose", default=TENNIS_HARD, help="种目（purpose-home 的值）")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--park", help="公园（bname-home 的值），如 1350 有明、1140 舍人")
+    target.add_argument("--parks", action="store_true", help="一个会话依次检索 TENNIS_METRO_PARKS 中的所有公园")
+    parser.add_argument("--months", type=int, default=2)
+    parser.add_argument("--base-url", default=METRO_BASE_URL, help="门户地址，可指向本地回放服务器")
+    parser.add_argument("--record", metavar="DIR", help="把所有响应录制到该目录")
+    parser.add_argument("--fixtures", metavar="DIR", help="在本地回放该目录的录制并对其运行")
+    parser.add_argument("--parity", metavar="FILE", help="与 Selenium 流程写出的结果比较（只比较休日与祝日）")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    base_url = args.base_url
+    if args.fixtures:
+        server = FixtureServer(args.fixtures)
+        base_url = server.start() + "/web/"
+
+    if args.parity:
+        if args.parks:
+            parser.error("--parity 只能与 --park 一起使用")
+        availability_info = fetch_availability(
+            f"公园 {args.park}", args.park, args.purpose, args.months, filter_holidays_and_weekends, base_url
+        )
+        if not print_parity(diff_parity(load_parity_dump(args.parity), availability_info), len(availability_info)):
+            sys.exit(1)
+        return
+
+    client = MetroPortalClient(base_url, args.record)
+    if args.parks:
+        results = client.scan_parks(configured_parks(), args.months)
+        client.report(f"{len(results)} 个公园")
+        output = {site: _dump_slots(*result) for site, result in results.items()}
+    else:
+        calendar, slots = client.scan(args.purpose, args.park, args.months)
+        client.report(f"公园 {args.park}")
+        output = _dump_slots(calendar, slots)
+    print(json.dumps(output, ensure_ascii=False, indent=2))
+    if args.parks and client.failed_parks:
+        for site, error in client.failed_parks.items():
+            print(f"❌ {site}：{error}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
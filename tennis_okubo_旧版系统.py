@@ -3,8 +3,6 @@
 
 import os
 import re
-import time
-import random
 import logging
 import smtplib
 from datetime import datetime
@@ -15,15 +13,14 @@ from dotenv import load_dotenv
 import jpholiday
 from bs4 import BeautifulSoup
 
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException, NoSuchElementException, ElementNotInteractableException
+from selenium.common.exceptions import NoSuchElementException, ElementNotInteractableException
 
-from webdriver_manager.chrome import ChromeDriverManager
+from tennis_driver import create_driver, record_page_metrics
+from tennis_retry import check_portal, load_page_with_retry, EXIT_PORTAL_DOWN
+from tennis_delta import notify_changes as notify_slot_changes, slots_from_entries
 
 # ---------------------------
 # 配置日志与环境变量
@@ -37,28 +34,13 @@ logging.basicConfig(
 )
 load_dotenv("/root/tenniscourt/config.env", override=True)
 
-# 随机等待一段时间，降低请求频率
-time.sleep(random.uniform(1, 30))
-
 
 # ---------------------------
 # Selenium 初始化与页面导航
 # ---------------------------
 def init_driver():
     """初始化并返回配置好的 Chrome WebDriver"""
-    options = Options()
-    options.add_argument("--headless")  # 无头模式
-    options.add_argument("--disable-gpu")
-    options.add_argument("--window-size=1920x1080")
-    options.add_argument("--no-sandbox")
-    options.add_argument("--disable-dev-shm-usage")
-    options.add_argument("--disable-blink-features=AutomationControlled")
-    options.add_argument(
-        "user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-        "AppleWebKit/537.36 (KHTML, like Gecko) Chrome/131.0.0.0 Safari/537.36"
-    )
-    service = Service(ChromeDriverManager().install())
-    return webdriver.Chrome(service=service, options=options)
+    return create_driver("okubo_new")
 
 
 def load_homepage(driver, url):
@@ -66,25 +48,20 @@ def load_homepage(driver, url):
     加载主页并检查是否为服务休止日。
     如果检测到“本日はサービス休止日となっております”，则退出程序。
     """
-    while True:
-        driver.get(url)
-        try:
-            WebDriverWait(driver, 10).until(EC.visibility_of_element_located((By.ID, "contents")))
-            logging.info("主页加载成功")
-            # 检查是否为休止日
-            try:
-                inner_text = driver.find_element(By.ID, "inner-contents").text
-                if "本日はサービス休止日となっております" in inner_text:
-                    logging.warning("⚠️ 今日是服务休止日，程序终止。")
-                    driver.quit()
-                    exit(0)
-            except NoSuchElementException:
-                logging.info("✅ 未发现休止日提示，继续执行。")
-            break
-        except TimeoutException:
-            logging.warning("主页加载超时，正在刷新...")
-    time.sleep(random.uniform(1, 3))
+    if not load_page_with_retry(driver, url, (By.ID, "contents")):
+        driver.quit()
+        exit(EXIT_PORTAL_DOWN)
+    # 检查是否为休止日
+    try:
+        inner_text = driver.find_element(By.ID, "inner-contents").text
+        if "本日はサービス休止日となっております" in inner_text:
+            logging.warning("⚠️ 今日是服务休止日，程序终止。")
+            driver.quit()
+            exit(0)
+    except NoSuchElementException:
+        logging.info("✅ 未发现休止日提示，继续执行。")
     logging.info("初始页面加载完成")
+    record_page_metrics(driver, "okubo_new", "主页")
 
 
 def perform_navigation(driver):
@@ -277,46 +254,28 @@ def send_email(subject, body):
         logging.error(f"❌ 邮件发送失败: {e}")
 
 
-def notify_changes(availability_info, last_file="last_availability_okubo_new.txt"):
-    """
-    将当前预约信息格式化后与上次保存的数据比较，
-    如果有变化，则发送邮件通知并更新保存文件。
-    """
-    # 定义曜日映射（注意此映射顺序需与日期解析保持一致）
-    weekday_japanese = ["水", "木", "金", "土", "日", "月", "火"]
-    
-    # 格式化当前预约信息，每行显示 日期 (星期) | 时间段 | 可预约
-    current_availability = "\n".join([
-        f"{entry['date']} ({weekday_japanese[datetime.strptime(entry['date'], '%m/%d').weekday()]}) | {entry['time']} | 可预约"
-        for entry in availability_info
-    ])
-    
-    if os.path.exists(last_file):
-        with open(last_file, "r", encoding="utf-8") as f:
-            last_availability = f.read().strip()
-    else:
-        last_availability = ""
-    
-    if current_availability and current_availability.strip() != last_availability.strip():
-        logging.info("🔔 预约信息发生变化，发送邮件通知")
-        email_subject = "🏸 大久保-网球场预约更新通知"
-        email_body = "本次查询到的可预约时间如下：\n\n" + current_availability
-        send_email(email_subject, email_body)
-        with open(last_file, "w", encoding="utf-8") as f:
-            f.write(current_availability)
-    else:
+def notify_changes(availability_info):
+    """与状态数据库中上次的快照比较，只在有新增 / 消失时发送差异；本次结果作为新快照写入状态数据库"""
+    if not availability_info:
         logging.info("✅ 预约信息无变化，不发送邮件")
+        return
+    notify_slot_changes("okubo_new", slots_from_entries("okubo_new", availability_info),
+                        "🏸 大久保-网球场预约更新通知", send_email)
 
 
 # ---------------------------
 # 主流程
 # ---------------------------
 def main():
-    driver = init_driver()
     url = "https://user.shinjuku-shisetsu-yoyaku.jp/regasu/reserve/gin_menu"
+    # 门户熔断中或预检失败时不启动 Chrome
+    if not check_portal(url):
+        exit(EXIT_PORTAL_DOWN)
+    driver = init_driver()
     try:
         load_homepage(driver, url)
         page_html = perform_navigation(driver)
+        record_page_metrics(driver, "okubo_new", "空位页")
         if not page_html:
             logging.error("未能获取一周空位页面的HTML内容。")
             driver.quit()
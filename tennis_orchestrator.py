@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+常驻的调度进程：在一个进程里按各自的间隔运行所有网球场脚本，取代每个脚本一个 cron 任务。
+
+  - 每个站点是一个 Job（脚本、间隔、并发上限、超时）；
+  - asyncio 负责调度，每次运行在独立的线程中用 runpy 执行阻塞的 Selenium 脚本，
+    同时运行的脚本数由信号量限制（--workers），超时从取得名额、真正开始运行时计算；
+  - 线程无法强制结束：超时的运行记为 timeout，但在线程真正退出之前继续占用名额，
+    同时运行的 Chrome 不会超过 --workers；该站点在此之前跳过调度（包括排队等待名额的运行），不会叠加；
+  - 各站点按 tennis_schedule.py 的固定相位运行：同一门户的站点在周期内等间隔错开，
+    固定间隔时每次都在 周期整数倍 + 相位 运行，运行超时错过的时刻直接跳到下一个；
+    日志统一写入 tennis_orchestrator.log，线程名即站点名；
+  - 每个 Job 的 上次开始 / 耗时 / 结果 / 下次运行 写入 orchestrator_state.json；
+    门户熔断或主页多次加载失败的运行结果为 portal_down（tennis_retry.py）；
+  - --adaptive（或 TENNIS_ADAPTIVE=1）时由 tennis_policy.AdaptivePolicy 按各站点的变化频率决定间隔；
+  - --burst（或 TENNIS_BURST=1）时在下月空位的放出时刻前后进入突发模式（tennis_burst.py）。
+
+    python tennis_orchestrator.py                      # 常驻运行
+    python tennis_orchestrator.py --adaptive           # 自适应间隔
+    python tennis_orchestrator.py --burst              # 放出时刻的突发模式
+    python tennis_orchestrator.py --once               # 所有站点各运行一次后退出
+    python tennis_orchestrator.py --only ariake okubo  # 只调度指定站点
+    python tennis_orchestrator.py --status             # 查看各 Job 状态
+"""
+
+import os
+import sys
+import json
+import time
+import runpy
+import asyncio
+import logging
+import argparse
+import threading
+
+from tennis_retry import EXIT_PORTAL_DOWN
+from tennis_schedule import METRO_SITES, phase_offsets, next_phase_time
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+STATE_FILE = "orchestrator_state.json"
+DEFAULT_INTERVAL = int(os.getenv("TENNIS_JOB_INTERVAL", "600"))
+DEFAULT_TIMEOUT = int(os.getenv("TENNIS_JOB_TIMEOUT", "900"))
+MAX_WORKERS = int(os.getenv("TENNIS_MAX_WORKERS", "3"))  # 同时运行的 Chrome 数
+
+
+class Job:
+    def __init__(self, name, script, interval=DEFAULT_INTERVAL, concurrency=1, timeout=DEFAULT_TIMEOUT):
+        self.name = name
+        self.script = os.path.join(BASE_DIR, script)
+        self.interval = interval
+        self.timeout = timeout
+        self.concurrency = concurrency
+        self.running = set()  # 排队中或尚未结束的运行（asyncio future）
+        self.state = {
+            "interval": interval,
+            "runs": 0,
+            "failures": 0,
+            "last_started": None,
+            "last_duration": None,
+            "last_status": None,
+            "next_run": None,
+        }
+
+
+JOBS = [
+    Job("ariake", "tennis_ariake.py"),
+    Job("ariake_new", "tennis_ariake_new.py"),
+    Job("toneri", "tennis_toneri.py"),
+    Job("toneri_new", "tennis_toneri_new.py"),
+    Job("oi_A", "tennis_oi_A.py"),
+    Job("oi_B", "tennis_oi_B.py"),
+    Job("okubo", "tennis_okubo.py"),
+    Job("kamitakada", "tennis_kamitakada.py"),
+    Job("tetsugaku", "tennis_tetsugaku.py"),
+]
+
+# --metro：用一个会话查询所有都立公园的 Job 取代 METRO_SITES 这四个 Job
+METRO_JOB = Job("metro", "tennis_metro.py")
+
+
+def run_script(name, script):
+    """在独立线程中运行：以 __main__ 执行脚本，返回 "ok" 或失败原因"""
+    threading.current_thread().name = name
+    try:
+        runpy.run_path(script, run_name="__main__")
+    except SystemExit as e:
+        # 脚本用 exit(0) 表示“没有空位，正常结束”
+        if e.code == EXIT_PORTAL_DOWN:
+            return "portal_down"
+        if e.code not in (None, 0):
+            return f"exit {e.code}"
+    except Exception as e:
+        logging.exception(f"❌ {name} 运行出错：{e}")
+        return type(e).__name__
+    return "ok"
+
+
+class Orchestrator:
+    def __init__(self, jobs, max_workers=MAX_WORKERS, policy=None, burst=False):
+        self.jobs = jobs
+        self.policy = policy
+        self.burst = burst
+        self.workers = asyncio.Semaphore(max_workers)
+
+    def write_state(self):
+        state = {job.name: job.state for job in self.jobs}
+        tmp_file = STATE_FILE + ".tmp"
+        with open(tmp_file, "w", encoding="utf-8") as f:
+            json.dump(state, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_file, STATE_FILE)
+
+    @staticmethod
+    def _start_thread(loop, future, job):
+        def target():
+            status = "error"
+            try:
+                status = run_script(job.name, job.script)
+            finally:
+                if not loop.is_closed():
+                    loop.call_soon_threadsafe(future.set_result, status)
+
+        threading.Thread(target=target, name=job.name, daemon=True).start()
+
+    async def run_once(self, job):
+        """运行一次；上一次仍未结束时跳过"""
+        running = {future for future in job.running if not future.done()}
+        job.running = running
+        if len(running) >= job.concurrency:
+            logging.warning(f"⏭️ {job.name} 上一次运行尚未结束，跳过本次调度")
+            job.state["last_status"] = "skipped"
+            return
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        job.running.add(future)  # 排队等待名额时也算作运行中
+        try:
+            await self.workers.acquire()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        # 名额在线程真正退出时才归还（超时后仍然占用），--workers 是 Chrome 实例数的硬上限
+        future.add_done_callback(lambda _: self.workers.release())
+        started = time.time()
+        job.state["last_started"] = started
+        self._start_thread(loop, future, job)
+        try:
+            # shield：超时后不等待线程，但 future 仍在 job.running 中，线程真正退出前不会再次调度
+            status = await asyncio.wait_for(asyncio.shield(future), job.timeout)
+        except asyncio.TimeoutError:
+            status = "timeout"
+            logging.error(f"⏱️ {job.name} 超过 {job.timeout} 秒仍未结束，线程退出前继续占用运行名额，也不再调度")
+        job.state["runs"] += 1
+        job.state["last_duration"] = round(time.time() - started, 1)
+        job.state["last_status"] = status
+        if status != "ok":
+            job.state["failures"] += 1
+        logging.info(f"🏁 {job.name} {status}，用时 {job.state['last_duration']} 秒")
+
+    async def schedule(self, job, phase=0):
+        next_run = next_phase_time(phase, job.interval)
+        while True:
+            job.state["next_run"] = next_run
+            self.write_state()
+            await asyncio.sleep(max(next_run - time.time(), 0))
+            started = time.time()
+            await self.run_once(job)
+            if self.policy:
+                # 读取状态数据库可能等待其他脚本的写事务，不在事件循环中执行
+                interval = await asyncio.get_running_loop().run_in_executor(
+                    None, self.policy.next_interval, job.name, started
+                )
+                next_run = started + interval
+            else:
+                # 固定间隔：保持相位，本次运行超过间隔时跳到下一个相位时刻
+                interval = job.interval
+                next_run = next_phase_time(phase, interval, max(next_run + interval, time.time()))
+            job.state["interval"] = round(interval)
+
+    async def _wait_running(self, jobs):
+        pending = [future for job in jobs for future in job.running if not future.done()]
+        if pending:
+            await asyncio.wait(pending)
+
+    async def watch_release(self, name, jobs):
+        """突发模式：放出前预热，轮询到下月开放后立即运行 jobs"""
+        import tennis_burst
+
+        loop = asyncio.get_running_loop()
+        while True:
+            release, source = await loop.run_in_executor(None, tennis_burst.next_release, name)
+            if release is None:
+                # 还没有配置也没有观测到放出时刻，一天后再从新的观测中学习
+                await asyncio.sleep(86400)
+                continue
+            logging.info(f"🗓️ {name} 下一次放出时刻（{source}）"
+                         f"{time.strftime('%Y-%m-%d %H:%M', time.localtime(release))}")
+            await asyncio.sleep(max(release - tennis_burst.BURST_LEAD - time.time(), 0))
+
+            logging.info(f"⚡ {name} 进入突发模式")
+            # 预热：各 Job 先运行一次，浏览器会话停在结果页，放出后恢复会话即可直接查询
+            warmups = [asyncio.ensure_future(self.run_once(job)) for job in jobs]
+            opened_at = await loop.run_in_executor(
+                None, tennis_burst.wait_for_release, name, release + tennis_burst.BURST_WINDOW
+            )
+            await asyncio.gather(*warmups)
+            if opened_at:
+                await loop.run_in_executor(None, tennis_burst.record_detected, name, opened_at)
+                await self._wait_running(jobs)
+                # metro 同时属于四个目标：放出后已经由其他目标运行过的 Job 不再重复运行
+                rerun = [job for job in jobs if (job.state["last_started"] or 0) < opened_at]
+                await asyncio.gather(*(self.run_once(job) for job in rerun))
+                logging.info(f"🚀 {name} 放出后 {time.time() - opened_at:.0f} 秒完成日级别查询")
+            self.write_state()
+            # 离开本次窗口后再计算下一次
+            await asyncio.sleep(max(release + tennis_burst.BURST_WINDOW - time.time(), 0) + 1)
+
+    def burst_tasks(self):
+        import tennis_burst
+
+        names = {job.name: job for job in self.jobs}
+        tasks = []
+        for target, (_, _, job_names) in tennis_burst.BURST_TARGETS.items():
+            jobs = [names[name] for name in job_names if name in names]
+            if jobs:
+                tasks.append(self.watch_release(target, jobs))
+        return tasks
+
+    async def run_forever(self):
+        # 按固定相位错开，同一门户的站点不会同时访问，也不会同时打开 Chrome
+        phases = phase_offsets([job.name for job in self.jobs], min(job.interval for job in self.jobs))
+        tasks = [self.schedule(job, phases[job.name]) for job in self.jobs]
+        if self.burst:
+            tasks += self.burst_tasks()
+        await asyncio.gather(*tasks)
+
+    async def run_all_once(self):
+        await asyncio.gather(*(self.run_once(job) for job in self.jobs))
+        self.write_state()
+
+
+def print_status():
+    try:
+        with open(STATE_FILE, "r", encoding="utf-8") as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        print("尚无调度记录")
+        return
+
+    def fmt(ts):
+        return time.strftime("%m-%d %H:%M:%S", time.localtime(ts)) if ts else "-"
+
+    print(f"{'站点':<12}{'上次开始':<16}{'耗时':>8}  {'结果':<12}{'下次运行':<16}{'次数':>6}{'失败':>6}")
+    for name, job in state.items():
+        duration = f"{job['last_duration']:.0f}s" if job["last_duration"] is not None else "-"
+        print(f"{name:<12}{fmt(job['last_started']):<16}{duration:>8}  {job['last_status'] or '-':<12}"
+              f"{fmt(job['next_run']):<16}{job['runs']:>6}{job['failures']:>6}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="在一个进程中调度所有网球场脚本")
+    parser.add_argument("--once", action="store_true", help="所有站点各运行一次后退出")
+    parser.add_argument("--only", nargs="+", metavar="SITE", help="只调度这些站点")
+    parser.add_argument("--adaptive", action="store_true", default=bool(os.getenv("TENNIS_ADAPTIVE")),
+                        help="按各站点的变化频率自适应调整间隔")
+    parser.add_argument("--burst", action="store_true", default=bool(os.getenv("TENNIS_BURST")),
+                        help="在下月空位的放出时刻前后进入突发模式")
+    parser.add_argument("--metro", action="store_true", default=bool(os.getenv("TENNIS_METRO_MULTI")),
+                        help="有明、舍人、大井A/B 合并为一个会话查询（tennis_metro.py）")
+    parser.add_argument("--workers", type=int, default=MAX_WORKERS, help="同时运行的脚本数上限（超时的脚本在线程退出前仍然计入）")
+    parser.add_argument("--status", action="store_true", help="显示各 Job 的状态")
+    args = parser.parse_args()
+
+    if args.status:
+        print_status()
+        return
+
+    # 脚本中的 logging.basicConfig 在根 logger 已配置时不生效，日志统一写到这里
+    logging.basicConfig(
+        filename="tennis_orchestrator.log",
+        level=logging.INFO,
+        format="%(asctime)s - %(threadName)s - %(levelname)s - %(message)s",
+        datefmt="%Y-%m-%d %H:%M:%S",
+    )
+    sys.path.insert(0, BASE_DIR)
+
+    all_jobs = JOBS
+    if args.metro:
+        all_jobs = [job for job in JOBS if job.name not in METRO_SITES] + [METRO_JOB]
+    jobs = [job for job in all_jobs if not args.only or job.name in args.only]
+    if not jobs:
+        parser.error(f"没有匹配的站点，可选：{', '.join(job.name for job in all_jobs)}")
+    policy = None
+    if args.adaptive:
+        from tennis_policy import AdaptivePolicy
+        policy = AdaptivePolicy([job.name for job in jobs])
+    orchestrator = Orchestrator(jobs, args.workers, policy, args.burst)
+    logging.info(f"🚀 调度 {len(jobs)} 个站点，同时运行上限 {args.workers}"
+                 + ("，自适应间隔" if policy else "") + ("，突发模式" if args.burst else ""))
+    try:
+        asyncio.run(orchestrator.run_all_once() if args.once else orchestrator.run_forever())
+    except KeyboardInterrupt:
+        logging.info("🛑 收到中断，停止调度")
+
+
+if __name__ == "__main__":
+    main()
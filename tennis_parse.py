@@ -0,0 +1,344 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+门户页面的解析器。
+
+月历：按 <td id="month_YYYYMMDD"> 单元格逐个切分，只在单元格内部查找状态图标的 alt，
+一次线性扫描得到 {日期: 状态}。原来的
+    <td id="month_(\\d+)"...onclick="javascript:selectDay\\(\\d+\\);".*?<img[^>]*?alt="(全て空き|一部空き)"
+会让 .*? 越过没有匹配图标的单元格（如 予約あり）一直扫描到后面的单元格，
+既慢，又会把后一天的状态记到前一天上。
+
+中野区时间表：一次遍历取出 (设施, 时段, 图标)。解析后端可插拔，按 selectolax → lxml → html.parser
+的顺序使用已安装的第一个，也可以用环境变量 TENNIS_PARSER_BACKEND 指定。
+
+    python tennis_parse.py bench month1.html month2.html   # 与原正则比较（不指定文件时使用生成的月历）
+    python tennis_parse.py bench-timetable day1.html        # 比较各时间表解析后端
+"""
+
+import os
+import re
+import sys
+import time
+import logging
+import argparse
+from html.parser import HTMLParser
+
+try:
+    from selectolax.parser import HTMLParser as SelectolaxParser
+except ImportError:
+    SelectolaxParser = None
+
+try:
+    import lxml.html
+except ImportError:
+    lxml = None
+
+STATUS_AVAILABLE = "全て空き"
+STATUS_PARTIAL = "一部空き"
+STATUS_BOOKED = "予約あり"
+STATUS_CLOSED = "受付なし"  # 没有状态图标的日期（休馆日、受付期间外等）
+OPEN_STATUSES = (STATUS_AVAILABLE, STATUS_PARTIAL)
+
+# 单元格边界：<td ... id="month_YYYYMMDD" ...> 到下一个 </td>；单元格不嵌套，整体为线性扫描
+_MONTH_CELL = re.compile(r'<td\b(?=[^>]*\bid="month_(\d{8})")([^>]*)>(.*?)</td>', re.S)
+_CELL_ALT = re.compile(r'<img\b[^>]*?\balt="([^"]*)"')
+_CELL_SELECT_DAY = re.compile(r'\bonclick="[^"]*selectDay\(')
+
+# 原实现，仅供基准测试比较
+_LEGACY_MONTH_PATTERN = re.compile(
+    r'<td id="month_(\d+)"[^>]*onclick="javascript:selectDay\(\d+\);".*?<img[^>]*?alt="(全て空き|一部空き)"',
+    re.S,
+)
+
+
+def iter_month_cells(html):
+    """逐个返回月历单元格：(日期, td 属性, 单元格内容)"""
+    for match in _MONTH_CELL.finditer(html):
+        yield match.group(1), match.group(2), match.group(3)
+
+
+def parse_month_calendar(html):
+    """
+    解析月历，返回 {日期: 状态}。
+    状态为图标的 alt（全て空き / 一部空き / 予約あり 等）；没有图标的日期为 受付なし。
+    有空位状态但不可点击（没有 selectDay）的日期同样视为 受付なし。
+    """
+    calendar = {}
+    for date, attrs, inner in iter_month_cells(html):
+        alt = _CELL_ALT.search(inner)
+        status = alt.group(1) if alt else STATUS_CLOSED
+        if status in OPEN_STATUSES and not _CELL_SELECT_DAY.search(attrs):
+            status = STATUS_CLOSED
+        calendar[date] = status
+    return calendar
+
+
+def split_open_dates(calendar):
+    """返回 (完全空闲日期列表, 部分空闲日期列表)，与原 extract_available_dates() 相同"""
+    available = [date for date, status in calendar.items() if status == STATUS_AVAILABLE]
+    partial = [date for date, status in calendar.items() if status == STATUS_PARTIAL]
+    return available, partial
+
+
+def calendar_opened(calendar):
+    """月历中是否已有状态图标（下月未开放查询时所有日期都没有图标）"""
+    return any(status != STATUS_CLOSED for status in calendar.values())
+
+
+# ---------------------------
+# 中野区时间表
+# ---------------------------
+TIMETABLE_CELL_PREFIXES = ("td11_", "td12_", "td13_", "td14_", "td15_", "td16_")
+_TIMETABLE_CELL_CSS = ", ".join(f"td[id^='{prefix}']" for prefix in TIMETABLE_CELL_PREFIXES)
+_TIMETABLE_CELL_XPATH = " or ".join(f"starts-with(@id, '{prefix}')" for prefix in TIMETABLE_CELL_PREFIXES)
+UNKNOWN_TIME = "未知时段"
+
+
+def _combine_timetable(day, times, facilities, rows):
+    """
+    按原实现的对应方式组合结果：第 i 个 tbody tr 对应第 i 个设施名称，第 j 个时段单元格对应第 j 个时段。
+    rows 为每个 tbody tr 中时段单元格的图标文件名列表（无图标为 None）。
+    """
+    times = [text.replace("～", "-") for text in times]
+    timetable = []
+    for row_index, icons in enumerate(rows[:len(facilities)]):
+        for time_index, icon in enumerate(icons):
+            if icon is not None:
+                timetable.append((
+                    facilities[row_index],
+                    times[time_index] if time_index < len(times) else UNKNOWN_TIME,
+                    icon,
+                ))
+    return day, timetable
+
+
+def _icon_name(src):
+    return (src or "").rsplit("/", 1)[-1]
+
+
+def _timetable_selectolax(html):
+    tree = SelectolaxParser(html)
+    day = tree.css_first("li.day#li")
+    times = [th.text(strip=True) for th in tree.css("thead tr th[id^='td10_']")]
+    facilities = [strong.text(strip=True) for strong in tree.css("tbody tr th strong")]
+    rows = []
+    for row in tree.css("tbody tr"):
+        icons = []
+        for cell in row.css(_TIMETABLE_CELL_CSS):
+            img = cell.css_first("img")
+            icons.append(_icon_name(img.attributes.get("src")) if img is not None else None)
+        rows.append(icons)
+    return _combine_timetable(day.text(strip=True) if day is not None else "", times, facilities, rows)
+
+
+def _timetable_lxml(html):
+    tree = lxml.html.fromstring(html)
+    day = tree.xpath("//li[@id='li' and contains(concat(' ', normalize-space(@class), ' '), ' day ')]")
+    times = [th.text_content().strip() for th in tree.xpath("//thead//tr//th[starts-with(@id, 'td10_')]")]
+    facilities = [strong.text_content().strip() for strong in tree.xpath("//tbody//tr//th//strong")]
+    rows = []
+    for row in tree.xpath("//tbody//tr"):
+        icons = []
+        for cell in row.xpath(f".//td[{_TIMETABLE_CELL_XPATH}]"):
+            img = cell.xpath(".//img")
+            icons.append(_icon_name(img[0].get("src")) if img else None)
+        rows.append(icons)
+    return _combine_timetable(day[0].text_content().strip() if day else "", times, facilities, rows)
+
+
+class _TimetableParser(HTMLParser):
+    """标准库 html.parser 的单次遍历实现，没有安装其他解析库时使用"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.day, self.times, self.facilities, self.rows = "", [], [], []
+        self._section = None  # "thead" / "tbody"
+        self._capture = None  # 正在收集文字的目标："day" / "time" / "facility"
+        self._capture_tag = None
+        self._capture_depth = 0
+        self._text = []
+        self._in_cell = False  # 是否位于时段单元格内
+        self._in_th = False
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag in ("thead", "tbody"):
+            self._section = tag
+        elif tag == "tr" and self._section == "tbody":
+            self.rows.append([])
+        elif tag == "th":
+            self._in_th = True
+        elif tag == "td" and self._section == "tbody" and self.rows:
+            if (attrs.get("id") or "").startswith(TIMETABLE_CELL_PREFIXES):
+                self.rows[-1].append(None)
+                self._in_cell = True
+                return
+        elif tag == "img" and self._in_cell and self.rows and self.rows[-1][-1] is None:
+            self.rows[-1][-1] = _icon_name(attrs.get("src"))
+
+        if self._capture:
+            if tag == self._capture_tag:
+                self._capture_depth += 1
+            return
+        if tag == "li" and attrs.get("id") == "li" and "day" in (attrs.get("class") or "").split():
+            self._start_capture("day", tag)
+        elif tag == "th" and self._section == "thead" and (attrs.get("id") or "").startswith("td10_"):
+            self._start_capture("time", tag)
+        elif tag == "strong" and self._section == "tbody" and self._in_th:
+            self._start_capture("facility", tag)
+
+    def _start_capture(self, target, tag):
+        self._capture, self._capture_tag, self._capture_depth, self._text = target, tag, 1, []
+
+    def handle_data(self, data):
+        if self._capture:
+            self._text.append(data.strip())
+
+    def handle_endtag(self, tag):
+        if tag == "td" and self._in_cell:
+            self._in_cell = False
+        elif tag in ("thead", "tbody"):
+            self._section = None
+        elif tag == "th":
+            self._in_th = False
+        if self._capture and tag == self._capture_tag:
+            self._capture_depth -= 1
+            if self._capture_depth == 0:
+                text = "".join(self._text)
+                if self._capture == "day":
+                    self.day = text
+                elif self._capture == "time":
+                    self.times.append(text)
+                else:
+                    self.facilities.append(text)
+                self._capture = None
+
+
+def _timetable_html_parser(html):
+    parser = _TimetableParser()
+    parser.feed(html)
+    parser.close()
+    return _combine_timetable(parser.day, parser.times, parser.facilities, parser.rows)
+
+
+TIMETABLE_BACKENDS = {}
+if SelectolaxParser is not None:
+    TIMETABLE_BACKENDS["selectolax"] = _timetable_selectolax
+if lxml is not None:
+    TIMETABLE_BACKENDS["lxml"] = _timetable_lxml
+TIMETABLE_BACKENDS["html.parser"] = _timetable_html_parser
+
+TIMETABLE_BACKEND = os.getenv("TENNIS_PARSER_BACKEND") or next(iter(TIMETABLE_BACKENDS))
+if TIMETABLE_BACKEND not in TIMETABLE_BACKENDS:
+    # 拼错或未安装的后端不能等到第一次解析时才报 KeyError
+    logging.warning(f"⚠️ TENNIS_PARSER_BACKEND={TIMETABLE_BACKEND} 不可用（可选：{', '.join(TIMETABLE_BACKENDS)}），改用 html.parser")
+    TIMETABLE_BACKEND = "html.parser"
+
+
+def parse_timetable(html, backend=None):
+    """
+    解析中野区一天的时间表，返回 (日期文字, [(设施, 时段, 图标文件名)])，
+    与 tennis_extract.extract_timetable() 的结构相同。
+    """
+    return TIMETABLE_BACKENDS[backend or TIMETABLE_BACKEND](html)
+
+
+# ---------------------------
+# 基准测试
+# ---------------------------
+def _legacy_split(html):
+    available, partial = [], []
+    for match in _LEGACY_MONTH_PATTERN.finditer(html):
+        (available if match.group(2) == STATUS_AVAILABLE else partial).append(match.group(1))
+    return available, partial
+
+
+def _sample_month_page():
+    """生成一个与门户结构相同的月历页面：大量 予約あり 日期让原正则越过单元格扫描"""
+    statuses = [STATUS_BOOKED] * 5 + [STATUS_PARTIAL, STATUS_AVAILABLE]
+    cells = []
+    for day in range(1, 32):
+        date = f"202503{day:02d}"
+        status = statuses[day % len(statuses)]
+        cells.append(
+            f'<td id="month_{date}" class="m-day" onclick="javascript:selectDay({date});">'
+            f'<span class="day">{day}</span><div class="icon">'
+            f'<img src="/web/image/icon_{day % 3}.png" alt="{status}" width="20"></div></td>'
+        )
+    rows = "".join(f"<tr>{''.join(cells[i:i + 7])}</tr>" for i in range(0, len(cells), 7))
+    filler = '<div class="info">' + "お知らせ " * 2000 + "</div>"
+    return f"<html><body>{filler}<table id=\"month-info\">{rows}</table>{filler}</body></html>"
+
+
+def _time_per_call(func, html, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        func(html)
+    return (time.perf_counter() - started) / repeat * 1000
+
+
+def bench(paths, repeat=200):
+    pages = [(path, open(path, encoding="utf-8").read()) for path in paths] or [("生成的月历", _sample_month_page())]
+    for name, html in pages:
+        legacy_ms = _time_per_call(_legacy_split, html, repeat)
+        linear_ms = _time_per_call(lambda h: split_open_dates(parse_month_calendar(h)), html, repeat)
+        legacy, linear = _legacy_split(html), split_open_dates(parse_month_calendar(html))
+        print(f"{name}（{len(html) / 1024:.0f} KB）")
+        print(f"  原正则：{legacy_ms:.3f} ms/次  单元格解析：{linear_ms:.3f} ms/次  （{legacy_ms / linear_ms:.1f} 倍）")
+        if legacy != linear:
+            print(f"  结果不同：原正则 {legacy}\n            单元格解析 {linear}")
+
+
+def _sample_timetable_page():
+    """生成一个与中野区时间表结构相同的页面：6 个时段 × 8 个设施"""
+    times = "".join(f'<th id="td10_{i}">{9 + 2 * i}:00～{11 + 2 * i}:00</th>' for i in range(6))
+    rows = []
+    for facility in range(8):
+        cells = "".join(
+            f'<td id="td1{i + 1}_{facility}"><a href="#"><img src="/stagia/jsp/images_jp/common/'
+            f'{"icon_timetable_O.gif" if (facility + i) % 3 == 0 else "icon_timetable_X.gif"}" alt=""></a></td>'
+            for i in range(6)
+        )
+        rows.append(f"<tr><th><strong>テニスコート{facility + 1}</strong></th>{cells}</tr>")
+    filler = '<div class="guide">' + "<p>ご利用案内</p>" * 300 + "</div>"
+    return (
+        f'<html><body><ul><li class="day" id="li">令和07年2月8日(土)</li></ul>{filler}'
+        f'<table><thead><tr><th>施設</th>{times}</tr></thead><tbody>{"".join(rows)}</tbody></table>'
+        f"{filler}</body></html>"
+    )
+
+
+def bench_timetable(paths, repeat=50):
+    pages = [(path, open(path, encoding="utf-8").read()) for path in paths] or [("生成的时间表", _sample_timetable_page())]
+    for name, html in pages:
+        print(f"{name}（{len(html) / 1024:.0f} KB）")
+        reference = None
+        for backend in TIMETABLE_BACKENDS:
+            ms = _time_per_call(lambda h: parse_timetable(h, backend), html, repeat)
+            result = parse_timetable(html, backend)
+            same = "" if reference is None or result == reference else "  ⚠️ 结果与第一个后端不同"
+            reference = reference or result
+            print(f"  {backend:<12}{ms:8.3f} ms/页  {len(result[1])} 个单元格{same}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="门户页面解析器")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    bench_parser = subparsers.add_parser("bench", help="与原实现比较解析速度")
+    bench_parser.add_argument("pages", nargs="*", help="保存的页面 HTML")
+    bench_parser.add_argument("--repeat", type=int, default=200)
+    timetable_parser = subparsers.add_parser("bench-timetable", help="比较各时间表解析后端的速度")
+    timetable_parser.add_argument("pages", nargs="*", help="保存的时间表页面 HTML")
+    timetable_parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    if args.command == "bench":
+        bench(args.pages, args.repeat)
+    else:
+        bench_timetable(args.pages, args.repeat)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+按观测到的变化频率自适应调整各站点的查询间隔。
+
+变化率：从状态数据库的 snapshots 表计算（写入了时段行的快照即“有变化”），
+按 (星期, 小时) 分桶，每个桶的变化率向该站点的整体变化率平滑：
+    λ = (桶内变化次数 + PRIOR_HOURS × 站点整体变化率) / (桶内观测小时数 + PRIOR_HOURS)
+
+分配：在全局预算 B（次/小时）内，使“变化被发现前的平均等待时间”之和最小。
+变化按泊松过程发生时，间隔 T 的平均发现延迟为 T/2，最小化 Σ λᵢ·Tᵢ/2 且 Σ 1/Tᵢ = B
+得到查询频率 rᵢ ∝ √λᵢ，再把间隔限制在 [最小间隔, 最大间隔] 内。
+
+每次决策（间隔、变化率）与结果（是否有变化、估计的发现延迟）写入 poll_log 表：
+
+    python tennis_policy.py report              # 最近 7 天各站点的查询次数、变化次数与平均发现延迟
+    python tennis_policy.py plan                # 按当前时段计算的各站点间隔
+"""
+
+import os
+import time
+import math
+import logging
+import argparse
+from collections import defaultdict
+
+from tennis_state_db import StateDB
+
+POLL_BUDGET = float(os.getenv("TENNIS_POLL_BUDGET", "30"))  # 所有站点合计，每小时最多查询次数
+MIN_INTERVAL = int(os.getenv("TENNIS_MIN_INTERVAL", "180"))
+MAX_INTERVAL = int(os.getenv("TENNIS_MAX_INTERVAL", "3600"))
+LOOKBACK_DAYS = 28
+PRIOR_HOURS = 2.0  # 平滑强度：相当于按站点整体变化率观测了这么多小时
+
+_POLL_LOG_SCHEMA = """
+CREATE TABLE IF NOT EXISTS poll_log (
+    site TEXT NOT NULL,
+    polled_at REAL NOT NULL,
+    interval REAL NOT NULL,     -- 本次之后决定的间隔（秒）
+    rate REAL NOT NULL,         -- 决策时使用的变化率（次/小时）
+    changed INTEGER NOT NULL,
+    latency REAL                -- 有变化时估计的发现延迟：与上次查询间隔的一半（秒）
+);
+CREATE INDEX IF NOT EXISTS poll_log_site_time ON poll_log (site, polled_at);
+"""
+
+
+def snapshot_sites(job):
+    """
+    Job 在状态数据库中记录快照所用的站点名：tennis_metro.py（metro）按各公园的站点名记录，
+    其余 Job 与站点同名。
+    """
+    if job == "metro":
+        from tennis_metro_http import configured_parks  # 只有 --metro 时才需要 HTTP 客户端
+
+        return [site for site, _, _, _ in configured_parks()]
+    return [job]
+
+
+def _bucket(ts):
+    local = time.localtime(ts)
+    return local.tm_wday, local.tm_hour
+
+
+class AdaptivePolicy:
+    def __init__(self, sites, budget=POLL_BUDGET, min_interval=MIN_INTERVAL, max_interval=MAX_INTERVAL, db_path=None):
+        self.sites = list(sites)
+        self.budget = budget
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.db_path = db_path
+        self.last_polled = {}
+        with StateDB(db_path) as db:
+            db.conn.executescript(_POLL_LOG_SCHEMA)
+
+    def change_rate(self, db, site, now):
+        """
+        站点在 now 所在 (星期, 小时) 桶的变化率（次/小时）。
+        一个 Job 记录多个站点的快照时（metro），为各站点变化率之和：任一公园的变化都由这个 Job 发现。
+        """
+        sites = snapshot_sites(site)
+        if sites != [site]:
+            return sum(self.change_rate(db, name, now) for name in sites)
+        rows = db.conn.execute(
+            "SELECT taken_at, base_id = id FROM snapshots WHERE site = ? AND taken_at >= ? ORDER BY taken_at",
+            (site, now - LOOKBACK_DAYS * 86400),
+        ).fetchall()
+        hours, changes = defaultdict(float), defaultdict(int)
+        for (previous, _), (taken_at, changed) in zip(rows, rows[1:]):
+            bucket = _bucket(taken_at)
+            hours[bucket] += (taken_at - previous) / 3600
+            changes[bucket] += changed
+        total_hours = sum(hours.values())
+        overall = (sum(changes.values()) + 1) / (total_hours + 24)  # 没有数据时约每天一次
+        bucket = _bucket(now)
+        return (changes[bucket] + PRIOR_HOURS * overall) / (hours[bucket] + PRIOR_HOURS)
+
+    def plan(self, now=None):
+        """返回 {站点: (间隔秒数, 变化率)}"""
+        now = time.time() if now is None else now
+        with StateDB(self.db_path) as db:
+            rates = {site: self.change_rate(db, site, now) for site in self.sites}
+        weight = sum(math.sqrt(rate) for rate in rates.values()) or 1.0
+        plan = {}
+        for site, rate in rates.items():
+            polls_per_hour = self.budget * math.sqrt(rate) / weight
+            interval = 3600 / polls_per_hour if polls_per_hour > 0 else self.max_interval
+            plan[site] = (min(max(interval, self.min_interval), self.max_interval), rate)
+        return plan
+
+    def next_interval(self, site, started):
+        """
+        一次查询结束后调用：判断这次是否发现了变化，记录结果，并返回到下次查询的间隔。
+        started 为本次查询开始的时间戳。
+        """
+        interval, rate = self.plan(started)[site]
+        with StateDB(self.db_path) as db:
+            sites = snapshot_sites(site)
+            row = db.conn.execute(
+                f"SELECT COUNT(*) FROM snapshots WHERE site IN ({', '.join('?' * len(sites))}) "
+                f"AND taken_at >= ? AND base_id = id",
+                (*sites, started),
+            ).fetchone()
+            changed = bool(row[0])
+            previous = self.last_polled.get(site)
+            latency = (started - previous) / 2 if changed and previous else None
+            db.conn.execute(
+                "INSERT INTO poll_log (site, polled_at, interval, rate, changed, latency) VALUES (?, ?, ?, ?, ?, ?)",
+                (site, started, interval, rate, int(changed), latency),
+            )
+        self.last_polled[site] = started
+        logging.info(
+            f"📈 {site} 当前时段变化率 {rate:.2f} 次/小时，下次间隔 {interval:.0f} 秒"
+            + (f"（本次发现变化，估计延迟 {latency:.0f} 秒）" if latency else "")
+        )
+        return interval
+
+
+def report(db_path=None, days=7):
+    with StateDB(db_path) as db:
+        db.conn.executescript(_POLL_LOG_SCHEMA)
+        rows = db.conn.execute(
+            """
+            SELECT site, COUNT(*), SUM(changed), AVG(interval), AVG(latency), MAX(latency)
+            FROM poll_log WHERE polled_at >= ? GROUP BY site ORDER BY site
+            """,
+            (time.time() - days * 86400,),
+        ).fetchall()
+    print(f"最近 {days} 天：")
+    print(f"{'站点':<12}{'查询':>6}{'变化':>6}{'平均间隔':>10}{'平均延迟':>10}{'最大延迟':>10}")
+    for site, polls, changes, interval, latency, worst in rows:
+        print(f"{site:<12}{polls:>6}{changes or 0:>6}{interval:>9.0f}s"
+              f"{(f'{latency:.0f}s' if latency is not None else '-'):>10}{(f'{worst:.0f}s' if worst is not None else '-'):>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="自适应查询间隔")
+    parser.add_argument("--db", help="状态数据库路径")
+    sub = parser.add_subparsers(dest="command", required=True)
+    report_parser = sub.add_parser("report", help="查询次数、变化次数与发现延迟")
+    report_parser.add_argument("--days", type=int, default=7)
+    plan_parser = sub.add_parser("plan", help="按当前时段计算的各站点间隔")
+    plan_parser.add_argument("sites", nargs="*")
+    args = parser.parse_args()
+
+    if args.command == "report":
+        report(args.db, args.days)
+        return
+    from tennis_orchestrator import JOBS
+    sites = args.sites or [job.name for job in JOBS]
+    for site, (interval, rate) in AdaptivePolicy(sites, db_path=args.db).plan().items():
+        print(f"{site:<12}{rate:>8.2f} 次/小时  间隔 {interval:>6.0f} 秒")
+
+
+if __name__ == "__main__":
+    main()
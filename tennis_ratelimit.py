@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+按门户主机限速的令牌桶，所有脚本、所有进程共用。
+
+原来只靠启动时的随机等待和每一步固定的 time.sleep 控制访问频率：
+多个脚本同时运行时会一起打到同一个门户，单独运行时又在空等。
+这里每个主机一个令牌桶（每秒补充 rate 个，最多积累 burst 个），每次请求前取一个令牌：
+  - 状态（令牌数, 更新时间）保存在 RATE_DIR/<主机>.bucket，读写时对该文件加 flock，
+    cron 启动的多个脚本、调度器中的多个线程、HTTP 客户端都按同一个桶排队；
+  - Selenium：tennis_driver.create_driver() 返回的 driver 在 get() 与 click() 前取令牌；
+  - HTTP 客户端：PortalHttpClient 每次发送请求前取令牌。
+没有配置的主机不限速。
+
+速率可用环境变量覆盖：TENNIS_RATE_LIMITS="kouen.sports.metro.tokyo.lg.jp=2/6;yoyaku.nakano-tokyo.jp=1/3"
+（每秒令牌数/桶容量）。
+
+    python tennis_ratelimit.py status        # 各主机当前的令牌数
+"""
+
+import os
+import time
+import struct
+import logging
+import argparse
+import threading
+from urllib.parse import urlparse
+
+try:
+    import fcntl
+except ImportError:  # Windows 上只在进程内排队
+    fcntl = None
+
+RATE_DIR = os.getenv("TENNIS_RATE_DIR", os.path.expanduser("~/.cache/tenniscourt/ratelimit"))
+
+# 主机 → (每秒补充的令牌数, 桶容量)
+PORTAL_RATES = {
+    "kouen.sports.metro.tokyo.lg.jp": (1.0, 4),
+    "www.shinjuku.eprs.jp": (1.0, 4),
+    "user.shinjuku-shisetsu-yoyaku.jp": (1.0, 4),
+    "yoyaku.nakano-tokyo.jp": (0.5, 3),
+}
+
+_STATE = struct.Struct("<dd")  # 令牌数, 更新时间（Unix 秒）
+
+
+def configured_rates():
+    rates = dict(PORTAL_RATES)
+    for item in os.getenv("TENNIS_RATE_LIMITS", "").split(";"):
+        if not item.strip():
+            continue
+        try:
+            host, limit = item.split("=", 1)
+            rate, burst = limit.split("/")
+            rates[host.strip()] = (float(rate), float(burst))
+        except ValueError:
+            logging.warning(f"⚠️ 无法解析限速配置：{item}")
+    return rates
+
+
+class TokenBucket:
+    def __init__(self, host, rate, burst, directory=None):
+        self.host = host
+        self.rate = rate
+        self.burst = burst
+        directory = directory or RATE_DIR
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, f"{host}.bucket")
+        self._lock = threading.Lock()  # 没有 fcntl 时至少在进程内排队
+
+    def _take(self, tokens):
+        """加锁读取并补充令牌；够用时扣除并返回 0，否则返回还需等待的秒数"""
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        with self._lock, os.fdopen(fd, "r+b") as f:
+            if fcntl:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                f.seek(0)
+                data = f.read(_STATE.size)
+                now = time.time()
+                if len(data) == _STATE.size:
+                    available, updated = _STATE.unpack(data)
+                    available = min(self.burst, available + max(now - updated, 0) * self.rate)
+                else:
+                    available = self.burst
+                wait = 0.0
+                if available >= tokens:
+                    available -= tokens
+                else:
+                    wait = (tokens - available) / self.rate
+                f.seek(0)
+                f.write(_STATE.pack(available, now))
+                f.flush()
+                return wait
+            finally:
+                if fcntl:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+    def acquire(self, tokens=1):
+        """取得 tokens 个令牌，返回等待的秒数"""
+        waited = 0.0
+        while True:
+            wait = self._take(tokens)
+            if wait <= 0:
+                return waited
+            time.sleep(wait)
+            waited += wait
+
+    def peek(self):
+        """当前令牌数（不扣除）"""
+        try:
+            with open(self.path, "rb") as f:
+                available, updated = _STATE.unpack(f.read(_STATE.size))
+        except (OSError, struct.error):
+            return self.burst
+        return min(self.burst, available + max(time.time() - updated, 0) * self.rate)
+
+
+_buckets = {}
+_buckets_lock = threading.Lock()
+
+
+def bucket_for(host):
+    """主机的令牌桶；没有配置的主机返回 None"""
+    with _buckets_lock:
+        if host not in _buckets:
+            rate = configured_rates().get(host)
+            _buckets[host] = TokenBucket(host, *rate) if rate else None
+        return _buckets[host]
+
+
+def throttle(url):
+    """请求 url 之前调用：按其主机的令牌桶等待"""
+    return throttle_host(urlparse(url).hostname if url else None)
+
+
+def throttle_host(host):
+    """已知主机时直接按主机等待，省去解析 URL"""
+    bucket = bucket_for(host) if host else None
+    if bucket is None:
+        return 0.0
+    waited = bucket.acquire()
+    if waited >= 1:
+        logging.info(f"🚦 {host} 限速，等待 {waited:.1f} 秒")
+    return waited
+
+
+def main():
+    parser = argparse.ArgumentParser(description="门户限速令牌桶")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("status", help="各主机当前的令牌数")
+    args = parser.parse_args()
+
+    if args.command == "status":
+        for host, (rate, burst) in configured_rates().items():
+            bucket = TokenBucket(host, rate, burst)
+            print(f"{host:<36}{rate:>6.2f}/秒  容量 {burst:>4.0f}  当前 {bucket.peek():>5.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+新宿区设施预约系统（regasu）的无浏览器客户端，用于大久保スポーツプラザ。
+
+regasu 与东京都公园门户是同一套系统（月历 month_YYYYMMDD、selectDay()、A_YYYYMMDD_NN），
+这里在 MetroPortalClient 的基础上补充：thismonth 单选、按名称选择 bname、月表示、
+facility-select 切换设施以及 last-month。所有 (设施, 月, 日) 视图共用同一个 Cookie 会话。
+
+    python tennis_regasu_http.py
+    python tennis_regasu_http.py --record fixtures/okubo
+    python tennis_regasu_http.py --fixtures fixtures/okubo --parity okubo_selenium.json
+
+对照模式：tennis_okubo.py 在设置 TENNIS_PARITY_DUMP=<文件> 时会把 Selenium 流程的结果写入该文件，
+--parity 读取它并与本客户端的结果逐项比较，不一致时以非零状态退出。
+"""
+
+import re
+import sys
+import json
+import logging
+import argparse
+
+from tennis_http import parse_page, find_form, find_onclick, parse_js_call
+from tennis_http_fixtures import FixtureServer, load_parity_dump, diff_parity, print_parity
+from tennis_metro_http import MetroPortalClient
+
+REGASU_BASE_URL = "https://www.shinjuku.eprs.jp/regasu/web/"
+OKUBO_PARK = "大久保スポーツプラザ（庭球場）"
+OKUBO_FACILITIES = ["10250080", "10250090"]  # 庭球場 １面 / ２面
+
+REGASU_SLOT_LABELS = {
+    "10": "9:00-11:30", "20": "11:30-13:30",
+    "30": "13:30-15:30", "40": "15:30-17:30",
+    "50": "17:30-19:30", "60": "19:30-22:00",
+}
+
+_FACILITY_SELECT = re.compile(r'<select\b[^>]*\bid="facility-select"[^>]*>', re.S)
+_MONTHLY_BUTTON = re.compile(r'<button\b[^>]*data-target="#monthly"[^>]*>', re.S)
+
+
+class RegasuPortalClient(MetroPortalClient):
+    """regasu 预约系统客户端"""
+
+    home_page = ""
+    slot_labels = REGASU_SLOT_LABELS
+
+    def __init__(self, base_url=REGASU_BASE_URL, record_dir=None):
+        super().__init__(base_url, record_dir)
+
+    def search(self, park_name, period="thismonth"):
+        """选择期间（thismonth）与 bname 后重放 btn-go，返回周视图页面"""
+        if self.page is None:
+            self.open_home()
+        forms, onclicks = parse_page(self.page)
+        form = find_form(forms, select_id="bname")
+        if form is None:
+            raise RuntimeError("首页中未找到包含 bname 的检索表单")
+        bname = form.select_ids["bname"]
+        values = [value for value, text in form.options.get(bname, []) if text == park_name]
+        if not values:
+            raise RuntimeError(f"bname 中没有 {park_name}")
+        overrides = {bname: values[0]}
+        if period in form.radio_ids:
+            name, value = form.radio_ids[period]
+            overrides[name] = value
+
+        func, args = parse_js_call(onclicks.get("btn-go"))
+        return self._show(self.call_js(self.page, func or "doSearch", args, form.id or form.name, extra=overrides))
+
+    def show_month(self):
+        """月表示：按钮有处理函数时重放；月历已随页面返回时不需要请求"""
+        button = _MONTHLY_BUTTON.search(self.view)
+        handler = re.search(r'\bonclick="([^"]*)"', button.group(0)) if button else None
+        if handler:
+            func, args = parse_js_call(handler.group(1))
+            self._show(self.call_js(self.page, func, args))
+        return self.view
+
+    def select_facility(self, value):
+        """重放 facility-select 的 onchange，月历按新设施重新返回"""
+        forms, _ = parse_page(self.page)
+        form = find_form(forms, select_id="facility-select")
+        field = form.select_ids["facility-select"] if form else "facility-select"
+        tag = _FACILITY_SELECT.search(self.page)
+        onchange = re.search(r'\bonchange="([^"]*)"', tag.group(0)) if tag else None
+        func, args = parse_js_call(onchange.group(1) if onchange else None)
+        # onchange="changeFacility(this.value)" 之类的写法，把 this.value 换成选择的值
+        args = [value if arg in ("this.value", "this") else arg for arg in args]
+        return self._show(self.call_js(
+            self.page, func or "changeFacility", args, extra={field: value},
+        ))
+
+    def last_month(self):
+        """重放 last-month 按钮，当前月历切换到上月"""
+        func, args = parse_js_call(find_onclick(self.view, element_id="last-month"))
+        return self._show(self.call_js(self.page, func or "lastMonth", args))
+
+    def scan_facilities(self, park_name, facilities, months=2, date_filter=None):
+        """依次查看每个设施的 months 个月，返回 {设施: (月历, 时段)}"""
+        self.search(park_name)
+        self.show_month()
+        results = {}
+        for facility in facilities:
+            self.select_facility(facility)
+            calendar, slots = {}, {}
+            for month_index in range(months):
+                month_calendar, _ = self.scan_month(date_filter, slots)
+                calendar.update(month_calendar)
+                if month_index + 1 < months:
+                    self.next_month()
+            for _ in range(months - 1):
+                self.last_month()
+            results[facility] = (calendar, slots)
+            logging.info(f"🌐 设施 {facility}：{len(slots)} 个有空位的时段")
+        return results
+
+
+def merge_like_selenium(results, facilities):
+    """
+    转换为 tennis_okubo.py 的 availability_info 结构 {(日期, 时段): 可预约数}：
+    Selenium 流程按设施顺序写入同一个字典，后面的设施覆盖前面的同一 (日期, 时段)；
+    第 2 个月起只有该月存在「全て空き」的日期时才会处理（tennis_okubo.py 的 `if available_dates != []`）。
+    """
+    merged = {}
+    for facility in facilities:
+        calendar, slots = results[facility]
+        months = sorted({date[:6] for date in calendar})
+        skipped = {
+            month for month in months[1:]
+            if not any(status == "全て空き" for date, status in calendar.items() if date.startswith(month))
+        }
+        merged.update({key: count for key, count in slots.items() if key[0][:6] not in skipped})
+    return merged
+
+
+def main():
+    parser = argparse.ArgumentParser(description="不启动浏览器查询大久保スポーツプラザ的网球场空位")
+    parser.add_argument("--park", default=OKUBO_PARK, help="bname 的显示名称")
+    parser.add_argument("--facility", action="append", help="facility-select 的值，可重复；默认 1 面与 2 面")
+    parser.add_argument("--months", type=int, default=2)
+    parser.add_argument("--base-url", default=REGASU_BASE_URL, help="预约系统地址，可指向本地回放服务器")
+    parser.add_argument("--record", metavar="DIR", help="把所有响应录制到该目录")
+    parser.add_argument("--fixtures", metavar="DIR", help="在本地回放该目录的录制并对其运行")
+    parser.add_argument("--parity", metavar="FILE", help="与 Selenium 流程写出的结果比较")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    base_url = args.base_url
+    if args.fixtures:
+        server = FixtureServer(args.fixtures)
+        base_url = server.start() + "/regasu/web/"
+
+    facilities = args.facility or OKUBO_FACILITIES
+    client = RegasuPortalClient(base_url, args.record)
+    results = client.scan_facilities(args.park, facilities, args.months)
+    client.report(args.park)
+    availability_info = merge_like_selenium(results, facilities)
+
+    if not args.parity:
+        print(json.dumps({
+            facility: {f"{date} {slot}": count for (date, slot), count in sorted(slots.items())}
+            for facility, (_, slots) in results.items()
+        }, ensure_ascii=False, indent=2))
+        return
+
+    if not print_parity(diff_parity(load_parity_dump(args.parity), availability_info), len(availability_info)):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
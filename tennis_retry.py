@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+门户故障时的有限重试与熔断。
+
+原来加载主页是 while True: driver.get(url)，每次等待 10 秒、没有次数上限：
+门户故障期间每次调度的运行都会一直占着一个 Chrome，运行越积越多。
+  - 重试：load_page_with_retry() 最多 RETRY_ATTEMPTS 次，间隔按指数增长（上限 RETRY_CAP 秒）并加随机抖动；
+    全部失败时返回 False，由脚本退出（退出码 EXIT_PORTAL_DOWN）；
+  - 熔断：每个主机一个熔断器，连续 FAILURE_THRESHOLD 次运行失败后打开，
+    冷却期内的运行在启动 Chrome 之前直接跳过；冷却期过后进入半开状态，
+    用一次轻量的 HTTP 预检（check_portal()）试探，成功则关闭，失败则重新打开并把冷却期加倍。
+
+熔断器状态与跳过次数保存在 circuit_breakers.json（多个脚本同时运行时加锁读写）：
+
+    python tennis_retry.py status        # 各主机的熔断器状态、跳过的运行次数
+    python tennis_retry.py reset kouen.sports.metro.tokyo.lg.jp
+"""
+
+import os
+import json
+import time
+import random
+import logging
+import argparse
+import urllib.request
+from urllib.parse import urlparse
+
+try:
+    import fcntl
+except ImportError:  # Windows 上不加锁
+    fcntl = None
+
+BREAKER_FILE = os.getenv("TENNIS_BREAKER_FILE", "circuit_breakers.json")
+RETRY_ATTEMPTS = int(os.getenv("TENNIS_RETRY_ATTEMPTS", "5"))
+RETRY_BASE = 2.0  # 第一次重试前最多等待的秒数
+RETRY_CAP = 60.0
+FAILURE_THRESHOLD = 2  # 连续失败几次运行后熔断
+COOLDOWN = 300  # 第一次熔断的冷却秒数，半开试探失败后加倍
+MAX_COOLDOWN = 3600
+PROBE_TIMEOUT = 10
+EXIT_PORTAL_DOWN = 75  # EX_TEMPFAIL：门户不可用，本次运行跳过
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+
+def backoff_delays(attempts=RETRY_ATTEMPTS, base=RETRY_BASE, cap=RETRY_CAP):
+    """每次重试前的等待秒数：在 [0, min(cap, base × 2^n)] 内均匀随机（full jitter）"""
+    for n in range(attempts - 1):
+        yield random.uniform(0, min(cap, base * 2 ** n))
+
+
+class _Locked:
+    """熔断器文件的排他锁"""
+
+    def __init__(self, path):
+        self.path = path + ".lock"
+
+    def __enter__(self):
+        self.file = open(self.path, "a+")
+        if fcntl:
+            fcntl.flock(self.file, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        if fcntl:
+            fcntl.flock(self.file, fcntl.LOCK_UN)
+        self.file.close()
+
+
+def _load(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save(path, breakers):
+    tmp_file = path + ".tmp"
+    with open(tmp_file, "w", encoding="utf-8") as f:
+        json.dump(breakers, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_file, path)
+
+
+class CircuitBreaker:
+    """一个主机的熔断器；每个方法都在文件锁内读取、修改并写回状态"""
+
+    def __init__(self, host, path=None):
+        self.host = host
+        self.path = path or BREAKER_FILE
+
+    def _update(self, change):
+        with _Locked(self.path):
+            breakers = _load(self.path)
+            state = breakers.setdefault(self.host, {
+                "state": CLOSED, "failures": 0, "opened_at": None, "cooldown": COOLDOWN,
+                "trips": 0, "skipped_runs": 0, "last_error": None,
+            })
+            result = change(state)
+            _save(self.path, breakers)
+        return result
+
+    def allow(self):
+        """
+        本次运行可以访问时返回当前状态（closed / half_open），冷却期内返回 None。
+        冷却期结束时转为半开，允许试探。
+        """
+        def change(state):
+            if state["state"] == OPEN:
+                if time.time() < state["opened_at"] + state["cooldown"]:
+                    state["skipped_runs"] += 1
+                    return None
+                state["state"] = HALF_OPEN
+                logging.info(f"🔌 {self.host} 冷却期结束，半开试探")
+            return state["state"]
+        return self._update(change)
+
+    def record_success(self):
+        def change(state):
+            if state["state"] != CLOSED:
+                logging.info(f"✅ {self.host} 已恢复，熔断器关闭")
+            state.update(state=CLOSED, failures=0, opened_at=None, cooldown=COOLDOWN)
+        self._update(change)
+
+    def record_failure(self, error=None):
+        def change(state):
+            state["failures"] += 1
+            state["last_error"] = error
+            if state["state"] == HALF_OPEN:
+                state["cooldown"] = min(state["cooldown"] * 2, MAX_COOLDOWN)
+            elif state["failures"] < FAILURE_THRESHOLD:
+                return
+            state.update(state=OPEN, opened_at=time.time())
+            state["trips"] += 1
+            logging.error(f"⛔ {self.host} 熔断，{state['cooldown']} 秒内的运行将直接跳过")
+        self._update(change)
+
+
+def probe(url, timeout=PROBE_TIMEOUT):
+    """轻量预检：HTTP GET 主页，返回 None 表示成功，否则为失败原因"""
+    request = urllib.request.Request(url, headers={"User-Agent": "Mozilla/5.0"})
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            response.read(1024)
+        return None
+    except Exception as e:
+        return f"{type(e).__name__}: {e}"
+
+
+def check_portal(url):
+    """
+    启动 Chrome 之前调用。熔断器打开时直接返回 False；
+    半开状态时先做 HTTP 预检，预检失败同样返回 False。
+    """
+    breaker = CircuitBreaker(urlparse(url).hostname)
+    state = breaker.allow()
+    if state is None:
+        logging.warning(f"⛔ {breaker.host} 熔断中，跳过本次运行")
+        return False
+    if state != HALF_OPEN:
+        return True
+    error = probe(url)
+    if error:
+        logging.warning(f"⚠️ {breaker.host} 预检失败：{error}")
+        breaker.record_failure(error)
+        return False
+    breaker.record_success()
+    return True
+
+
+def load_page_with_retry(driver, url, locator, timeout=10, attempts=RETRY_ATTEMPTS):
+    """
+    打开 url 并等待 locator 可见，失败时按指数退避重试。
+    成功返回 True；全部失败时记录到熔断器并返回 False。
+    """
+    from selenium.common.exceptions import TimeoutException, WebDriverException
+    from selenium.webdriver.support.ui import WebDriverWait
+    from selenium.webdriver.support import expected_conditions as EC
+
+    breaker = CircuitBreaker(urlparse(url).hostname)
+    delays = backoff_delays(attempts)
+    for attempt in range(1, attempts + 1):
+        try:
+            driver.get(url)
+            WebDriverWait(driver, timeout).until(EC.visibility_of_element_located(locator))
+            logging.info("主页加载成功")
+            breaker.record_success()
+            return True
+        except (TimeoutException, WebDriverException) as e:
+            error = f"{type(e).__name__}"
+            delay = next(delays, None)
+            if delay is None:
+                break
+            logging.warning(f"主页加载失败（{error}，{attempt}/{attempts}），{delay:.1f} 秒后重试...")
+            time.sleep(delay)
+    logging.error(f"❌ 主页加载失败，已重试 {attempts} 次，放弃本次运行")
+    breaker.record_failure(error)
+    return False
+
+
+def main():
+    parser = argparse.ArgumentParser(description="门户熔断器")
+    parser.add_argument("--file", default=BREAKER_FILE)
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("status", help="各主机的熔断器状态")
+    reset = sub.add_parser("reset", help="关闭某个主机的熔断器")
+    reset.add_argument("host")
+    args = parser.parse_args()
+
+    if args.command == "reset":
+        CircuitBreaker(args.host, args.file).record_success()
+        return
+    breakers = _load(args.file)
+    if not breakers:
+        print("尚无熔断记录")
+        return
+    print(f"{'主机':<36}{'状态':<11}{'连续失败':>8}{'熔断次数':>8}{'跳过运行':>8}  最近错误")
+    for host, state in breakers.items():
+        print(f"{host:<36}{state['state']:<11}{state['failures']:>8}{state['trips']:>8}"
+              f"{state['skipped_runs']:>8}  {state['last_error'] or '-'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+确定性的错峰调度：每个站点在查询周期内有一个固定的相位，取代脚本启动时的随机等待。
+
+原来每个脚本导入时都要 time.sleep(random.uniform(1, 30))：每次发现空位平均多等 15 秒，
+而且随机等待不能保证同一门户的站点真正错开。这里：
+  - 同一门户的站点在周期内等间隔排开（门户 6 个站点、周期 600 秒 → 相隔 100 秒）；
+  - 不同门户整体再错开一个 周期/站点总数 的位置，所有站点在全局上也尽量均匀；
+  - 门户内的顺序按站点名的哈希决定，与站点列表的顺序无关，重启后相位不变；
+  - 相位以 Unix 时间对齐：站点每次在 周期的整数倍 + 相位 时运行，运行时刻可预测。
+
+tennis_orchestrator.py 按这里的相位调度；用 cron 运行时可以生成带相位的 crontab：
+
+    python tennis_schedule.py plan                 # 各站点的相位
+    python tennis_schedule.py --period 600 crontab # 每个站点一行 cron（分钟字段 + sleep 秒数）
+    python tennis_schedule.py crontab --metro      # 有明、舍人、大井A/B 合并为 tennis_metro.py
+"""
+
+import os
+import sys
+import time
+import hashlib
+import argparse
+from collections import defaultdict
+
+METRO_HOST = "kouen.sports.metro.tokyo.lg.jp"
+REGASU_HOST = "www.shinjuku.eprs.jp"
+NAKANO_HOST = "yoyaku.nakano-tokyo.jp"
+
+# 站点 → 访问的门户主机（与 tennis_ratelimit.py 的令牌桶一致）
+SITE_PORTALS = {
+    "ariake": METRO_HOST,
+    "ariake_new": METRO_HOST,
+    "toneri": METRO_HOST,
+    "toneri_new": METRO_HOST,
+    "oi_A": METRO_HOST,
+    "oi_B": METRO_HOST,
+    "metro": METRO_HOST,
+    "okubo": REGASU_HOST,
+    "kamitakada": NAKANO_HOST,
+    "tetsugaku": NAKANO_HOST,
+}
+
+# metro（tennis_metro.py）一个会话查询这四个站点，只能二选一；默认调度这四个脚本，--metro 时以 metro 取代
+METRO_SITES = ("ariake", "toneri", "oi_A", "oi_B")
+
+
+def default_sites(metro=False):
+    """plan / crontab 未指定站点时调度的站点"""
+    if metro:
+        return [site for site in SITE_PORTALS if site not in METRO_SITES]
+    return [site for site in SITE_PORTALS if site != "metro"]
+
+
+def _stable_hash(text):
+    return int(hashlib.sha1(text.encode("utf-8")).hexdigest()[:8], 16)
+
+
+def phase_offsets(sites, period):
+    """返回 {站点: 相位秒数}，0 ≤ 相位 < period"""
+    groups = defaultdict(list)
+    for site in sites:
+        groups[SITE_PORTALS.get(site, site)].append(site)
+    # 站点多的门户先排，每个门户整体错开 period / 站点总数
+    portals = sorted(groups, key=lambda portal: (-len(groups[portal]), portal))
+    slot = period / max(len(sites), 1)
+    offsets = {}
+    for k, portal in enumerate(portals):
+        members = sorted(groups[portal], key=_stable_hash)
+        spacing = period / len(members)
+        for i, site in enumerate(members):
+            offsets[site] = (k * slot + i * spacing) % period
+    return offsets
+
+
+def next_phase_time(offset, period, now=None):
+    """now 之后（含）第一个 周期整数倍 + offset 的时刻"""
+    now = time.time() if now is None else now
+    return now + (offset - now) % period
+
+
+def crontab(offsets, period, base_dir, python=sys.executable):
+    """生成 cron 行；周期需为整分钟且能整除 60 分钟"""
+    minutes = period // 60
+    if period % 60 or 60 % minutes:
+        raise ValueError("cron 只支持整分钟且能整除 60 分钟的周期，如 300、600、900")
+    lines = []
+    for site, offset in sorted(offsets.items(), key=lambda item: item[1]):
+        minute, second = divmod(int(offset), 60)
+        schedule = f"{minute}-59/{minutes}" if minutes > 1 else "*"
+        sleep = f"sleep {second} && " if second else ""
+        lines.append(f"{schedule} * * * * cd {base_dir} && {sleep}{python} tennis_{site}.py")
+    return lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description="确定性的错峰调度")
+    parser.add_argument("--period", type=int, default=int(os.getenv("TENNIS_JOB_INTERVAL", "600")),
+                        help="查询周期（秒）")
+    sub = parser.add_subparsers(dest="command", required=True)
+    for name, help_text in (("plan", "各站点的相位"), ("crontab", "生成带相位的 crontab")):
+        command = sub.add_parser(name, help=help_text)
+        command.add_argument("sites", nargs="*", help="默认为 metro 以外的所有站点")
+        command.add_argument("--metro", action="store_true", help="以 metro 取代 ariake、toneri、oi_A、oi_B")
+    args = parser.parse_args()
+
+    sites = args.sites or default_sites(args.metro)
+    offsets = phase_offsets(sites, args.period)
+    if args.command == "crontab":
+        base_dir = os.path.dirname(os.path.abspath(__file__))
+        print("\n".join(crontab(offsets, args.period, base_dir)))
+        return
+    for site, offset in sorted(offsets.items(), key=lambda item: item[1]):
+        print(f"{site:<12}{SITE_PORTALS.get(site, '-'):<34}相位 {offset:>6.0f} 秒")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+浏览器会话的保存与恢复：跳过重复的首页导航。
+
+导航成功到达结果页后，save_session() 保存 Cookie 与当前 URL；
+下一次运行先调用 resume_session()，把 Cookie 写回浏览器并直接打开保存的 URL，
+结果页就绪即视为命中，否则（会话过期、门户返回首页等）退回完整导航。
+每个站点的命中率与节省的导航时间记录在 session_resume_stats.json 中。
+"""
+
+import os
+import json
+import time
+import logging
+import tempfile
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows 上只有进程内的锁
+    fcntl = None
+
+from selenium.common.exceptions import TimeoutException, WebDriverException
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+
+# 会话文件目录，可用环境变量覆盖
+SESSION_DIR = os.getenv(
+    "TENNIS_SESSION_DIR", os.path.expanduser("~/.cache/tenniscourt/sessions")
+)
+# 超过该秒数的会话不再尝试恢复（门户的服务器会话通常 30 分钟左右过期）
+SESSION_MAX_AGE = int(os.getenv("TENNIS_SESSION_MAX_AGE", "1800"))
+SESSION_STATS_FILE = "session_resume_stats.json"
+# 调度进程中多个站点线程会同时更新统计文件
+_JSON_LOCK = threading.Lock()
+
+
+def _session_file(site):
+    return os.path.join(SESSION_DIR, f"{site}.json")
+
+
+def _write_json(path, data):
+    # 每次写入使用自己的临时文件，同时写同一文件的线程 / 进程不会互相截断或替换对方的临时文件
+    with tempfile.NamedTemporaryFile(
+        "w", encoding="utf-8", dir=os.path.dirname(os.path.abspath(path)),
+        prefix=os.path.basename(path) + ".", suffix=".tmp", delete=False,
+    ) as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    try:
+        os.replace(f.name, path)
+    except OSError:
+        os.unlink(f.name)
+        raise
+
+
+@contextmanager
+def update_json(path):
+    """
+    读取 → 修改 → 写回 一个共享的统计文件：
+
+        with update_json(LEAN_STATS_FILE) as stats:
+            stats["x"] = 1
+
+    整个过程持有进程内的锁和 <path>.lock 上的文件锁，并发的脚本依次执行，不会丢失彼此的更新。
+    """
+    with _JSON_LOCK, open(path + ".lock", "a+") as lock:
+        if fcntl:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+        data = _load_json(path)
+        yield data
+        _write_json(path, data)
+
+
+def _load_json(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_session(driver, site, navigation_seconds=None):
+    """完整导航成功后调用：保存 Cookie、当前 URL，并记录这次完整导航的耗时"""
+    try:
+        state = {
+            "url": driver.current_url,
+            "cookies": driver.get_cookies(),
+            "saved_at": time.time(),
+        }
+    except WebDriverException as e:
+        logging.warning(f"⚠️ 保存会话失败: {e}")
+        return
+    os.makedirs(SESSION_DIR, exist_ok=True)
+    _write_json(_session_file(site), state)
+    if navigation_seconds is not None:
+        _update_stats(site, navigation_seconds=navigation_seconds)
+
+
+def _to_cdp_cookie(cookie):
+    cdp_cookie = {
+        "name": cookie["name"],
+        "value": cookie["value"],
+        "domain": cookie.get("domain"),
+        "path": cookie.get("path", "/"),
+        "secure": cookie.get("secure", False),
+        "httpOnly": cookie.get("httpOnly", False),
+    }
+    if cookie.get("expiry"):
+        cdp_cookie["expires"] = cookie["expiry"]
+    if cookie.get("sameSite") in ("Strict", "Lax", "None"):
+        cdp_cookie["sameSite"] = cookie["sameSite"]
+    return cdp_cookie
+
+
+def resume_session(driver, site, ready_locator, timeout=10):
+    """
+    尝试直接恢复到保存的结果页。ready_locator 为结果页就绪的标志元素，如 (By.ID, "loadedmonth")。
+    命中返回 True；未保存、已过期或恢复失败返回 False，调用方应执行完整导航。
+    """
+    state = _load_json(_session_file(site))
+    if not state:
+        return False
+    age = time.time() - state.get("saved_at", 0)
+    if age > SESSION_MAX_AGE:
+        logging.info(f"🔁 {site} 保存的会话已超过 {SESSION_MAX_AGE} 秒，执行完整导航")
+        _update_stats(site, hit=False)
+        return False
+
+    started = time.monotonic()
+    try:
+        # 通过 CDP 写入 Cookie，不需要先打开同域页面
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd(
+            "Network.setCookies", {"cookies": [_to_cdp_cookie(c) for c in state["cookies"]]}
+        )
+        driver.get(state["url"])
+        WebDriverWait(driver, timeout).until(EC.presence_of_element_located(ready_locator))
+    except (TimeoutException, WebDriverException) as e:
+        logging.info(f"🔁 {site} 会话已失效（{type(e).__name__}），执行完整导航")
+        _update_stats(site, hit=False)
+        return False
+
+    elapsed = time.monotonic() - started
+    save_session(driver, site)  # 刷新保存时间与 Cookie
+    stats = _update_stats(site, hit=True, resume_seconds=elapsed)
+    saved = stats.get("navigation_seconds_avg", 0) - elapsed
+    logging.info(
+        f"🔁 {site} 会话恢复成功，用时 {elapsed:.1f} 秒，节省约 {max(saved, 0):.1f} 秒"
+        f"（命中率 {stats['hits']}/{stats['attempts']}，累计节省 {stats['saved_seconds_total']:.0f} 秒）"
+    )
+    return True
+
+
+def _update_stats(site, hit=None, resume_seconds=None, navigation_seconds=None):
+    with update_json(SESSION_STATS_FILE) as stats:
+        entry = stats.setdefault(site, {
+            "attempts": 0, "hits": 0, "saved_seconds_total": 0.0,
+            "navigation_count": 0, "navigation_seconds_avg": 0.0,
+        })
+        if navigation_seconds is not None:
+            entry["navigation_count"] += 1
+            entry["navigation_seconds_avg"] += (navigation_seconds - entry["navigation_seconds_avg"]) / entry["navigation_count"]
+        if hit is not None:
+            entry["attempts"] += 1
+        if hit:
+            entry["hits"] += 1
+            entry["saved_seconds_total"] += max(entry["navigation_seconds_avg"] - resume_seconds, 0)
+    return entry
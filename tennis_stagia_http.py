@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+中野区设施预约系统（stagia）的无浏览器客户端。
+
+浏览器流程需要点击约 15 次才能到达时间表（空き状況確認 → 全て → 確定 → … → img0~img7 → 確定），
+每次都是服务器渲染的整页。这里用同一个 Cookie 会话重放这些表单提交：
+  - 第一次运行按步骤走完整流程，并把“打开时间表”的那次请求保存到 stagia_timetable_<site>.json；
+  - 之后的运行只打开首页取得会话，再把保存的请求中的日期换成今天直接跳到时间表，
+    会话或参数失效时自动退回完整流程；
+  - 之后用 次へ 按钮对应的表单提交逐日翻页。
+
+    python tennis_stagia_http.py --site tetsugaku --facility id0
+    python tennis_stagia_http.py --site kamitakada --facility id1 --record fixtures/kamitakada
+"""
+
+import os
+import re
+import json
+import logging
+import argparse
+from datetime import datetime
+
+import requests
+
+from tennis_http import PortalHttpClient, parse_page, find_onclick, parse_js_call, discover_js_submit, js_assignments
+from tennis_parse import parse_timetable
+
+STAGIA_BASE_URL = "https://yoyaku.nakano-tokyo.jp/stagia/reserve/"
+HOME_PAGE = "grb_init"
+TIMETABLE_CACHE = "stagia_timetable_{site}.json"
+
+FACILITIES = {
+    "tetsugaku": "id0",   # 哲学堂運動施設
+    "kamitakada": "id1",  # 上高田運動施設
+}
+
+AVAILABLE_ICONS = ("icon_timetable_sankaku.gif", "icon_timetable_O.gif")
+
+
+def navigation_steps(facility_id, today):
+    """
+    到达时间表的点击步骤：(说明, 定位条件, 是否提交)。
+    不提交的步骤只是切换按钮，其函数体中的字段赋值会带到下一次提交。
+    """
+    ok = {"src": "/stagia/jsp/images_jp/common/btn-ok.gif"}
+    change = {"src": "/stagia/jsp/images_jp/common/btn-nav-change.gif"}  # 日期页面的 確定 是另一张图片
+    return [
+        ("空き状況確認", {"src": "btn_check_status_01.gif"}, True),
+        ("全て", {"element_id": "allChecked"}, False),
+        ("確定", ok, True),
+        ("button2", {"element_id": "button2"}, False),
+        ("確定", ok, True),
+        ("nextButton", {"element_id": "nextButton"}, True),
+        ("硬式テニス", {"text": "硬式テニス"}, True),
+        (facility_id, {"element_id": facility_id}, False),
+        ("btnOk", {"element_id": "btnOk"}, True),
+        ("全て", {"element_id": "allChecked"}, False),
+        ("確定", ok, True),
+        (f"日期 {today}", {"contains": today}, False),
+    ] + [
+        (f"img{i}", {"element_id": f"img{i}"}, False) for i in range(8)
+    ] + [
+        ("確定", change, True),
+    ]
+
+
+def is_timetable(html):
+    return 'id="td11_' in html
+
+
+def reiwa_to_iso(text):
+    """把 "令和07年2月8日(土)" 转换为 YYYY-MM-DD"""
+    match = re.search(r"令和(\d+)年(\d+)月(\d+)日", text or "")
+    if not match:
+        return "未知日期"
+    reiwa_year, month, day = map(int, match.groups())
+    return f"{2018 + reiwa_year}-{month:02d}-{day:02d}"  # 令和元年为 2019 年
+
+
+def parse_page_date(html):
+    """从 li.day#li 取得日期，返回 YYYY-MM-DD"""
+    match = re.search(r'<li[^>]*\bid="li"[^>]*>(.*?)</li>', html, re.S)
+    return reiwa_to_iso(re.sub(r"<[^>]+>", "", match.group(1)) if match else "")
+
+
+def parse_day(html):
+    """解析一天的时间表，返回 [{"date", "facility", "time"}]，与 Selenium 流程的结果结构相同"""
+    raw_date, timetable = parse_timetable(html)
+    today_date = reiwa_to_iso(raw_date)
+    return [
+        {"date": today_date, "facility": facility, "time": time_slot}
+        for facility, time_slot, icon in timetable
+        if icon in AVAILABLE_ICONS
+    ]
+
+
+class StagiaClient(PortalHttpClient):
+    """stagia 预约系统客户端：一个实例对应一个 Cookie 会话"""
+
+    def __init__(self, site, facility_id, base_url=STAGIA_BASE_URL, record_dir=None):
+        super().__init__(base_url, record_dir)
+        self.site = site
+        self.facility_id = facility_id
+        self.page = None
+
+    def click(self, label, locator, submit, pending):
+        """重放一次点击；切换按钮只收集字段赋值，提交按钮带上收集到的字段一起提交"""
+        handler = find_onclick(self.page, **locator)
+        func, args = parse_js_call(handler)
+        if not submit:
+            js = discover_js_submit(self.page, func) if func else None
+            if js is None:
+                logging.warning(f"⚠️ {label}：未识别到切换按钮的处理函数，跳过")
+            else:
+                pending.update(js_assignments(js, args))
+            return
+
+        if func:
+            self.page = self.call_js(self.page, func, args, extra=pending)
+        else:
+            # <input type="image"> 没有处理函数时由浏览器直接提交所在表单
+            forms, _ = parse_page(self.page)
+            if not forms:
+                raise RuntimeError(f"{label}：页面中没有可提交的表单")
+            self.page = self.submit(forms[0], pending)
+        pending.clear()
+        logging.info(f"🌐 已提交 {label}")
+
+    def walk_to_timetable(self, today):
+        """按浏览器的点击顺序走完整流程，到达今天的时间表"""
+        self.page = self.get(HOME_PAGE)
+        pending = {}
+        for label, locator, submit in navigation_steps(self.facility_id, today):
+            self.click(label, locator, submit, pending)
+        if not is_timetable(self.page):
+            raise RuntimeError("完整流程结束后仍未到达时间表")
+        self._save_timetable_request(today)
+
+    def jump_to_timetable(self, today):
+        """用保存的时间表请求直接跳转；成功返回 True"""
+        path = TIMETABLE_CACHE.format(site=self.site)
+        if not os.path.exists(path):
+            return False
+        with open(path, "r", encoding="utf-8") as f:
+            saved = json.load(f)
+        method, url, data = saved["request"]
+        data = {k: v.replace(saved["date"], today) if isinstance(v, str) else v for k, v in data.items()}
+        url = url.replace(saved["date"], today)
+
+        self.get(HOME_PAGE)  # 取得新的会话 Cookie
+        try:
+            page = self.replay((method, url, data))
+        except requests.RequestException as e:
+            logging.warning(f"⚠️ 重放保存的时间表请求失败（{e}），改为完整流程")
+            return False
+        if not is_timetable(page):
+            logging.warning("⚠️ 保存的时间表请求已失效，改为完整流程")
+            return False
+        self.page = page
+        return True
+
+    def _save_timetable_request(self, today):
+        with open(TIMETABLE_CACHE.format(site=self.site), "w", encoding="utf-8") as f:
+            json.dump({"request": list(self.last_request), "date": today}, f, ensure_ascii=False, indent=2)
+
+    def next_day(self):
+        """重放 次へ；已是最后一天时返回 False"""
+        handler = find_onclick(self.page, alt="次へ")
+        func, args = parse_js_call(handler)
+        if not func:
+            return False
+        self.page = self.call_js(self.page, func, args)
+        return is_timetable(self.page)
+
+    def scan(self, max_days=None, today=None):
+        """从今天（today 为 YYYYMMDD，默认今天）开始逐日解析时间表，返回所有可预约时段"""
+        today = today or datetime.today().strftime("%Y%m%d")
+        if self.jump_to_timetable(today):
+            logging.info("✅ 已直接跳转到时间表")
+        else:
+            self.walk_to_timetable(today)
+
+        all_slots, seen_dates = [], set()
+        while True:
+            page_date = parse_page_date(self.page)
+            if page_date in seen_dates:
+                break  # 翻页没有前进，说明已到最后一天
+            seen_dates.add(page_date)
+            logging.info(page_date)
+            all_slots.extend(parse_day(self.page))
+            if max_days and len(seen_dates) >= max_days:
+                break
+            if not self.next_day():
+                logging.info("已到达最后一天，停止获取。")
+                break
+        return all_slots
+
+
+def fetch_timetable(site, facility_id=None, base_url=STAGIA_BASE_URL, max_days=None):
+    """站点脚本使用的入口：返回 [{"date", "facility", "time"}]"""
+    client = StagiaClient(site, facility_id or FACILITIES[site], base_url)
+    slots = client.scan(max_days)
+    client.report(site)
+    return slots
+
+
+def main():
+    parser = argparse.ArgumentParser(description="不启动浏览器查询中野区网球场空位")
+    parser.add_argument("--site", required=True, choices=sorted(FACILITIES))
+    parser.add_argument("--facility", help="设施按钮 id，默认按站点决定（哲学堂 id0、上高田 id1）")
+    parser.add_argument("--days", type=int, help="最多获取的天数")
+    parser.add_argument("--base-url", default=STAGIA_BASE_URL, help="预约系统地址，可指向本地回放服务器")
+    parser.add_argument("--record", metavar="DIR", help="把所有响应录制到该目录")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    client = StagiaClient(args.site, args.facility or FACILITIES[args.site], args.base_url, args.record)
+    slots = client.scan(args.days)
+    client.report(args.site)
+    print(json.dumps(slots, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
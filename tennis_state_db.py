@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+各站点查询结果的 SQLite 存储，取代每个站点一个的状态文件。
+
+  - snapshots：每次查询一行（站点、时间、时段数）；
+  - slots：时段行 (站点, 设施, 日期, 时段, 可预约数)。只有结果与上次不同的快照才写入时段行，
+    其他快照用 base_id 指向内容相同的那次快照；
+  - date_cache：tennis_heartbeat.py 的逐日缓存，由 record_snapshot(before_commit=...) 与快照在同一事务中写入。
+
+数据库使用 WAL 模式，多个脚本可以同时读写；每次查询的全部写入在一个事务中完成。
+
+    python tennis_state_db.py latest ariake
+    python tennis_state_db.py changes ariake --since "2025-02-08 09:00"
+"""
+
+import os
+import time
+import sqlite3
+import logging
+import argparse
+from datetime import datetime
+
+from tennis_delta import SlotKey, diff_slots, format_delta
+
+STATE_DB = os.getenv("TENNIS_STATE_DB", "tennis_state.db")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS snapshots (
+    id INTEGER PRIMARY KEY,
+    site TEXT NOT NULL,
+    taken_at REAL NOT NULL,
+    base_id INTEGER,            -- 时段行所在的快照；本快照写入了时段行时为自身
+    slot_count INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS snapshots_site_time ON snapshots (site, taken_at);
+CREATE TABLE IF NOT EXISTS slots (
+    snapshot_id INTEGER NOT NULL REFERENCES snapshots (id),
+    site TEXT NOT NULL,
+    facility TEXT NOT NULL,
+    date TEXT NOT NULL,
+    slot TEXT NOT NULL,
+    count INTEGER
+);
+CREATE INDEX IF NOT EXISTS slots_snapshot ON slots (snapshot_id);
+CREATE INDEX IF NOT EXISTS slots_site_date_slot ON slots (site, date, slot);
+CREATE TABLE IF NOT EXISTS date_cache (
+    site TEXT NOT NULL,
+    facility TEXT NOT NULL,
+    date TEXT NOT NULL,         -- YYYYMMDD
+    status TEXT NOT NULL,       -- 展开时的月历状态
+    scanned_at REAL NOT NULL,   -- 展开的时间
+    counts TEXT NOT NULL,       -- 时段向量（各时段可预约数）的 JSON
+    PRIMARY KEY (site, facility, date)
+);
+"""
+
+
+class StateDB:
+    """一个连接；可用作上下文管理器"""
+
+    def __init__(self, path=None):
+        self.path = path or STATE_DB
+        self.conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("PRAGMA busy_timeout=30000")
+        self.conn.executescript(_SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.conn.close()
+
+    def _base_id(self, site, before=None):
+        """最新（或 before 之前最后一次）快照的 base_id"""
+        if before is None:
+            row = self.conn.execute(
+                "SELECT base_id FROM snapshots WHERE site = ? ORDER BY taken_at DESC, id DESC LIMIT 1", (site,)
+            ).fetchone()
+        else:
+            row = self.conn.execute(
+                "SELECT base_id FROM snapshots WHERE site = ? AND taken_at <= ? ORDER BY taken_at DESC, id DESC LIMIT 1",
+                (site, before),
+            ).fetchone()
+        return row[0] if row else None
+
+    def _slots(self, base_id):
+        if base_id is None:
+            return {}
+        rows = self.conn.execute(
+            "SELECT site, facility, date, slot, count FROM slots WHERE snapshot_id = ?", (base_id,)
+        )
+        return {SlotKey(site, facility, date, slot): count for site, facility, date, slot, count in rows}
+
+    def has_site(self, site):
+        return self._base_id(site) is not None
+
+    def latest(self, site):
+        """站点的最新状态 {SlotKey: 数量}；没有记录时为空字典"""
+        return self._slots(self._base_id(site))
+
+    def state_at(self, site, when):
+        """when（时间戳）时的状态"""
+        return self._slots(self._base_id(site, when))
+
+    def changes_since(self, site, since):
+        """since（时间戳）以来的变化：SlotDelta"""
+        return diff_slots(self.state_at(site, since), self.latest(site))
+
+    def record_snapshot(self, site, slots, taken_at=None, before_commit=None):
+        """
+        记录一次查询。与最新状态相同时只写入快照行；不同时同时写入全部时段行。
+        读取最新状态与写入在同一个 IMMEDIATE 事务中，并发写入的脚本依次执行。
+        before_commit(conn) 在提交前调用，用于把依赖本次结果的其他表写入同一事务。
+        返回 (snapshot_id, SlotDelta)。
+        """
+        taken_at = time.time() if taken_at is None else taken_at
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            base_id = self._base_id(site)
+            delta = diff_slots(self._slots(base_id), slots)
+            changed = base_id is None or bool(delta.added or delta.removed or delta.changed)
+            cursor = self.conn.execute(
+                "INSERT INTO snapshots (site, taken_at, base_id, slot_count) VALUES (?, ?, ?, ?)",
+                (site, taken_at, base_id, len(slots)),
+            )
+            snapshot_id = cursor.lastrowid
+            if changed:
+                self.conn.execute("UPDATE snapshots SET base_id = ? WHERE id = ?", (snapshot_id, snapshot_id))
+                self.conn.executemany(
+                    "INSERT INTO slots (snapshot_id, site, facility, date, slot, count) VALUES (?, ?, ?, ?, ?, ?)",
+                    [(snapshot_id, key.site, key.facility, key.date, key.slot, count) for key, count in slots.items()],
+                )
+            if before_commit is not None:
+                before_commit(self.conn)
+            self.conn.execute("COMMIT")
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+        return snapshot_id, delta
+
+
+def _parse_time(text):
+    for fmt in ("%Y-%m-%d %H:%M", "%Y-%m-%d %H:%M:%S", "%Y-%m-%d"):
+        try:
+            return datetime.strptime(text, fmt).timestamp()
+        except ValueError:
+            continue
+    return float(text)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="查询各站点保存的空位状态")
+    parser.add_argument("--db", default=STATE_DB)
+    sub = parser.add_subparsers(dest="command", required=True)
+    latest = sub.add_parser("latest", help="站点的最新状态")
+    latest.add_argument("site")
+    changes = sub.add_parser("changes", help="某个时间以来的变化")
+    changes.add_argument("site")
+    changes.add_argument("--since", required=True, help='如 "2025-02-08 09:00" 或时间戳')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    with StateDB(args.db) as db:
+        if args.command == "latest":
+            slots = db.latest(args.site)
+            for key, count in sorted(slots.items()):
+                print(f"{key.date} | {key.facility} | {key.slot} | {count}")
+            print(f"共 {len(slots)} 个可预约时段")
+        else:
+            delta = db.changes_since(args.site, _parse_time(args.since))
+            print(format_delta(delta, len(db.latest(args.site))))
+
+
+if __name__ == "__main__":
+    main()
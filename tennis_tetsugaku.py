@@ -1,21 +1,20 @@
 import re
 import time
-import random
 import logging
 from datetime import datetime
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait, Select
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException, NoSuchElementException
-from webdriver_manager.chrome import ChromeDriverManager
 from dotenv import load_dotenv
 import jpholiday
-from bs4 import BeautifulSoup
+from tennis_driver import create_driver, record_page_metrics
+from tennis_retry import check_portal, load_page_with_retry, EXIT_PORTAL_DOWN
+from tennis_delta import notify_changes, slots_from_entries
+from tennis_extract import extract_timetable
+from tennis_session import resume_session, save_session
+from tennis_wait import arm_dom_watch, wait_for_dom_settled, wait_for_page_change
 load_dotenv("/root/tenniscourt/config.env", override=True)
-time.sleep(random.uniform(1, 30))  # 等待随机秒数
 
 # 配置日志输出到文件
 logging.basicConfig(
@@ -25,301 +24,290 @@ logging.basicConfig(
     datefmt="%Y-%m-%d %H:%M:%S",
 )
 
-# 1️⃣ 配置 Selenium
-options = Options()
-options.add_argument("--headless")  # 无头模式运行
-options.add_argument("--disable-gpu")
-options.add_argument("--window-size=1920x1080")
-options.add_argument("--no-sandbox")
-options.add_argument("--disable-dev-shm-usage")
-options.add_argument("--disable-blink-features=AutomationControlled")
-options.add_argument("user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/131.0.0.0 Safari/537.36")
+url = "https://yoyaku.nakano-tokyo.jp/stagia/reserve/grb_init"
+# 门户熔断中或预检失败时不启动 Chrome
+if not check_portal(url):
+    exit(EXIT_PORTAL_DOWN)
 
-service = Service(ChromeDriverManager().install())
-driver = webdriver.Chrome(service=service, options=options)
+# 1️⃣ 启动 WebDriver（浏览器池可用时租用预热好的 Chrome）
+driver = create_driver("tetsugaku")
 
 # 2️⃣ 访问主页并确保加载成功
-url = "https://yoyaku.nakano-tokyo.jp/stagia/reserve/grb_init"
-while True:
-    driver.get(url)
+# 优先恢复上次保存的结果页会话，失效时再完整导航
+navigation_started = time.monotonic()
+if not resume_session(driver, "tetsugaku", (By.XPATH, "//img[contains(@src, '/stagia/jsp/images_jp/common/btn-nav-change.gif')]")):
+    if not load_page_with_retry(driver, url, (By.ID, "contents")):
+        driver.quit()
+        exit(EXIT_PORTAL_DOWN)
+    logging.info("搜索按钮加载成功")
+    record_page_metrics(driver, "tetsugaku", "主页")
+
+    # 3️⃣ 依次点击页面中的各个按钮或链接
+
+    # 点击“空き状況確認”按钮
     try:
-        WebDriverWait(driver, 10).until(
-            EC.visibility_of_element_located((By.ID, "contents"))
+        image_button = WebDriverWait(driver, 10).until(
+            EC.element_to_be_clickable((By.XPATH, "//input[@type='image' and contains(@src, 'btn_check_status_01.gif')]"))
         )
-        logging.info("主页加载成功")
-        break
-    except TimeoutException:
-        logging.warning("主页加载超时，正在刷新...")
-time.sleep(random.uniform(1, 3))
-logging.info("搜索按钮加载成功")
-
-# 3️⃣ 依次点击页面中的各个按钮或链接
-
-# 点击“空き状況確認”按钮
-try:
-    image_button = WebDriverWait(driver, 10).until(
-        EC.element_to_be_clickable((By.XPATH, "//input[@type='image' and contains(@src, 'btn_check_status_01.gif')]"))
-    )
-    image_button.click()
-    logging.info("已点击按钮 '空き状況確認'，进入新页面")
-    WebDriverWait(driver, 10).until(EC.presence_of_element_located((By.ID, "allChecked")))
-except Exception as e:
-    logging.exception("操作失败（空き状況確認按钮）：%s", e)
-
+        image_button.click()
+        logging.info("已点击按钮 '空き状況確認'，进入新页面")
+        WebDriverWait(driver, 10).until(EC.presence_of_element_located((By.ID, "allChecked")))
+    except Exception as e:
+        logging.exception("操作失败（空き状況確認按钮）：%s", e)
 
 
-#分類選択1
 
-try:
+    #分類選択1
 
-    link_button = WebDriverWait(driver, 10).until(
-        EC.element_to_be_clickable((By.ID, "allChecked"))
-    )
-    link_button.click()
-    logging.info("已点击链接按钮 '全て'")
+    try:
 
-    # **等待 class 变化，确保点击成功**
-    WebDriverWait(driver, 10).until(
-        EC.presence_of_element_located((By.XPATH, "//a[@id='allChecked' and contains(@class, 'active')]"))
-    )
+        link_button = WebDriverWait(driver, 10).until(
+            EC.element_to_be_clickable((By.ID, "allChecked"))
+        )
+        link_button.click()
+        logging.info("已点击链接按钮 '全て'")
 
-    logging.info("点击成功，按钮已变为 'active' 状态")
-except Exception as e:
-    logging.exception("操作失败(allChecked):%s", e)
+        # **等待 class 变化，确保点击成功**
+        WebDriverWait(driver, 10).until(
+            EC.presence_of_element_located((By.XPATH, "//a[@id='allChecked' and contains(@class, 'active')]"))
+        )
 
+        logging.info("点击成功，按钮已变为 'active' 状态")
+    except Exception as e:
+        logging.exception("操作失败(allChecked):%s", e)
 
-# 点击“确定”按钮
-try:
-    image_button = WebDriverWait(driver, 10).until(
-        EC.element_to_be_clickable((By.XPATH, "//img[contains(@src, '/stagia/jsp/images_jp/common/btn-ok.gif')]"))
-    )
-    image_button.click()
-    logging.info("已点击按钮 '確定'，进入新页面")
-    WebDriverWait(driver, 10).until(EC.presence_of_element_located((By.ID, "button2")))
 
-except Exception as e:
-    logging.exception("操作失败（確定）：%s", e)
+    # 点击“确定”按钮
+    try:
+        image_button = WebDriverWait(driver, 10).until(
+            EC.element_to_be_clickable((By.XPATH, "//img[contains(@src, '/stagia/jsp/images_jp/common/btn-ok.gif')]"))
+        )
+        image_button.click()
+        logging.info("已点击按钮 '確定'，进入新页面")
+        WebDriverWait(driver, 10).until(EC.presence_of_element_located((By.ID, "button2")))
 
+    except Exception as e:
+        logging.exception("操作失败（確定）：%s", e)
 
-#分類選択２
 
+    #分類選択２
 
-try:
-    # 等待并点击 id="button2" 的链接
-    link_button = WebDriverWait(driver, 10).until(
-        EC.element_to_be_clickable((By.ID, "button2"))
-    )
-    link_button.click()
-    logging.info("已点击链接按钮 '運動施設'")
 
-    # **等待 class 变化，确保点击成功**
-    WebDriverWait(driver, 10).until(
-        EC.presence_of_element_located((By.XPATH, "//a[@id='button2' and contains(@class, 'active')]"))
-    )
+    try:
+        # 等待并点击 id="button2" 的链接
+        link_button = WebDriverWait(driver, 10).until(
+            EC.element_to_be_clickable((By.ID, "button2"))
+        )
+        link_button.click()
+        logging.info("已点击链接按钮 '運動施設'")
 
-    logging.info("点击成功，按钮已变为 'active' 状态")
-except Exception as e:
-    logging.exception("操作失败（運動施設）：%s", e)
+        # **等待 class 变化，确保点击成功**
+        WebDriverWait(driver, 10).until(
+            EC.presence_of_element_located((By.XPATH, "//a[@id='button2' and contains(@class, 'active')]"))
+        )
 
-# 点击“确定”按钮
-try:
-    image_button = WebDriverWait(driver, 10).until(
-        EC.element_to_be_clickable((By.XPATH, "//img[contains(@src, '/stagia/jsp/images_jp/common/btn-ok.gif')]"))
-    )
-    image_button.click()
-    logging.info("已点击按钮 '確定'，进入新页面")
-    WebDriverWait(driver, 10).until(EC.presence_of_element_located((By.XPATH, "//img[contains(@src, '/stagia/jsp/images_jp/common/btn-page-next.gif')]")))
-except Exception as e:
-    logging.exception("操作失败（確定）：%s", e)
+        logging.info("点击成功，按钮已变为 'active' 状态")
+    except Exception as e:
+        logging.exception("操作失败（運動施設）：%s", e)
 
+    # 点击“确定”按钮
+    try:
+        image_button = WebDriverWait(driver, 10).until(
+            EC.element_to_be_clickable((By.XPATH, "//img[contains(@src, '/stagia/jsp/images_jp/common/btn-ok.gif')]"))
+        )
+        image_button.click()
+        logging.info("已点击按钮 '確定'，进入新页面")
+        WebDriverWait(driver, 10).until(EC.presence_of_element_located((By.XPATH, "//img[contains(@src, '/stagia/jsp/images_jp/common/btn-page-next.gif')]")))
+    except Exception as e:
+        logging.exception("操作失败（確定）：%s", e)
 
 
-#目的選択
 
-try:
-    # 等待并点击 id="次頁" 的链接
-    link_button = WebDriverWait(driver, 10).until(
-        EC.element_to_be_clickable((By.ID, "nextButton"))
-    )
-    link_button.click()
-    logging.info("已点击链接按钮 '次頁'")
+    #目的選択
 
-    # **等待 class 变化，确保点击成功**
-    WebDriverWait(driver, 10).until(
-        EC.presence_of_element_located((By.XPATH, "//a[contains(text(), '硬式テニス')]"))
-    )
+    try:
+        # 等待并点击 id="次頁" 的链接
+        link_button = WebDriverWait(driver, 10).until(
+            EC.element_to_be_clickable((By.ID, "nextButton"))
+        )
+        link_button.click()
+        logging.info("已点击链接按钮 '次頁'")
 
-    logging.info("已出现 硬式テニス")
-except Exception as e:
-    logging.exception("操作失败（次頁）：%s", e)
+        # **等待 class 变化，确保点击成功**
+        WebDriverWait(driver, 10).until(
+            EC.presence_of_element_located((By.XPATH, "//a[contains(text(), '硬式テニス')]"))
+        )
 
+        logging.info("已出现 硬式テニス")
+    except Exception as e:
+        logging.exception("操作失败（次頁）：%s", e)
 
 
 
-# 点击“硬式テニス”按钮
 
-try:
-    # 等待并点击 "硬式テニス" 的链接
-    link_button = WebDriverWait(driver, 10).until(
-        EC.element_to_be_clickable((By.XPATH, "//a[contains(text(), '硬式テニス')]"))
-    )
-    link_button.click()
-    logging.info("已点击链接按钮 '硬式テニス'")
+    # 点击“硬式テニス”按钮
 
-    # **等待 class 变化，确保点击成功**
-    WebDriverWait(driver, 10).until(
-        EC.presence_of_element_located((By.ID, "id0"))
-    )
+    try:
+        # 等待并点击 "硬式テニス" 的链接
+        link_button = WebDriverWait(driver, 10).until(
+            EC.element_to_be_clickable((By.XPATH, "//a[contains(text(), '硬式テニス')]"))
+        )
+        link_button.click()
+        logging.info("已点击链接按钮 '硬式テニス'")
 
-    logging.info("已出现 哲学堂運動施設")
-except Exception as e:
-    logging.exception("操作失败（硬式テニス）：%s", e)
+        # **等待 class 变化，确保点击成功**
+        WebDriverWait(driver, 10).until(
+            EC.presence_of_element_located((By.ID, "id0"))
+        )
 
+        logging.info("已出现 哲学堂運動施設")
+    except Exception as e:
+        logging.exception("操作失败（硬式テニス）：%s", e)
 
 
 
-# 点击“哲学堂運動施設”按钮
 
-try:
-    # 等待并点击 id="button2" 的链接
-    link_button = WebDriverWait(driver, 10).until(
-        EC.element_to_be_clickable((By.ID, "id0"))
-    )
-    link_button.click()
-    logging.info("已点击按钮 '哲学堂運動施設'，进入新页面")
+    # 点击“哲学堂運動施設”按钮
 
-    # **等待 class 变化，确保点击成功**
-    WebDriverWait(driver, 10).until(
-        EC.presence_of_element_located((By.XPATH, "//a[@id='id0' and contains(@class, 'active')]"))
-    )
+    try:
+        # 等待并点击 id="button2" 的链接
+        link_button = WebDriverWait(driver, 10).until(
+            EC.element_to_be_clickable((By.ID, "id0"))
+        )
+        link_button.click()
+        logging.info("已点击按钮 '哲学堂運動施設'，进入新页面")
 
-    logging.info("点击成功，按钮已变为 'active' 状态")
-except Exception as e:
-    logging.exception("操作失败（哲学堂運動施設）：%s", e)
+        # **等待 class 变化，确保点击成功**
+        WebDriverWait(driver, 10).until(
+            EC.presence_of_element_located((By.XPATH, "//a[@id='id0' and contains(@class, 'active')]"))
+        )
 
-# 点击“确定”按钮
-try:
-    image_button = WebDriverWait(driver, 10).until(
-        EC.element_to_be_clickable((By.ID, "btnOk"))
-    )
-    image_button.click()
-    logging.info("已点击按钮 '確定'，进入新页面")
-    WebDriverWait(driver, 10).until(EC.presence_of_element_located((By.ID, "button0")))
-    logging.info("已出现 庭球場第１コート")
+        logging.info("点击成功，按钮已变为 'active' 状态")
+    except Exception as e:
+        logging.exception("操作失败（哲学堂運動施設）：%s", e)
 
-except Exception as e:
-    logging.exception("操作失败（確定）：%s", e)
+    # 点击“确定”按钮
+    try:
+        image_button = WebDriverWait(driver, 10).until(
+            EC.element_to_be_clickable((By.ID, "btnOk"))
+        )
+        image_button.click()
+        logging.info("已点击按钮 '確定'，进入新页面")
+        WebDriverWait(driver, 10).until(EC.presence_of_element_located((By.ID, "button0")))
+        logging.info("已出现 庭球場第１コート")
 
+    except Exception as e:
+        logging.exception("操作失败（確定）：%s", e)
 
 
-# 点击“全て”按钮
 
-try:
-    # 等待并点击 id="button2" 的链接
-    link_button = WebDriverWait(driver, 10).until(
-        EC.element_to_be_clickable((By.ID, "allChecked"))
-    )
-    link_button.click()
-    logging.info("已点击按钮 '全て'")
+    # 点击“全て”按钮
 
-    # **等待 class 变化，确保点击成功**
-    WebDriverWait(driver, 10).until(
-        EC.presence_of_element_located((By.XPATH, "//a[@id='allChecked' and contains(@class, 'active')]"))
-    )
+    try:
+        # 等待并点击 id="button2" 的链接
+        link_button = WebDriverWait(driver, 10).until(
+            EC.element_to_be_clickable((By.ID, "allChecked"))
+        )
+        link_button.click()
+        logging.info("已点击按钮 '全て'")
 
-    logging.info("点击成功，按钮已变为 'active' 状态")
-except Exception as e:
-    logging.exception("操作失败（全て）：%s", e)
+        # **等待 class 变化，确保点击成功**
+        WebDriverWait(driver, 10).until(
+            EC.presence_of_element_located((By.XPATH, "//a[@id='allChecked' and contains(@class, 'active')]"))
+        )
 
+        logging.info("点击成功，按钮已变为 'active' 状态")
+    except Exception as e:
+        logging.exception("操作失败（全て）：%s", e)
 
 
-# 点击“确定”按钮
-try:
-    image_button = WebDriverWait(driver, 10).until(
-        EC.element_to_be_clickable((By.XPATH, "//img[contains(@src, '/stagia/jsp/images_jp/common/btn-ok.gif')]"))
-    )
-    image_button.click()
-    logging.info("已点击按钮 '確定'，进入新页面")
-    WebDriverWait(driver, 10).until(EC.presence_of_element_located((By.ID, "filter-by-day")))
-    logging.info("已出现 曜日を絞る")
 
-except Exception as e:
-    logging.exception("操作失败（確定）：%s", e)
+    # 点击“确定”按钮
+    try:
+        image_button = WebDriverWait(driver, 10).until(
+            EC.element_to_be_clickable((By.XPATH, "//img[contains(@src, '/stagia/jsp/images_jp/common/btn-ok.gif')]"))
+        )
+        image_button.click()
+        logging.info("已点击按钮 '確定'，进入新页面")
+        WebDriverWait(driver, 10).until(EC.presence_of_element_located((By.ID, "filter-by-day")))
+        logging.info("已出现 曜日を絞る")
 
+    except Exception as e:
+        logging.exception("操作失败（確定）：%s", e)
 
 
 
-#表示開始日選択
 
+    #表示開始日選択
 
-# 点击日期
 
-from datetime import datetime  # 修正导入
-try:
-    # 获取今天的日期（格式：YYYYMMDD）
-    today_date = datetime.today().strftime("%Y%m%d")  # 修正这里
-    logging.info(f"今天的日期是：{today_date}")
-    
-    # 构造动态的 XPath 来匹配 `onclick="dateClick(..., YYYYMMDD)"`
-    date_xpath = f"//td[contains(@onclick, 'dateClick') and contains(@onclick, '{today_date}')]"
+    # 点击日期
 
-    # 等待并点击今天的日期按钮
-    date_button = WebDriverWait(driver, 10).until(
-        EC.element_to_be_clickable((By.XPATH, date_xpath))
-    )
-    date_button.click()
-    logging.info(f"已点击今天的日期按钮（{today_date})")
+    from datetime import datetime  # 修正导入
+    try:
+        # 获取今天的日期（格式：YYYYMMDD）
+        today_date = datetime.today().strftime("%Y%m%d")  # 修正这里
+        logging.info(f"今天的日期是：{today_date}")
 
-    # **等待 class 变为 'active'**
-    WebDriverWait(driver, 10).until(
-        EC.presence_of_element_located((By.XPATH, f"{date_xpath}[contains(@class, 'active')]"))
-    )
+        # 构造动态的 XPath 来匹配 `onclick="dateClick(..., YYYYMMDD)"`
+        date_xpath = f"//td[contains(@onclick, 'dateClick') and contains(@onclick, '{today_date}')]"
 
-    logging.info(f"日期按钮（{today_date}）已变为 active 状态")
+        # 等待并点击今天的日期按钮
+        date_button = WebDriverWait(driver, 10).until(
+            EC.element_to_be_clickable((By.XPATH, date_xpath))
+        )
+        date_button.click()
+        logging.info(f"已点击今天的日期按钮（{today_date})")
 
-except Exception as e:
-    logging.exception("操作失败（日期选择）：%s", e)
+        # **等待 class 变为 'active'**
+        WebDriverWait(driver, 10).until(
+            EC.presence_of_element_located((By.XPATH, f"{date_xpath}[contains(@class, 'active')]"))
+        )
 
+        logging.info(f"日期按钮（{today_date}）已变为 active 状态")
 
+    except Exception as e:
+        logging.exception("操作失败（日期选择）：%s", e)
 
-#点击星期
 
-try:
-    # 遍历 id="img0" 到 id="img7"
-    for i in range(8):
-        img_id = f"img{i}"
-        logging.info(f"尝试点击 {img_id}")
 
-        # 等待元素可点击
-        img_element = WebDriverWait(driver, 10).until(
-            EC.element_to_be_clickable((By.ID, img_id))
-        )
+    #点击星期
 
-        # 点击元素
-        img_element.click()
-        logging.info(f"已点击 {img_id}")
+    try:
+        # 遍历 id="img0" 到 id="img7"
+        for i in range(8):
+            img_id = f"img{i}"
+            logging.info(f"尝试点击 {img_id}")
 
-        # 可选：等待页面变化，确保点击生效（如果页面有明显变化）
-        time.sleep(1)  # 等待 1 秒，避免连续点击过快
+            # 等待元素可点击
+            img_element = WebDriverWait(driver, 10).until(
+                EC.element_to_be_clickable((By.ID, img_id))
+            )
 
-except Exception as e:
-    logging.exception("操作失败（点击 img0 - img7):%s", e)
+            # 点击元素，并等待点击引起的页面变化完成
+            arm_dom_watch(driver)
+            img_element.click()
+            logging.info(f"已点击 {img_id}")
+            wait_for_dom_settled(driver, timeout=3, quiet_ms=100, required=False)
 
+    except Exception as e:
+        logging.exception("操作失败（点击 img0 - img7):%s", e)
 
 
-# 点击“确定”按钮
-try:
-    image_button = WebDriverWait(driver, 10).until(
-        EC.element_to_be_clickable((By.XPATH, "//img[contains(@src, '/stagia/jsp/images_jp/common/btn-ok.gif')]"))
-    )
-    image_button.click()
-    logging.info("已点击按钮 '確定'，进入新页面")
-    WebDriverWait(driver, 10).until(EC.presence_of_element_located((By.XPATH, "//img[contains(@src, '/stagia/jsp/images_jp/common/btn-nav-change.gif')]")))
-    logging.info("已出现 一周时间表示按钮")
 
-except Exception as e:
-    logging.exception("操作失败（確定）：%s", e)
+    # 点击“确定”按钮
+    try:
+        image_button = WebDriverWait(driver, 10).until(
+            EC.element_to_be_clickable((By.XPATH, "//img[contains(@src, '/stagia/jsp/images_jp/common/btn-ok.gif')]"))
+        )
+        image_button.click()
+        logging.info("已点击按钮 '確定'，进入新页面")
+        WebDriverWait(driver, 10).until(EC.presence_of_element_located((By.XPATH, "//img[contains(@src, '/stagia/jsp/images_jp/common/btn-nav-change.gif')]")))
+        logging.info("已出现 一周时间表示按钮")
 
+    except Exception as e:
+        logging.exception("操作失败（確定）：%s", e)
+    save_session(driver, "tetsugaku", time.monotonic() - navigation_started)
 
 
 from selenium.common.exceptions import  TimeoutException, ElementNotInteractableException
@@ -335,7 +323,6 @@ from datetime import datetime
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from selenium.common.exceptions import ElementNotInteractableException
-from bs4 import BeautifulSoup
 
 # 设置日志
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
@@ -344,13 +331,11 @@ logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(
 all_available_slots = []
 
 while True:  # 循环直到无法翻页
-    soup = BeautifulSoup(driver.page_source, "html.parser")
+    # 在浏览器内一次性取出日期与各设施各时段的图标
+    raw_date, timetable = extract_timetable(driver)  # 例如 "令和07年2月8日(土)"
 
     # 获取当前日期
-    today_date_element = soup.select_one("li.day#li")
-    if today_date_element:
-        raw_date = today_date_element.get_text(strip=True)  # 例如 "令和07年2月8日(土)"
-
+    if raw_date:
         # 使用正则提取和转换日期
         match = re.search(r"令和(\d+)年(\d+)月(\d+)日", raw_date)
         if match:
@@ -362,36 +347,21 @@ while True:  # 循环直到无法翻页
 
     logging.info(today_date)  # 输出格式化的日期，例如：2025-02-08
 
-    # 提取设施名称
-    facilities = [row.get_text(strip=True) for row in soup.select("tbody tr th strong")]
-
-    # 提取时间段
-    time_slots = [header.get_text(strip=True).replace("～", "-") for header in soup.select("thead tr th[id^='td10_']")]
-
     # 提取空位信息
-    facility_rows = soup.select("tbody tr")
-
-    for facility_index, row in enumerate(facility_rows):
-        if facility_index >= len(facilities):
-            continue  # 防止索引超出范围
-        facility_name = facilities[facility_index]
-        cells = row.select("td[id^='td11_'], td[id^='td12_'], td[id^='td13_'], td[id^='td14_'], td[id^='td15_'], td[id^='td16_']")
-
-        for time_index, cell in enumerate(cells):
-            img = cell.find("img")
-            if img and any(keyword in img["src"] for keyword in ["icon_timetable_sankaku.gif", "icon_timetable_O.gif"]):
-                all_available_slots.append({
-                    "date": today_date,  # **使用英文键**
-                    "facility": facility_name,
-                    "time": time_slots[time_index]
-                })
+    for facility_name, time_slot, icon in timetable:
+        if icon in ["icon_timetable_sankaku.gif", "icon_timetable_O.gif"]:
+            all_available_slots.append({
+                "date": today_date,  # **使用英文键**
+                "facility": facility_name,
+                "time": time_slot
+            })
 
     # 尝试点击 "次へ" 按钮进入下一天
     try:
         next_button = driver.find_element("xpath", "//img[@alt='次へ']")
         next_button.click()
-        time.sleep(3)  # 等待页面加载
-    except ElementNotInteractableException:
+        wait_for_page_change(driver, next_button)  # 等待下一天的页面加载完成
+    except (ElementNotInteractableException, TimeoutException):
         logging.info("已到达最后一天，停止获取。")
         break
 
@@ -425,64 +395,36 @@ logging.info("🎾 筛选后的部分空位信息（partial_available_slots）
 for slot in partial_available_slots:
     logging.info(f"{slot['date']} | {slot['facility']} | {slot['time']}")
     
-# 📂 读取上次的预约信息
-LAST_FILE = "last_availability_tetsugaku.txt"
-if os.path.exists(LAST_FILE):
-    with open(LAST_FILE, "r", encoding="utf-8") as f:
-        last_availability_tetsugaku = f.read().strip()
-else:
-    last_availability_tetsugaku = ""
+# **📩 发送邮件**
+def send_email(subject, body):
+    sender_email = os.getenv("sender_email2") # 你的 Gmail 地址
+    receiver_email = os.getenv("receiver_email").split(",") # 收件人邮箱
+    password = os.getenv("password2")# Gmail 应用专用密码
+
+    msg = MIMEMultipart()
+    msg["From"] = sender_email
+    msg["To"] = "<noreply@example.com>"
+    msg["Subject"] = subject
+    msg["Bcc"] = ', '.join(receiver_email) if isinstance(receiver_email, list) else receiver_email
+    msg.attach(MIMEText(body, "plain"))
+
+    try:
+        server = smtplib.SMTP("smtp.gmail.com", 587)
+        server.starttls()
+        server.login(sender_email, password)
+        server.send_message(msg)
+        server.quit()
+        logging.info("📧 邮件发送成功")
+    except Exception as e:
+        logging.error(f"❌ 邮件发送失败: {e}")
 
-# **定义曜日映射**
-WEEKDAY_JAPANESE = ["月", "火", "水", "木", "金", "土", "日"]
 
-# 🏸 **处理预约数据**
+# 🏸 **与上次保存的时段集合比较，只在有新增 / 消失时发送差异**
 if partial_available_slots:
-    # 格式化当前预约信息（带星期）
-    current_availability = "\n".join([
-        f"{entry['date']} ({WEEKDAY_JAPANESE[datetime.strptime(entry['date'], '%Y-%m-%d').weekday()]}) | {entry['time']} | 可预约"
-        for entry in partial_available_slots
-    ])
-
-    # 📌 比较新旧数据
-    if current_availability.strip() != last_availability_tetsugaku.strip():
-        logging.info("🔔 预约信息发生变化，发送邮件通知")
-
-        # **📩 发送邮件**
-        def send_email(subject, body):
-            sender_email = os.getenv("sender_email2") # 你的 Gmail 地址
-            receiver_email = os.getenv("receiver_email").split(",") # 收件人邮箱
-            password = os.getenv("password2")# Gmail 应用专用密码
-
-            msg = MIMEMultipart()
-            msg["From"] = sender_email
-            msg["To"] = "<noreply@example.com>"
-            msg["Subject"] = subject
-            msg["Bcc"] = ', '.join(receiver_email) if isinstance(receiver_email, list) else receiver_email
-            msg.attach(MIMEText(body, "plain"))
-
-            try:
-                server = smtplib.SMTP("smtp.gmail.com", 587)
-                server.starttls()
-                server.login(sender_email, password)
-                server.send_message(msg)
-                server.quit()
-                logging.info("📧 邮件发送成功")
-            except Exception as e:
-                logging.error(f"❌ 邮件发送失败: {e}")
-
-        email_subject = "🏸 哲学堂-网球场预约更新通知"
-        email_body = "本次查询到的可预约时间如下：\n\n" + current_availability
-        send_email(email_subject, email_body)
-
-        # 📂 更新 `last_availability_tetsugaku.txt`
-        with open(LAST_FILE, "w", encoding="utf-8") as f:
-            f.write(current_availability)
-
-    else:
-        logging.info("✅ 预约信息无变化，不发送邮件")
+    notify_changes("tetsugaku", slots_from_entries("tetsugaku", partial_available_slots), "🏸 哲学堂-网球场预约更新通知", send_email)
 else:
     logging.warning("❌ 未找到任何可预约信息")
 
 # 关闭 WebDriver
+record_page_metrics(driver, "tetsugaku", "时间表")
 driver.quit()
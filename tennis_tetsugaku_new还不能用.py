@@ -3,8 +3,8 @@
 
 import os
 import re
+import json
 import time
-import random
 import logging
 import smtplib
 from datetime import datetime
@@ -13,11 +13,7 @@ from email.mime.multipart import MIMEMultipart
 
 from dotenv import load_dotenv
 import jpholiday
-from bs4 import BeautifulSoup
 
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait, Select
 from selenium.webdriver.support import expected_conditions as EC
@@ -27,7 +23,13 @@ from selenium.common.exceptions import (
     ElementNotInteractableException,
 )
 
-from webdriver_manager.chrome import ChromeDriverManager
+from tennis_driver import create_driver, record_page_metrics
+from tennis_retry import check_portal, load_page_with_retry, EXIT_PORTAL_DOWN
+from tennis_delta import notify_changes, slots_from_entries
+from tennis_extract import extract_timetable
+from tennis_wait import arm_dom_watch, wait_for_dom_settled, wait_for_page_change
+from tennis_stagia_http import fetch_timetable, FACILITIES
+from tennis_session import resume_session, save_session
 
 # ---------------------------
 # 配置日志与环境变量
@@ -41,29 +43,13 @@ logging.basicConfig(
 )
 load_dotenv("/root/tenniscourt/config.env", override=True)
 
-# 随机等待，降低请求频率
-time.sleep(random.uniform(1, 30))
-
 
 # ---------------------------
 # Selenium 初始化与导航步骤
 # ---------------------------
 def init_driver():
     """初始化并返回配置好的 Chrome WebDriver"""
-    options = Options()
-    options.add_argument("--headless")  # 无头模式
-    options.add_argument("--disable-gpu")
-    options.add_argument("--window-size=1920x1080")
-    options.add_argument("--no-sandbox")
-    options.add_argument("--disable-dev-shm-usage")
-    options.add_argument("--disable-blink-features=AutomationControlled")
-    options.add_argument(
-        "user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-        "AppleWebKit/537.36 (KHTML, like Gecko) Chrome/131.0.0.0 Safari/537.36"
-    )
-    service = Service(ChromeDriverManager().install())
-    driver = webdriver.Chrome(service=service, options=options)
-    return driver
+    return create_driver("tetsugaku_new")
 
 
 def wait_for_element(driver, by, locator, timeout=10):
@@ -78,19 +64,13 @@ def perform_navigation(driver):
     按照预设步骤点击各个按钮/链接，直至进入时间预约页面
     """
     base_url = "https://yoyaku.nakano-tokyo.jp/stagia/reserve/grb_init"
-    driver.get(base_url)
     # 等待主页加载（id="contents"出现）
-    while True:
-        try:
-            wait_for_element(driver, By.ID, "contents", timeout=10)
-            logging.info("主页加载成功")
-            break
-        except TimeoutException:
-            logging.warning("主页加载超时，正在刷新...")
-            driver.get(base_url)
+    if not load_page_with_retry(driver, base_url, (By.ID, "contents")):
+        driver.quit()
+        exit(EXIT_PORTAL_DOWN)
 
-    time.sleep(random.uniform(1, 3))
     logging.info("初始页面加载完毕")
+    record_page_metrics(driver, "tetsugaku_new", "主页")
 
     # ===== 第1阶段：选择预约状态 =====
     try:
@@ -309,9 +289,10 @@ def select_weekdays(driver):
             btn = WebDriverWait(driver, 10).until(
                 EC.element_to_be_clickable((By.ID, img_id))
             )
+            arm_dom_watch(driver)
             btn.click()
             logging.info(f"已点击 {img_id}")
-            time.sleep(1)
+            wait_for_dom_settled(driver, timeout=3, quiet_ms=100, required=False)
     except Exception as e:
         logging.exception("操作失败（点击星期按钮 img0 - img7）：%s", e)
 
@@ -327,37 +308,20 @@ def parse_schedule(driver):
     all_slots = []
 
     while True:
-        soup = BeautifulSoup(driver.page_source, "html.parser")
-        # 提取当前日期
-        today_date = extract_date(soup)
+        # 在浏览器内一次性取出日期与各设施各时段的图标
+        raw_date, timetable = extract_timetable(driver)
+        today_date = extract_date(raw_date)
         logging.info(f"当前页面日期：{today_date}")
 
-        # 提取设施名称（tbody中每行第一列的 <strong> 文本）
-        facilities = [elem.get_text(strip=True) for elem in soup.select("tbody tr th strong")]
-
-        # 提取时间段（thead中 id 以 td10_ 开头的 th，替换掉 "～" 为 "-"）
-        time_slots = [
-            header.get_text(strip=True).replace("～", "-")
-            for header in soup.select("thead tr th[id^='td10_']")
-        ]
-
         # 提取各设施在各时段的空位情况
-        facility_rows = soup.select("tbody tr")
-        for idx, row in enumerate(facility_rows):
-            if idx >= len(facilities):
-                continue
-            facility_name = facilities[idx]
-            # 选择各个时段对应的单元格（id 以 td11_ ~ td16_）
-            cells = row.select("td[id^='td11_'], td[id^='td12_'], td[id^='td13_'], td[id^='td14_'], td[id^='td15_'], td[id^='td16_']")
-            for t_index, cell in enumerate(cells):
-                img = cell.find("img")
-                if img and any(x in img["src"] for x in ["icon_timetable_sankaku.gif", "icon_timetable_O.gif"]):
-                    slot = {
-                        "date": today_date,
-                        "facility": facility_name,
-                        "time": time_slots[t_index] if t_index < len(time_slots) else "未知时段",
-                    }
-                    all_slots.append(slot)
+        for facility_name, time_slot, icon in timetable:
+            if icon in ["icon_timetable_sankaku.gif", "icon_timetable_O.gif"]:
+                slot = {
+                    "date": today_date,
+                    "facility": facility_name,
+                    "time": time_slot,
+                }
+                all_slots.append(slot)
 
         # 尝试点击 "次へ" 按钮进入下一天
         try:
@@ -365,7 +329,7 @@ def parse_schedule(driver):
                 EC.element_to_be_clickable((By.XPATH, "//img[@alt='次へ']"))
             )
             next_btn.click()
-            time.sleep(1)  # 等待页面加载
+            wait_for_page_change(driver, next_btn)  # 等待下一天的页面加载完成
         except TimeoutException:
             logging.info("找不到 '次へ' 按钮，可能已经到达最后一天，停止获取。")
             break
@@ -373,13 +337,11 @@ def parse_schedule(driver):
     return all_slots
 
 
-def extract_date(soup):
+def extract_date(raw_date):
     """
-    从页面中解析日期信息，形如 "令和07年2月8日(土)"，转换为 YYYY-MM-DD 格式
+    解析页面中的日期文字，形如 "令和07年2月8日(土)"，转换为 YYYY-MM-DD 格式
     """
-    date_elem = soup.select_one("li.day#li")
-    if date_elem:
-        raw_date = date_elem.get_text(strip=True)
+    if raw_date:
         match = re.search(r"令和(\d+)年(\d+)月(\d+)日", raw_date)
         if match:
             reiwa_year, month, day = map(int, match.groups())
@@ -438,48 +400,54 @@ def send_email(subject, body):
         logging.error(f"❌ 邮件发送失败: {e}")
 
 
-def notify_if_changed(filtered_slots, last_file="last_availability_tetsugaku_new.txt"):
-    """
-    将当前预约信息格式化后与上次保存的数据比较，
-    若有变化则发送邮件通知并更新保存文件
-    """
-    WEEKDAY_JAPANESE = ["月", "火", "水", "木", "金", "土", "日"]
-
-    # 格式化当前预约信息（带星期）
-    current_info = "\n".join(
-        f"{slot['date']} ({WEEKDAY_JAPANESE[datetime.strptime(slot['date'], '%Y-%m-%d').weekday()]}) | {slot['time']} | {slot['facility']}"
-        for slot in filtered_slots
-    )
-
-    # 读取上次保存的信息
-    if os.path.exists(last_file):
-        with open(last_file, "r", encoding="utf-8") as f:
-            last_info = f.read().strip()
-    else:
-        last_info = ""
-
-    if current_info.strip() != last_info.strip():
-        logging.info("🔔 预约信息发生变化，发送邮件通知")
-        subject = "🏸 哲学堂-网球场预约更新通知"
-        body = "本次查询到的可预约时间如下：\n\n" + current_info
-        send_email(subject, body)
-        with open(last_file, "w", encoding="utf-8") as f:
-            f.write(current_info)
-    else:
-        logging.info("✅ 预约信息无变化，不发送邮件")
+def notify_if_changed(filtered_slots):
+    """与上次保存的时段集合比较，只在有新增 / 消失时发送差异并更新状态文件"""
+    notify_changes("tetsugaku_new", slots_from_entries("tetsugaku_new", filtered_slots),
+                   "🏸 哲学堂-网球场预约更新通知", send_email)
 
 
 # ---------------------------
 # 主流程
 # ---------------------------
+def main_http():
+    """TENNIS_STAGIA_HTTP=1 时不启动浏览器，直接重放预约系统的表单提交"""
+    all_slots = fetch_timetable("tetsugaku_new", FACILITIES["tetsugaku"])
+    logging.info(f"共获取到 {len(all_slots)} 条预约信息")
+    filtered_slots = filter_slots(all_slots)
+    if not filtered_slots:
+        logging.warning("⚠️ 未找到符合条件的空位，程序终止。")
+        return
+    logging.info("🎾 筛选后的可预约信息：")
+    for slot in filtered_slots:
+        logging.info(f"{slot['date']} | {slot['facility']} | {slot['time']}")
+    notify_if_changed(filtered_slots)
+
+
 def main():
+    if os.getenv("TENNIS_STAGIA_HTTP"):
+        main_http()
+        return
+
+    # 门户熔断中或预检失败时不启动 Chrome
+    if not check_portal("https://yoyaku.nakano-tokyo.jp/stagia/reserve/grb_init"):
+        exit(EXIT_PORTAL_DOWN)
     driver = init_driver()
 
     try:
-        # 按照流程依次点击各个按钮/链接
-        perform_navigation(driver)
+        # 优先恢复上次保存的结果页会话，失效时再按照流程依次点击各个按钮/链接
+        navigation_started = time.monotonic()
+        if not resume_session(driver, "tetsugaku_new", (
+            By.XPATH, "//img[contains(@src, '/stagia/jsp/images_jp/common/btn-nav-change.gif')]"
+        )):
+            perform_navigation(driver)
+            save_session(driver, "tetsugaku_new", time.monotonic() - navigation_started)
         # 解析页面获取所有空位信息
         all_slots = parse_schedule(driver)
+        record_page_metrics(driver, "tetsugaku_new", "时间表")
+        # 写出对照数据，供 tests/test_stagia_http.py 与 HTTP 客户端的回放结果比较
+        if os.getenv("TENNIS_PARITY_DUMP"):
+            with open(os.getenv("TENNIS_PARITY_DUMP"), "w", encoding="utf-8") as f:
+                json.dump(all_slots, f, ensure_ascii=False, indent=2)
         logging.info(f"共获取到 {len(all_slots)} 条预约信息")
 
         # 筛选符合预约条件的时段
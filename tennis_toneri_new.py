@@ -1,9 +1,7 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
-import re
 import time
-import random
 import logging
 import smtplib
 import os
@@ -12,15 +10,21 @@ from datetime import datetime
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait, Select
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException, NoSuchElementException, StaleElementReferenceException
 
-from webdriver_manager.chrome import ChromeDriverManager
+from tennis_driver import create_driver, record_page_metrics
+from tennis_retry import check_portal, load_page_with_retry, EXIT_PORTAL_DOWN
+from tennis_availability import AvailabilityStore, WeekHarvester
+from tennis_delta import notify_changes, slots_from_items
+from tennis_heartbeat import CalendarHeartbeat
+from tennis_extract import extract_week_slots
+from tennis_parse import parse_month_calendar, split_open_dates
+from tennis_wait import wait_for_week_slots, wait_for_month_change
+from tennis_metro_http import fetch_availability
+from tennis_session import resume_session, save_session
 from dotenv import load_dotenv
 import jpholiday
 
@@ -35,41 +39,18 @@ logging.basicConfig(
 )
 load_dotenv("/root/tenniscourt/config.env", override=True)
 
-# 随机等待一段时间，降低频率
-time.sleep(random.uniform(1, 30))
-
 
 # ---------------------------
 # Selenium 相关函数
 # ---------------------------
 def initialize_driver():
-    options = Options()
-    options.add_argument("--headless")  # 如需调试可去掉此行
-    options.add_argument("--disable-gpu")
-    options.add_argument("--window-size=1920x1080")
-    options.add_argument("--no-sandbox")
-    options.add_argument("--disable-dev-shm-usage")
-    options.add_argument("--disable-blink-features=AutomationControlled")
-    options.add_argument(
-        "user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-        "AppleWebKit/537.36 (KHTML, like Gecko) Chrome/131.0.0.0 Safari/537.36"
-    )
-    service = Service(ChromeDriverManager().install())
-    driver = webdriver.Chrome(service=service, options=options)
-    return driver
+    return create_driver("toneri_new")
 
 
 def load_home_page(driver, url):
-    while True:
-        driver.get(url)
-        try:
-            WebDriverWait(driver, 10).until(
-                EC.visibility_of_element_located((By.ID, "btn-go"))
-            )
-            logging.info("主页加载成功")
-            break
-        except TimeoutException:
-            logging.warning("主页加载超时，正在刷新...")
+    if not load_page_with_retry(driver, url, (By.ID, "btn-go")):
+        driver.quit()
+        exit(EXIT_PORTAL_DOWN)
 
 
 def select_sport_and_park(driver):
@@ -168,8 +149,8 @@ def expand_month_info(driver):
             break
 
 
-def click_date_and_extract(driver, date, availability_info):
-    """点击指定日期并提取该日的时段空位信息"""
+def click_date_and_extract(driver, date, week_plan):
+    """点击指定日期，收下周视图中所有目标日期的时段空位信息"""
     max_attempts = 3
     attempt = 0
     while attempt < max_attempts:
@@ -185,60 +166,26 @@ def click_date_and_extract(driver, date, availability_info):
             )
             date_element.click()
             logging.info(f"✅ 成功点击 {date[:4]}年{date[4:6]}月{date[6:]}日")
-            time.sleep(2)  # 等待 JS 渲染
-
-            WebDriverWait(driver, 30).until(
-                EC.presence_of_element_located((By.ID, "week-info"))
-            )
+            wait_for_week_slots(driver, date)
             logging.info(f"✅ {date[:4]}年{date[4:6]}月{date[6:]}日 的时间段已加载")
 
-            html_after_click = driver.execute_script("return document.body.outerHTML;")
-            # 清除当前日期旧数据
-            availability_info = {k: v for k, v in availability_info.items() if k[0] != date}
-
-            pattern_slots = re.compile(
-                r'<input id="A_(\d{8})_(\d{2})" type="hidden" value="(\d+)">',
-                re.S
-            )
-            for match in pattern_slots.finditer(html_after_click):
-                slot_date, slot_suffix, available_count = match.groups()
-                if slot_date == date:
-                    slot_time = {
-                        "10": "9-11点", "20": "11-13点",
-                        "30": "13-15点", "40": "15-17点",
-                        "50": "17-19点", "60": "19-21点"
-                    }.get(slot_suffix, "未知时间段")
-                    availability_info[(slot_date, slot_time)] = available_count
+            # 周视图中同一周的其他目标日期一起收下，不再单独点击
+            week_plan.harvest(date, extract_week_slots(driver))
             break  # 成功后退出重试循环
         except StaleElementReferenceException:
             logging.warning(f"⚠️ 目标元素失效，重试点击 {date[:4]}年{date[4:6]}月{date[6:]}日...")
-            time.sleep(1)
         except TimeoutException:
             logging.error(f"❌ 无法点击 {date[:4]}年{date[4:6]}月{date[6:]}日")
             driver.quit()
             exit(0)
-    return availability_info
 
 
 def extract_available_dates(html):
     """
-    使用正则表达式提取页面中可预约的日期，
+    逐个单元格解析月历，提取页面中可预约的日期，
     返回：完全空闲日期列表、部分空闲日期列表
     """
-    pattern = re.compile(
-        r'<td id="month_(\d+)"[^>]*onclick="javascript:selectDay\(\d+\);".*?'
-        r'<img[^>]*?alt="(全て空き|一部空き)"',
-        re.S
-    )
-    available_dates = []
-    partially_available_dates = []
-    for match in pattern.finditer(html):
-        date_number, status = match.groups()
-        if status == "全て空き":
-            available_dates.append(date_number)
-        elif status == "一部空き":
-            partially_available_dates.append(date_number)
-    return available_dates, partially_available_dates
+    return split_open_dates(parse_month_calendar(html))
 
 
 def filter_holidays_and_weekends(dates):
@@ -276,59 +223,53 @@ def send_email(subject, body):
         logging.error(f"❌ 邮件发送失败: {e}")
 
 
-def process_email_notification(availability_info):
-    """比较最新预约信息与上次保存的内容，如有变化则发送邮件通知，并更新文件"""
-    last_file = "last_availability_toneri_new.txt"
-    if os.path.exists(last_file):
-        with open(last_file, "r", encoding="utf-8") as f:
-            last_availability = f.read()
-    else:
-        last_availability = ""
-
-    # 按照日期和时间段排序
-    time_order = {"9-11点": 1, "11-13点": 2, "13-15点": 3, "15-17点": 4, "17-19点": 5, "19-21点": 6}
-    sorted_availability = sorted(
-        availability_info.items(),
-        key=lambda x: (x[0][0], time_order.get(x[0][1], 99))
-    )
-
-    weekday_japanese = ["月", "火", "水", "木", "金", "土", "日"]
-    current_availability = "\n".join(
-        f"{date[:4]}-{date[4:6]}-{date[6:]} ({weekday_japanese[datetime.strptime(date, '%Y%m%d').weekday()]}) | {time_slot} | 可预约：{count} 人"
-        for (date, time_slot), count in sorted_availability
-    )
-
-    if current_availability.strip() != last_availability.strip():
-        logging.info("🔔 预约信息发生变化，发送邮件通知")
-        email_subject = "🏸 舍人-网球场预约更新通知"
-        email_body = "本次查询到的可预约时间如下：\n\n" + current_availability
-        send_email(email_subject, email_body)
-        with open(last_file, "w", encoding="utf-8") as f:
-            f.write(current_availability)
-    else:
-        logging.info("✅ 预约信息无变化，不发送邮件")
+def process_email_notification(availability_info, heartbeat=None):
+    """与上次保存的时段集合比较，只在有新增 / 消失 / 数量变化时发送差异并更新状态文件"""
+    notify_changes("toneri_new", slots_from_items("toneri_new", availability_info.items()), "🏸 舍人-网球场预约更新通知", send_email, heartbeat=heartbeat)
 
 
 # ---------------------------
 # 主流程
 # ---------------------------
+def main_http():
+    """TENNIS_METRO_HTTP=1 时不启动浏览器，直接重放门户的表单提交"""
+    availability_info = fetch_availability(
+        "toneri_new", "1140", purpose="1000_1030", date_filter=filter_holidays_and_weekends
+    )
+    logging.info("所有可预约时间段:")
+    for (date, time_slot), count in availability_info.items():
+        logging.info(f"{date} | {time_slot} | 可预约：{count} 人")
+    process_email_notification(availability_info)
+
+
 def main():
+    if os.getenv("TENNIS_METRO_HTTP"):
+        main_http()
+        return
+
     url = "https://kouen.sports.metro.tokyo.lg.jp/web/index.jsp"
+    # 门户熔断中或预检失败时不启动 Chrome
+    if not check_portal(url):
+        exit(EXIT_PORTAL_DOWN)
     driver = initialize_driver()
 
-    # 访问主页并等待搜索按钮加载
-    load_home_page(driver, url)
-    time.sleep(random.uniform(1, 3))
-    logging.info("搜索按钮加载成功")
+    # 优先恢复上次保存的结果页会话，失效时再完整导航
+    navigation_started = time.monotonic()
+    if not resume_session(driver, "toneri_new", (By.ID, "loadedmonth")):
+        # 访问主页并等待搜索按钮加载
+        load_home_page(driver, url)
+        logging.info("搜索按钮加载成功")
+        record_page_metrics(driver, "toneri_new", "主页")
 
-    # 选择种目和公园
-    select_sport_and_park(driver)
+        # 选择种目和公园
+        select_sport_and_park(driver)
 
-    # 点击搜索按钮并等待页面跳转
-    click_search_button(driver, url)
+        # 点击搜索按钮并等待页面跳转
+        click_search_button(driver, url)
 
-    # 等待月份信息加载
-    wait_for_month_info(driver)
+        # 等待月份信息加载
+        wait_for_month_info(driver)
+        save_session(driver, "toneri_new", time.monotonic() - navigation_started)
     expand_month_info(driver)
 
     # 获取当前页面 HTML 和月份信息
@@ -355,12 +296,18 @@ def main():
         driver.quit()
         exit(0)
 
-    availability_info = {}
+    availability_info = AvailabilityStore("toneri_new", {
+        "10": "9-11点", "20": "11-13点",
+        "30": "13-15点", "40": "15-17点",
+        "50": "17-19点", "60": "19-21点",
+    })
 
     # 处理当前月所有可预约日期
-    for date in curr_available + curr_partially:
+    week_plan = WeekHarvester(availability_info)
+    heartbeat = CalendarHeartbeat(availability_info)  # 月历与上次深度查询时相同且未过期时，沿用上次的时段
+    for date in week_plan.plan(heartbeat.gate(parse_month_calendar(html_current), curr_available + curr_partially)):
         logging.info(f"尝试点击日期：{date[:4]}年{date[4:6]}月{date[6:]}日")
-        availability_info = click_date_and_extract(driver, date, availability_info)
+        click_date_and_extract(driver, date, week_plan)
 
     # 处理下月数据
     try:
@@ -369,7 +316,7 @@ def main():
         )
         next_month_button.click()
         logging.info("已点击按钮 '下月'，进入新页面")
-        time.sleep(5)
+        wait_for_month_change(driver, month_text)  # 等待月历切换完成
         month_element = WebDriverWait(driver, 10).until(
             EC.presence_of_element_located((By.ID, "month-head"))
         )
@@ -392,19 +339,22 @@ def main():
         logging.info(f"{month_text_next}可预约的日期（仅休日&祝日，完全空闲）：{next_available}")
         logging.info(f"{month_text_next}可预约的日期（仅休日&祝日，部分空闲）：{next_partially}")
 
-        for date in next_available + next_partially:
+        for date in week_plan.plan(heartbeat.gate(parse_month_calendar(html_next), next_available + next_partially)):
             logging.info(f"尝试点击日期：{date[:4]}年{date[4:6]}月{date[6:]}日")
-            availability_info = click_date_and_extract(driver, date, availability_info)
+            click_date_and_extract(driver, date, week_plan)
+
+    week_plan.report("toneri_new")
 
     # 输出最终可预约信息
     logging.info("所有可预约时间段:")
     for (date, time_slot), count in availability_info.items():
         logging.info(f"{date} | {time_slot} | 可预约：{count} 人")
 
+    record_page_metrics(driver, "toneri_new", "结果页")
     driver.quit()
 
     # 邮件通知
-    process_email_notification(availability_info)
+    process_email_notification(availability_info, heartbeat)
 
 
 if __name__ == "__main__":
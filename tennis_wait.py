@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+事件驱动的页面就绪等待，替代点击后的固定 time.sleep。
+
+条件在浏览器内通过 MutationObserver 判断，满足后立即返回；
+超过上限仍未满足时抛出 TimeoutException，与 WebDriverWait 的行为一致。
+"""
+
+import time
+import logging
+
+from selenium.common.exceptions import TimeoutException
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+
+# 在浏览器内等待 condition(args) 为真：DOM 每次变化时检查一次，另有低频轮询兜底
+_WAIT_UNTIL_JS = """
+const done = arguments[arguments.length - 1];
+const condition = new Function('args', arguments[0]);
+const args = arguments[1];
+const timeoutMs = arguments[2];
+const check = () => { try { return !!condition(args); } catch (e) { return false; } };
+if (check()) { done(true); return; }
+let finished = false;
+const finish = (ok) => {
+    if (finished) { return; }
+    finished = true;
+    observer.disconnect();
+    clearInterval(poll);
+    clearTimeout(timer);
+    done(ok);
+};
+const observer = new MutationObserver(() => { if (check()) { finish(true); } });
+observer.observe(document.documentElement, {childList: true, subtree: true, attributes: true, characterData: true});
+const poll = setInterval(() => { if (check()) { finish(true); } }, 250);
+const timer = setTimeout(() => finish(false), timeoutMs);
+"""
+
+# 记录某个区域的 DOM 变化：arm 之后的第一次变化与最后一次变化时间
+_ARM_WATCH_JS = """
+const target = document.querySelector(arguments[0]) || document.documentElement;
+if (window.__tennisWatch) { window.__tennisWatch.observer.disconnect(); }
+const watch = {first: 0, last: 0};
+watch.observer = new MutationObserver(() => {
+    const now = performance.now();
+    if (!watch.first) { watch.first = now; }
+    watch.last = now;
+});
+watch.observer.observe(target, {childList: true, subtree: true, attributes: true, characterData: true});
+window.__tennisWatch = watch;
+"""
+
+# arm 之后发生过变化，并且最近 quiet_ms 毫秒内没有新的变化
+_SETTLED_CONDITION = """
+const watch = window.__tennisWatch;
+return !!watch && watch.first > 0 && performance.now() - watch.last >= args.quiet_ms;
+"""
+
+
+def wait_until(driver, condition_js, args=None, timeout=15):
+    """
+    在浏览器内等待 JS 条件成立（condition_js 为函数体，可使用 args）。
+    条件满足返回 True，超时抛出 TimeoutException。
+    """
+    started = time.monotonic()
+    driver.set_script_timeout(timeout + 5)
+    ok = driver.execute_async_script(_WAIT_UNTIL_JS, condition_js, args or {}, int(timeout * 1000))
+    if not ok:
+        raise TimeoutException(f"等待页面就绪超时（{timeout} 秒）")
+    logging.debug(f"页面就绪，用时 {(time.monotonic() - started) * 1000:.0f} ms")
+    return True
+
+
+def wait_for_week_slots(driver, date, timeout=30):
+    """
+    等待 #week-info 中出现该日期的 A_{date}_NN 时段输入框。
+    点击日期后调用，出现即返回，不再固定等待。
+    """
+    started = time.monotonic()
+    wait_until(
+        driver,
+        "return document.querySelector('#week-info input[id^=\"A_' + args.date + '_\"]') !== null;",
+        {"date": date},
+        timeout,
+    )
+    logging.info(f"⏱️ {date} 时段信息就绪，用时 {(time.monotonic() - started) * 1000:.0f} ms")
+
+
+def wait_for_month_change(driver, previous_text, timeout=30):
+    """等待 #month-head 的文本变为与 previous_text 不同，且月历日期格已渲染；返回新的月份文本"""
+    wait_until(
+        driver,
+        """
+        const head = document.getElementById('month-head');
+        return head !== null && head.innerText.trim() !== args.previous
+            && document.querySelector('td[id^="month_"]') !== null;
+        """,
+        {"previous": (previous_text or "").strip()},
+        timeout,
+    )
+    return driver.find_element("id", "month-head").text
+
+
+def arm_dom_watch(driver, selector="body"):
+    """开始监听 selector 区域的 DOM 变化，之后再执行会触发重新渲染的操作"""
+    driver.execute_script(_ARM_WATCH_JS, selector)
+
+
+def wait_for_dom_settled(driver, timeout=10, quiet_ms=300, required=True):
+    """
+    等待 arm_dom_watch 之后的重新渲染完成（发生过变化且已安静 quiet_ms 毫秒）。
+    required=False 时超时只返回 False，不抛出异常。
+    """
+    try:
+        return wait_until(driver, _SETTLED_CONDITION, {"quiet_ms": quiet_ms}, timeout)
+    except TimeoutException:
+        if required:
+            raise
+        return False
+
+
+def wait_for_page_change(driver, old_element, timeout=10):
+    """等待整页跳转完成：旧页面上的元素失效且新文档加载完毕"""
+    WebDriverWait(driver, timeout).until(EC.staleness_of(old_element))
+    WebDriverWait(driver, timeout).until(
+        lambda d: d.execute_script("return document.readyState") == "complete"
+    )
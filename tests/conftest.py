@@ -0,0 +1,19 @@
+# -*- coding: utf-8 -*-
+"""测试直接导入仓库根目录下的 tennis_*.py 模块"""
+
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+sys.path.insert(0, ROOT)
+
+
+@pytest.fixture(autouse=True)
+def isolated_cwd(tmp_path, monkeypatch):
+    """状态文件、数据库都写在当前目录，每个测试使用独立的临时目录"""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("TENNIS_RATE_DIR", str(tmp_path / "ratelimit"))
+    return tmp_path
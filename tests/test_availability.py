@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+from tennis_availability import AvailabilityStore, WeekHarvester, UNKNOWN_SLOT
+
+LABELS = {"10": "9-11点", "20": "11-13点", "30": "13-15点"}
+
+
+def test_replace_day_reports_changes_and_drops_zero_counts():
+    store = AvailabilityStore("ariake", LABELS)
+
+    assert store.replace_day("20250301", [("20250301", "10", "2"), ("20250301", "20", "0"), ("20250302", "30", "1")])
+    assert not store.replace_day("20250301", [("20250301", "10", "2")])
+    assert dict(store.items()) == {("20250301", "9-11点"): 2}
+    assert len(store) == 1
+
+
+def test_later_facility_wins_for_the_same_slot():
+    store = AvailabilityStore("okubo", LABELS)
+    store.replace_day("20250301", [("20250301", "10", "1"), ("20250301", "20", "1")], facility="a")
+    store.replace_day("20250301", [("20250301", "10", "3")], facility="b")
+
+    assert dict(store.items()) == {("20250301", "9-11点"): 3, ("20250301", "11-13点"): 1}
+
+
+def test_unknown_slot_code_is_kept():
+    store = AvailabilityStore("ariake", LABELS)
+    store.replace_day("20250301", [("20250301", "10", "1")])
+    store.replace_day("20250308", [("20250308", "70", "4")])
+
+    assert dict(store.items()) == {("20250301", "9-11点"): 1, ("20250308", UNKNOWN_SLOT): 4}
+    assert store.day("20250301").counts.tolist() == [1, 0, 0, 0]
+    assert AvailabilityStore.from_dict(store.to_dict()) == store
+
+
+def test_harvester_clicks_each_week_once():
+    store = AvailabilityStore("ariake", LABELS)
+    harvester = WeekHarvester(store)
+    clicked = []
+    for date in harvester.plan(["20250301", "20250302", "20250308"]):
+        clicked.append(date)
+        week = {"20250301": [("20250301", "10", "1"), ("20250302", "20", "2")],
+                "20250308": [("20250308", "30", "1")]}[date]
+        harvester.harvest(date, week)
+
+    assert clicked == ["20250301", "20250308"]
+    assert harvester.report("ariake") == 1
+    assert len(store) == 3
@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+from tennis_delta import SlotKey, diff_slots, notify_changes, slots_from_items, slots_from_entries, format_delta
+
+
+def _capture():
+    sent = []
+    return sent, lambda subject, body: sent.append(body)
+
+
+def test_diff_slots_groups_added_removed_changed():
+    previous = {SlotKey("a", "", "20250301", "9-11点"): 1, SlotKey("a", "", "20250301", "11-13点"): 2}
+    current = {SlotKey("a", "", "20250301", "9-11点"): 3, SlotKey("a", "", "20250302", "9-11点"): 1}
+    delta = diff_slots(previous, current)
+
+    assert list(delta.added) == [SlotKey("a", "", "20250302", "9-11点")]
+    assert list(delta.removed) == [SlotKey("a", "", "20250301", "11-13点")]
+    assert delta.changed == {SlotKey("a", "", "20250301", "9-11点"): (1, 3)}
+    body = format_delta(delta, len(current))
+    assert "2025-03-02 (日) | 9-11点 | 可预约：1 人" in body
+    assert "（原 1 人）" in body
+
+
+def test_only_changes_are_sent():
+    sent, send = _capture()
+    slots = slots_from_items("ariake", {("20250301", "9-11点"): 2}.items())
+
+    notify_changes("ariake", slots, "subject", send)
+    notify_changes("ariake", slots, "subject", send)
+
+    assert len(sent) == 1
+
+
+def test_legacy_text_file_is_imported():
+    with open("last_availability_ariake.txt", "w", encoding="utf-8") as f:
+        f.write("2025-03-01 (土) | 9-11点 | 可预约：2 人\n2025-03-08 (土) | 11-13点 ｜ 可预约\n")
+    sent, send = _capture()
+    slots = slots_from_items("ariake", {("20250301", "9-11点"): 2, ("20250308", "11-13点"): 4}.items())
+
+    delta = notify_changes("ariake", slots, "subject", send)
+
+    assert not sent
+    assert not (delta.added or delta.removed or delta.changed)
+
+
+def test_legacy_text_with_facility_column():
+    with open("last_availability_tetsugaku_new.txt", "w", encoding="utf-8") as f:
+        f.write("2025-02-08 (土) | 9:00～11:00 | 庭球場第１コート\n")
+    sent, send = _capture()
+    slots = slots_from_entries("tetsugaku_new", [
+        {"date": "2025-02-08", "time": "9:00～11:00", "facility": "庭球場第１コート"},
+        {"date": "2025-02-09", "time": "9:00～11:00", "facility": "庭球場第２コート"},
+    ])
+
+    delta = notify_changes("tetsugaku_new", slots, "subject", send)
+
+    assert list(delta.added) == [SlotKey("tetsugaku_new", "庭球場第２コート", "2025-02-09", "9:00～11:00")]
+    assert len(sent) == 1
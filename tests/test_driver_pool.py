@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+pytest.importorskip("selenium")
+
+from tennis_driver import DriverPool
+
+
+class FakeSlot:
+    """不启动 Chrome 的槽位：按设定让 reset / launch 失败"""
+
+    def __init__(self, index, reset_error=None, launch_errors=0):
+        self.index = index
+        self.driver = object()
+        self.leased_by = None
+        self.lease_count = 0
+        self.reset_error = reset_error
+        self.launch_errors = launch_errors
+        self.launches = 0
+
+    def reset(self):
+        if self.reset_error:
+            raise self.reset_error
+
+    def launch(self, lean=False):
+        self.launches += 1
+        if self.launch_errors:
+            self.launch_errors -= 1
+            raise OSError("Chrome 启动失败")
+        self.driver = object()
+
+    def quit(self):
+        self.driver = None
+
+
+def make_pool(slot):
+    pool = DriverPool(0)
+    pool.slots = [slot]
+    pool.idle = [slot]
+    return pool
+
+
+def test_release_returns_slot_when_relaunch_fails():
+    slot = FakeSlot(0, reset_error=RuntimeError("会话已断开"), launch_errors=1)
+    pool = make_pool(slot)
+    leased, _ = pool.lease("ariake", timeout=1)
+    pool.release(leased)
+
+    assert pool.idle == [slot]
+    assert slot.driver is None
+    assert pool.stats["launch_failures"] == 1
+
+
+def test_dead_slot_is_relaunched_on_next_lease():
+    slot = FakeSlot(0, reset_error=RuntimeError("会话已断开"), launch_errors=1)
+    pool = make_pool(slot)
+    pool.release(pool.lease("ariake", timeout=1)[0])
+
+    leased, _ = pool.lease("toneri", timeout=1)
+    assert leased is slot
+    assert slot.driver is not None
+    assert pool.stats["relaunches"] == 1
+
+
+def test_lease_puts_back_slot_that_still_cannot_launch():
+    slot = FakeSlot(0, launch_errors=5)
+    slot.driver = None
+    pool = make_pool(slot)
+
+    leased, _ = pool.lease("ariake", timeout=1)
+    assert leased is None
+    assert pool.idle == [slot]
+    assert slot.leased_by is None
@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+from tennis_availability import AvailabilityStore
+from tennis_delta import notify_changes, slots_from_items
+from tennis_heartbeat import CalendarHeartbeat
+from tennis_state_db import StateDB
+
+LABELS = {"10": "9-11点", "20": "11-13点"}
+CALENDAR = {"20990301": "一部空き", "20990308": "全て空き", "20990315": "予約あり"}
+
+
+def _run(calendar, clicked_rows):
+    store = AvailabilityStore("ariake", LABELS)
+    heartbeat = CalendarHeartbeat(store)
+    expand = heartbeat.gate(calendar, ["20990301", "20990308"])
+    for date in expand:
+        store.replace_day(date, clicked_rows[date])
+    notify_changes("ariake", slots_from_items("ariake", store.items()), "subject", lambda *a: None, heartbeat=heartbeat)
+    return expand, store
+
+
+def test_cached_vector_of_another_width_is_expanded_not_dropped():
+    with StateDB() as db:
+        db.conn.executemany(
+            "INSERT INTO date_cache VALUES ('ariake', '', ?, ?, ?, ?)",
+            [("20990301", "一部空き", 9e9, "[1, 0, 1]"), ("20990308", "全て空き", 9e9, "[2, 2]")],
+        )
+    store = AvailabilityStore("ariake", LABELS)
+    heartbeat = CalendarHeartbeat(store)
+    assert heartbeat.gate(CALENDAR, ["20990301", "20990308"]) == ["20990301"]
+    assert store.day("20990308") is not None
+
+
+def test_unchanged_calendar_reuses_cache_written_with_the_snapshot():
+    rows = {"20990301": [("20990301", "10", "1")], "20990308": [("20990308", "10", "2"), ("20990308", "20", "2")]}
+    expand, _ = _run(CALENDAR, rows)
+    assert expand == ["20990301", "20990308"]
+    with StateDB() as db:
+        assert db.conn.execute("SELECT COUNT(*) FROM date_cache").fetchone()[0] == 2
+        assert len(db.latest("ariake")) == 3
+
+    expand, store = _run(CALENDAR, rows)
+    assert expand == []
+    assert len(store) == 3
+
+    expand, _ = _run(dict(CALENDAR, **{"20990301": "予約あり"}), {"20990301": []})
+    assert expand == ["20990301"]
+    with StateDB() as db:
+        assert db.conn.execute(
+            "SELECT status, counts FROM date_cache WHERE date = '20990301'"
+        ).fetchone() == ("予約あり", "[0, 0]")
@@ -0,0 +1,27 @@
+# -*- coding: utf-8 -*-
+from tennis_delta import SlotKey, notify_changes
+from tennis_history import History, open_hours
+
+# 2025-03-01 10:30 JST
+OBSERVED_AT = 1740792600
+
+
+def test_append_and_count_open_hours():
+    history = History()
+    history.append({SlotKey("ariake", "", "20250301", "9-11点"): 2,
+                    SlotKey("ariake", "", "20250301", "11-13点"): 0,
+                    SlotKey("toneri", "", "20250301", "9-11点"): 1}, observed_at=OBSERVED_AT)
+
+    assert history.row_count() == 3
+    hours = open_hours(history, "ariake")
+    assert hours[10] == 1 and sum(hours) == 1
+
+
+def test_history_failure_does_not_block_mail():
+    sent = []
+    # 可预约数超出 int16，追加历史时抛出 OverflowError
+    slots = {SlotKey("ariake", "", "20250301", "9-11点"): 40000}
+
+    notify_changes("ariake", slots, "subject", lambda subject, body: sent.append(body))
+
+    assert len(sent) == 1
@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+import functools
+import os
+
+import pytest
+
+pytest.importorskip("requests")
+pytest.importorskip("jpholiday")
+pytest.importorskip("dotenv")
+
+from conftest import FIXTURES
+from tennis_http_fixtures import FixtureServer
+from tennis_retry import _load
+
+
+def test_failed_park_is_reported_to_breaker_and_exit_code(monkeypatch):
+    import tennis_metro
+    import tennis_metro_http
+
+    server = FixtureServer(os.path.join(FIXTURES, "metro_parks"), strict=True)
+    base_url = server.start() + "/web/"
+    sent = []
+    monkeypatch.setattr(tennis_metro, "fetch_parks", functools.partial(
+        tennis_metro_http.fetch_parks, months=1, base_url=base_url))
+    monkeypatch.setattr(tennis_metro, "email_sender", lambda *a: lambda subject, body: sent.append(subject))
+    try:
+        with pytest.raises(SystemExit) as exit_info:
+            tennis_metro.main()
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    assert exit_info.value.code == tennis_metro.EXIT_PARKS_FAILED
+    # 查询成功的三个公园照常通知，大井A 不通知
+    assert sorted(sent) == sorted(["🏸 有明-网球场预约更新通知", "🏸 舍人-网球场预约更新通知", "🏸 大井B-网球场预约更新通知"])
+    assert _load("circuit_breakers.json")["kouen.sports.metro.tokyo.lg.jp"]["failures"] == 1
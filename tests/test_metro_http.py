@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+import os
+
+import pytest
+
+pytest.importorskip("requests")
+pytest.importorskip("jpholiday")
+
+from conftest import FIXTURES
+from tennis_http_fixtures import FixtureServer, load_parity_dump, diff_parity
+from tennis_metro_http import (
+    METRO_PARKS, MetroPortalClient, fetch_availability, fetch_parks, filter_holidays_and_weekends, parse_week_slots,
+)
+
+METRO_1350 = os.path.join(FIXTURES, "metro_1350")
+
+
+@pytest.fixture
+def metro_server():
+    server = FixtureServer(METRO_1350, strict=True)
+    base_url = server.start() + "/web/"
+    yield base_url
+    server.shutdown()
+    server.server_close()
+
+
+def test_replay_matches_selenium(metro_server):
+    availability_info = fetch_availability(
+        "ariake_new", "1350", date_filter=filter_holidays_and_weekends, base_url=metro_server
+    )
+    expected = load_parity_dump(os.path.join(METRO_1350, "selenium.json"))
+
+    assert diff_parity(expected, availability_info) == ([], [], [])
+
+
+def test_replay_clicks_each_week_once(metro_server):
+    client = MetroPortalClient(metro_server)
+    calendar, _ = client.scan("1000_1020", "1350", months=2, date_filter=filter_holidays_and_weekends)
+
+    assert calendar["20250320"] == "一部空き"
+    # 首页、检索、下月各 1 次；3/22 与 4/30 由同一周视图覆盖，不再单独请求
+    assert client.requests_made == 9
+
+
+def test_zero_counts_are_not_available():
+    html = '<input id="A_20250301_10" value="0"><input id="A_20250301_20" value="3"><input id="A_20250301_30" value="">'
+    assert parse_week_slots(html) == {("20250301", "11-13点"): "3"}
+
+
+METRO_PARKS_DIR = os.path.join(FIXTURES, "metro_parks")
+
+
+@pytest.fixture
+def metro_parks_server():
+    server = FixtureServer(METRO_PARKS_DIR, strict=True)
+    base_url = server.start() + "/web/"
+    yield base_url
+    server.shutdown()
+    server.server_close()
+
+
+def test_scan_parks_reports_failed_park_and_continues(metro_parks_server):
+    availability, failed = fetch_parks(
+        METRO_PARKS, months=1, date_filter=filter_holidays_and_weekends, base_url=metro_parks_server
+    )
+
+    # 大井A 的检索返回 503：报告失败，重新加载首页后继续查询大井B
+    assert list(failed) == ["oi_A"] and "503" in failed["oi_A"]
+    assert set(availability) == {"ariake", "toneri", "oi_B"}
+    assert availability["oi_B"] == {("20250322", "7-9点"): "3"}
+    assert availability["toneri"][("20250301", "19-21点")] == "1"
+    assert len(availability["toneri"]) == 7
+    # 有明只保留休日与祝日（3/20 春分の日），3/4、3/5 是平日
+    assert sorted({date for date, _ in availability["ariake"]}) == ["20250301", "20250308", "20250320", "20250322"]
+    assert len(availability["ariake"]) == 11
@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+import asyncio
+
+from tennis_orchestrator import Job, Orchestrator
+
+
+def _job(tmp_path, name, body, timeout):
+    script = tmp_path / f"{name}.py"
+    script.write_text(f"import time\n{body}\n", encoding="utf-8")
+    return Job(name, str(script), timeout=timeout)
+
+
+def test_timeout_counts_from_start_and_hung_job_keeps_its_worker(tmp_path):
+    hung = _job(tmp_path, "hung", "time.sleep(1.0)", timeout=0.3)
+    quick = _job(tmp_path, "quick", "time.sleep(0.1)", timeout=0.5)
+    orchestrator = Orchestrator([hung, quick], max_workers=1)
+
+    async def run():
+        queued = asyncio.ensure_future(orchestrator.run_once(quick))
+        await orchestrator.run_once(hung)
+        # 超时的线程仍在运行：不再次调度
+        await orchestrator.run_once(hung)
+        await queued
+
+    asyncio.run(run())
+
+    assert hung.state["runs"] == 1
+    assert hung.state["failures"] == 1
+    assert hung.state["last_status"] == "skipped"
+    # 超时后名额仍被占用：quick 等到 hung 的线程退出（约 1 秒）才开始，超时不包括排队时间
+    assert quick.state["last_status"] == "ok"
+    assert quick.state["last_started"] - hung.state["last_started"] >= 0.9
+    assert quick.state["last_duration"] < 0.5
+
+
+def test_exit_codes_map_to_status(tmp_path):
+    down = _job(tmp_path, "down", "exit(75)", timeout=5)
+    failed = _job(tmp_path, "failed", "raise ValueError('x')", timeout=5)
+    orchestrator = Orchestrator([down, failed])
+
+    asyncio.run(orchestrator.run_all_once())
+
+    assert down.state["last_status"] == "portal_down"
+    assert failed.state["last_status"] == "ValueError"
+    assert failed.state["failures"] == 1
+
+
+def test_metro_runs_once_after_a_shared_release(tmp_path, monkeypatch):
+    import time
+    import tennis_burst
+
+    marker = tmp_path / "runs.txt"
+    metro = _job(tmp_path, "metro", f"open({str(marker)!r}, 'a').write('x')", timeout=5)
+    orchestrator = Orchestrator([metro])
+    release = time.time() + tennis_burst.BURST_LEAD
+    monkeypatch.setattr(tennis_burst, "next_release", lambda name: (release, "test"))
+    # 预热开始 0.2 秒后四个目标同时检测到放出
+    opened_at = time.time() + 0.2
+    monkeypatch.setattr(tennis_burst, "wait_for_release",
+                        lambda name, until: time.sleep(max(opened_at - time.time(), 0)) or opened_at)
+    monkeypatch.setattr(tennis_burst, "record_detected", lambda name, opened_at: None)
+
+    async def run():
+        watchers = [orchestrator.watch_release(name, [metro]) for name in ("ariake", "toneri", "oi_A", "oi_B")]
+        await asyncio.wait([asyncio.ensure_future(watcher) for watcher in watchers], timeout=1.5)
+
+    asyncio.run(run())
+
+    # 预热一次（其余目标的预热因仍在运行而跳过），放出后只重新运行一次
+    assert marker.read_text() == "xx"
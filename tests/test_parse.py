@@ -0,0 +1,15 @@
+# -*- coding: utf-8 -*-
+import importlib
+
+import tennis_parse
+
+
+def test_unknown_backend_falls_back_to_html_parser(monkeypatch, caplog):
+    monkeypatch.setenv("TENNIS_PARSER_BACKEND", "selectolaxx")
+    try:
+        module = importlib.reload(tennis_parse)
+        assert module.TIMETABLE_BACKEND == "html.parser"
+        assert "selectolaxx" in caplog.text
+    finally:
+        monkeypatch.delenv("TENNIS_PARSER_BACKEND")
+        importlib.reload(tennis_parse)
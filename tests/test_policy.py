@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+from tennis_delta import SlotKey
+from tennis_policy import AdaptivePolicy
+from tennis_state_db import StateDB
+
+NOW = 1_740_000_000.0
+
+
+def _record(site, changes, start):
+    with StateDB() as db:
+        for i in range(changes):
+            db.record_snapshot(site, {SlotKey(site, "", "20250301", f"{i}点"): 1}, taken_at=start + i * 600)
+
+
+def _rate(policy, site):
+    with StateDB() as db:
+        return policy.change_rate(db, site, NOW)
+
+
+def test_metro_job_uses_its_park_sites():
+    _record("ariake", 6, NOW - 7200)
+    _record("toneri", 3, NOW - 7200)
+    policy = AdaptivePolicy(["metro", "ariake"])
+
+    expected = sum(_rate(policy, site) for site in ("ariake", "toneri", "oi_A", "oi_B"))
+    assert abs(policy.plan(NOW)["metro"][1] - expected) < 1e-9
+    assert _rate(policy, "metro") > _rate(policy, "ariake")
+
+    # tennis_metro.py 按公园的站点名记录快照：这次运行中大井B 有变化，记为 metro 发现了变化
+    _record("oi_B", 1, NOW + 10)
+    policy.next_interval("metro", NOW)
+    with StateDB() as db:
+        assert db.conn.execute("SELECT changed FROM poll_log WHERE site = 'metro'").fetchone()[0] == 1
@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+from tennis_ratelimit import TokenBucket, configured_rates, throttle
+
+
+def test_bucket_allows_burst_then_waits(tmp_path):
+    bucket = TokenBucket("portal.example", rate=100.0, burst=3, directory=str(tmp_path))
+
+    assert [bucket.acquire() for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert bucket.acquire() > 0
+    assert bucket.peek() < 1
+
+
+def test_bucket_state_is_shared_between_instances(tmp_path):
+    first = TokenBucket("portal.example", rate=0.001, burst=2, directory=str(tmp_path))
+    second = TokenBucket("portal.example", rate=0.001, burst=2, directory=str(tmp_path))
+    first.acquire()
+    first.acquire()
+
+    assert second.peek() == pytest.approx(0, abs=0.01)
+
+
+def test_unconfigured_host_is_not_throttled():
+    assert throttle("https://unknown.example/path") == 0.0
+
+
+def test_rates_can_be_overridden(monkeypatch):
+    monkeypatch.setenv("TENNIS_RATE_LIMITS", "portal.example=2/6;broken")
+
+    assert configured_rates()["portal.example"] == (2.0, 6.0)
+
+
+def test_click_uses_host_from_last_navigation(monkeypatch):
+    pytest.importorskip("selenium")
+    pytest.importorskip("webdriver_manager")
+    import tennis_driver
+
+    hosts = []
+    monkeypatch.setattr(tennis_driver, "throttle_host", hosts.append)
+
+    class Driver:
+        reads = 0
+
+        @property
+        def current_url(self):
+            Driver.reads += 1
+            return "https://kouen.sports.metro.tokyo.lg.jp/web/index.jsp"
+
+    listener = tennis_driver.ThrottleListener()
+    driver = Driver()
+    listener.before_click(None, driver)
+    listener.before_navigate_to("https://yoyaku.nakano-tokyo.jp/stagia/", driver)
+    listener.before_click(None, driver)
+    listener.before_click(None, driver)
+
+    assert Driver.reads == 1
+    assert hosts == ["kouen.sports.metro.tokyo.lg.jp", "yoyaku.nakano-tokyo.jp",
+                     "yoyaku.nakano-tokyo.jp", "yoyaku.nakano-tokyo.jp"]
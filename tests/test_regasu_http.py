@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+import os
+
+import pytest
+
+pytest.importorskip("requests")
+
+from conftest import FIXTURES
+from tennis_http_fixtures import FixtureServer, load_parity_dump, diff_parity
+from tennis_regasu_http import RegasuPortalClient, OKUBO_PARK, OKUBO_FACILITIES, merge_like_selenium
+
+REGASU_OKUBO = os.path.join(FIXTURES, "regasu_okubo")
+
+
+@pytest.fixture
+def regasu_client():
+    server = FixtureServer(REGASU_OKUBO, strict=True)
+    base_url = server.start() + "/regasu/web/"
+    yield RegasuPortalClient(base_url)
+    server.shutdown()
+    server.server_close()
+
+
+def test_replay_matches_okubo_selenium(regasu_client):
+    results = regasu_client.scan_facilities(OKUBO_PARK, OKUBO_FACILITIES, 2)
+    expected = load_parity_dump(os.path.join(REGASU_OKUBO, "selenium.json"))
+
+    assert diff_parity(expected, merge_like_selenium(results, OKUBO_FACILITIES)) == ([], [], [])
+    # 首页、检索、月表示，每个设施：切换、3 月 3 天、翌月、4 月 2 或 1 天、前月
+    assert regasu_client.requests_made == 16
+
+
+def test_second_month_without_full_days_is_skipped(regasu_client):
+    results = regasu_client.scan_facilities(OKUBO_PARK, OKUBO_FACILITIES, 2)
+
+    # ２面的 4 月只有一部空き：客户端取到了时段，但 Selenium 流程不处理该月
+    assert results["10250090"][1][("20250402", "9:00-11:30")] == "1"
+    assert ("20250402", "9:00-11:30") not in merge_like_selenium(results, OKUBO_FACILITIES)
+    # ２面覆盖１面的同一 (日期, 时段)，１面独有的时段保留
+    merged = merge_like_selenium(results, OKUBO_FACILITIES)
+    assert merged[("20250301", "9:00-11:30")] == "1"
+    assert merged[("20250301", "17:30-19:30")] == "1"
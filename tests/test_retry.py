@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+import tennis_retry
+from tennis_retry import CircuitBreaker, backoff_delays, check_portal, CLOSED, OPEN, HALF_OPEN, COOLDOWN
+
+URL = "https://portal.example/web/index.jsp"
+
+
+class Clock:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def _state(breaker):
+    return tennis_retry._load(breaker.path)[breaker.host]
+
+
+def test_backoff_is_bounded():
+    delays = list(backoff_delays(attempts=6, base=2.0, cap=5.0))
+
+    assert len(delays) == 5
+    assert all(0 <= delay <= min(5.0, 2.0 * 2 ** n) for n, delay in enumerate(delays))
+
+
+def test_opens_after_threshold_and_skips_during_cooldown(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(tennis_retry.time, "time", clock)
+    breaker = CircuitBreaker("portal.example")
+
+    breaker.record_failure("timeout")
+    assert breaker.allow() == CLOSED
+    breaker.record_failure("timeout")
+    assert _state(breaker)["state"] == OPEN
+
+    clock.now += COOLDOWN - 1
+    assert breaker.allow() is None
+    assert _state(breaker)["skipped_runs"] == 1
+
+    clock.now += 2
+    assert breaker.allow() == HALF_OPEN
+
+
+def test_half_open_probe(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(tennis_retry.time, "time", clock)
+    breaker = CircuitBreaker("portal.example")
+    breaker.record_failure("x")
+    breaker.record_failure("x")
+
+    # 试探失败：重新打开，冷却期加倍
+    clock.now += COOLDOWN
+    monkeypatch.setattr(tennis_retry, "probe", lambda url: "ConnectionError")
+    assert not check_portal(URL)
+    assert _state(breaker)["state"] == OPEN
+    assert _state(breaker)["cooldown"] == 2 * COOLDOWN
+
+    clock.now += COOLDOWN
+    assert not check_portal(URL)  # 仍在加倍后的冷却期内，不试探
+
+    # 试探成功：关闭并恢复冷却期
+    clock.now += COOLDOWN
+    monkeypatch.setattr(tennis_retry, "probe", lambda url: None)
+    assert check_portal(URL)
+    assert _state(breaker)["state"] == CLOSED
+    assert _state(breaker)["cooldown"] == COOLDOWN
+    assert _state(breaker)["trips"] == 2
@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+from tennis_schedule import METRO_SITES, default_sites, phase_offsets, next_phase_time, crontab
+
+SITES = ["ariake", "toneri", "oi_A", "oi_B", "okubo", "kamitakada", "tetsugaku"]
+
+
+def test_sites_on_one_portal_are_evenly_spaced():
+    offsets = phase_offsets(SITES, 600)
+    metro = sorted(offsets[site] for site in ("ariake", "toneri", "oi_A", "oi_B"))
+    nakano = sorted(offsets[site] for site in ("kamitakada", "tetsugaku"))
+
+    assert [b - a for a, b in zip(metro, metro[1:])] == [150, 150, 150]
+    assert nakano[1] - nakano[0] == 300
+    assert all(0 <= offset < 600 for offset in offsets.values())
+
+
+def test_phases_do_not_depend_on_site_order():
+    assert phase_offsets(SITES, 600) == phase_offsets(list(reversed(SITES)), 600)
+
+
+def test_next_phase_time_is_aligned():
+    assert next_phase_time(120, 600, now=1200) == 1320
+    assert next_phase_time(120, 600, now=1320) == 1320
+    assert next_phase_time(120, 600, now=1321) == 1920
+
+
+def test_crontab_lines():
+    lines = crontab({"okubo": 0, "ariake": 150}, 600, "/opt/tennis", python="python3")
+
+    assert lines == [
+        "0-59/10 * * * * cd /opt/tennis && python3 tennis_okubo.py",
+        "2-59/10 * * * * cd /opt/tennis && sleep 30 && python3 tennis_ariake.py",
+    ]
+    with pytest.raises(ValueError):
+        crontab({"okubo": 0}, 420, "/opt/tennis")
+
+
+def test_metro_is_opt_in():
+    assert "metro" not in default_sites()
+    assert set(default_sites(metro=True)) == set(default_sites()) - set(METRO_SITES) | {"metro"}
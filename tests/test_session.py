@@ -0,0 +1,27 @@
+# -*- coding: utf-8 -*-
+import json
+import os
+import threading
+
+import pytest
+
+pytest.importorskip("selenium")
+
+from tennis_session import update_json
+
+
+def test_concurrent_updates_are_not_lost():
+    def worker():
+        for _ in range(50):
+            with update_json("stats.json") as stats:
+                stats["count"] = stats.get("count", 0) + 1
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    with open("stats.json", encoding="utf-8") as f:
+        assert json.load(f) == {"count": 400}
+    assert not [name for name in os.listdir(".") if name.endswith(".tmp")]
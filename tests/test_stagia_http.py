@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+import os
+import json
+
+import pytest
+
+pytest.importorskip("requests")
+
+from conftest import FIXTURES
+from tennis_http_fixtures import FixtureServer
+from tennis_stagia_http import StagiaClient, TIMETABLE_CACHE, parse_page_date
+
+STAGIA = os.path.join(FIXTURES, "stagia_tetsugaku")
+TODAY = "20250208"
+
+
+@pytest.fixture
+def stagia_url():
+    server = FixtureServer(STAGIA, strict=True)
+    base_url = server.start() + "/stagia/reserve/"
+    yield base_url
+    server.shutdown()
+    server.server_close()
+
+
+def load_selenium():
+    with open(os.path.join(STAGIA, "selenium.json"), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def test_walk_replay_matches_selenium(stagia_url):
+    client = StagiaClient("tetsugaku", "id0", stagia_url)
+    slots = client.scan(today=TODAY)
+
+    assert slots == load_selenium()
+    # 首页 + 8 次提交到达时间表，之后翻页 2 次
+    assert client.requests_made == 11
+    assert os.path.exists(TIMETABLE_CACHE.format(site="tetsugaku"))
+
+
+def test_jump_substitutes_saved_date(stagia_url):
+    with open(os.path.join(STAGIA, "index.json"), "r", encoding="utf-8") as f:
+        entry = next(e for e in json.load(f) if e["path"].endswith("/gin_timetable"))
+    # 上次运行保存的是另一天的请求，跳转时应把日期换成今天
+    form = {k: v.replace(TODAY, "20250201") for k, v in entry["form"].items()}
+    with open(TIMETABLE_CACHE.format(site="tetsugaku"), "w", encoding="utf-8") as f:
+        json.dump({"request": ["POST", stagia_url + "gin_timetable", form], "date": "20250201"}, f)
+
+    client = StagiaClient("tetsugaku", "id0", stagia_url)
+    assert client.jump_to_timetable(TODAY)
+    assert parse_page_date(client.page) == "2025-02-08"
+    assert client.requests_made == 2
+
+
+def test_jump_falls_back_when_saved_request_is_rejected(stagia_url):
+    with open(TIMETABLE_CACHE.format(site="tetsugaku"), "w", encoding="utf-8") as f:
+        json.dump({"request": ["POST", stagia_url + "gin_timetable", {"startDate": "20250201"}],
+                   "date": "20250201"}, f)
+
+    client = StagiaClient("tetsugaku", "id0", stagia_url)
+    assert not client.jump_to_timetable(TODAY)
+    assert client.scan(today=TODAY) == load_selenium()